@@ -1,186 +1,561 @@
 from __future__ import annotations
 
-import re
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
+from ai_service.app.planner import SqlPlan, generate_sql_plan
 
-@dataclass
-class SqlPlan:
-    metric: str
-    dimensions: List[str]
-    sql: str
+
+# per-call default timeouts (seconds)
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "catalog": 5.0,
+    "validate": 5.0,
+    "validate_batch": 30.0,
+    "execute": 10.0,
+    "ask": 10.0,
+    "ask_batch": 30.0,
+    "stream": 10.0,
+}
+
+# responses worth retrying for idempotent calls
+_RETRY_STATUSES = frozenset({429, 502, 503, 504})
 
 
 class MCPClient:
-    def __init__(self, base_url: str):
+    """
+    Sync client for the MCP tool server over one keep-alive session.
+
+    Catalog and validation calls are idempotent and are retried with
+    exponential backoff on connection errors and 429/502/503/504;
+    query execution is never retried.
+
+    priority sends X-Priority on every call: the server's admission class
+    for query execution ("interactive", "batch" or "telemetry").
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 10,
+        retries: int = 2,
+        backoff_seconds: float = 0.2,
+        timeouts: Optional[Dict[str, float]] = None,
+        priority: Optional[str] = None,
+    ):
         self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if priority:
+            self.session.headers["X-Priority"] = priority
+
+        # path -> (etag, data) for conditional GETs of catalog endpoints
+        self._etag_cache: Dict[str, Tuple[str, object]] = {}
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "MCPClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        kind: str,
+        idempotent: bool,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> requests.Response:
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                r = self.session.request(
+                    method, f"{self.base_url}{path}", timeout=timeout or self.timeouts[kind], **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if last:
+                    raise
+            else:
+                if last or r.status_code not in _RETRY_STATUSES:
+                    return r
+                r.close()
+            time.sleep(self.backoff_seconds * (2 ** attempt))
+        raise AssertionError("unreachable")
+
+    def _get_cached(self, path: str, timeout: Optional[float] = None):
+        headers = {}
+        cached = self._etag_cache.get(path)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        r = self._request("GET", path, "catalog", idempotent=True, timeout=timeout, headers=headers)
+        if r.status_code == 304 and cached:
+            return cached[1]
+        r.raise_for_status()
+
+        data = r.json()["data"]
+        etag = r.headers.get("ETag")
+        if etag:
+            self._etag_cache[path] = (etag, data)
+        return data
 
-    def list_metrics(self) -> List[Dict]:
-        r = requests.get(f"{self.base_url}/tools/catalog/list-metrics", timeout=5)
+    def list_metrics(self, timeout: Optional[float] = None) -> List[Dict]:
+        return self._get_cached("/tools/catalog/list-metrics", timeout)
+
+    def get_semantic_model(self, timeout: Optional[float] = None) -> Dict:
+        return self._get_cached("/tools/catalog/get-semantic-model", timeout)
+
+    def validate_sql(self, sql: str, timeout: Optional[float] = None) -> Dict:
+        r = self._request("POST", "/tools/sql/validate", "validate", idempotent=True, timeout=timeout, json={"sql": sql})
         r.raise_for_status()
         return r.json()["data"]
 
-    def get_semantic_model(self) -> Dict:
-        r = requests.get(f"{self.base_url}/tools/catalog/get-semantic-model", timeout=5)
+    def validate_sql_batch(self, statements: List[str], timeout: Optional[float] = None) -> Dict:
+        r = self._request(
+            "POST", "/tools/sql/validate-batch", "validate_batch", idempotent=True, timeout=timeout,
+            json={"statements": statements},
+        )
         r.raise_for_status()
         return r.json()["data"]
 
-    def validate_sql(self, sql: str) -> Dict:
-        r = requests.post(f"{self.base_url}/tools/sql/validate", json={"sql": sql}, timeout=5)
+    def execute_query(
+        self,
+        sql: str,
+        question: Optional[str] = None,
+        result_format: Optional[str] = None,
+        timeout: Optional[float] = None,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """
+        result_format: "rows" (default, list of dicts) or "columnar"
+        ({"columns": [{"name", "type_oid"}], "values": [[...] per column]}).
+        page_size / cursor page through the result: pass the same sql with
+        cursor=result["page"]["next_cursor"] for the next page.
+        """
+        r = self._request(
+            "POST", "/tools/query/execute", "execute", idempotent=False, timeout=timeout,
+            json=_execute_payload(sql, question, result_format, page_size, cursor),
+        )
         r.raise_for_status()
         return r.json()["data"]
 
-    def execute_query(self, sql: str, question: Optional[str] = None) -> Dict:
-        payload = {"sql": sql}
-        if question:
-            payload["question"] = question
-        r = requests.post(f"{self.base_url}/tools/query/execute", json=payload, timeout=10)
+    def ask(
+        self,
+        question: Optional[str] = None,
+        metric: Optional[str] = None,
+        dimensions: Optional[List[str]] = None,
+        result_format: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """
+        query.ask: plan (server-side), validate and execute in one round-trip.
+        """
+        r = self._request(
+            "POST", "/tools/query/ask", "ask", idempotent=False, timeout=timeout,
+            json=_ask_payload(question, metric, dimensions, result_format),
+        )
         r.raise_for_status()
         return r.json()["data"]
 
+    def ask_batch(self, questions: List[str], result_format: Optional[str] = None, timeout: Optional[float] = None) -> Dict:
+        """
+        query.ask_batch: answers many questions in one round-trip, fusing plans
+        that share a dimension set into one statement (see answer_questions_batch).
+        """
+        r = self._request(
+            "POST", "/tools/query/ask-batch", "ask_batch", idempotent=False, timeout=timeout,
+            json=_ask_batch_payload(questions, result_format),
+        )
+        r.raise_for_status()
+        return r.json()["data"]
 
-def _normalize(q: str) -> str:
-    return re.sub(r"\s+", " ", q.strip().lower())
-
-
-def _pick_metric(question: str) -> str:
-    q = _normalize(question)
+    def stream_query(
+        self,
+        sql: str,
+        question: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        """
+        Consumes /tools/query/execute-stream incrementally, yielding one decoded
+        NDJSON message at a time: a "header" (column metadata), then "rows"
+        batches, then "end" -- or a single "error".
+        """
+        payload = _execute_payload(sql, question, None)
+        if batch_size:
+            payload["batch_size"] = batch_size
+        with self.session.post(
+            f"{self.base_url}/tools/query/execute-stream",
+            json=payload,
+            stream=True,
+            timeout=timeout or self.timeouts["stream"],
+        ) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+def _execute_payload(
+    sql: str,
+    question: Optional[str],
+    result_format: Optional[str],
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict:
+    payload: Dict = {"sql": sql}
+    if question:
+        payload["question"] = question
+    if result_format:
+        payload["format"] = result_format
+    if page_size is not None:
+        payload["page_size"] = page_size
+    if cursor:
+        payload["cursor"] = cursor
+    return payload
+
+
+def _ask_payload(
+    question: Optional[str], metric: Optional[str], dimensions: Optional[List[str]], result_format: Optional[str]
+) -> Dict:
+    payload: Dict = {}
+    if question:
+        payload["question"] = question
+    if metric:
+        payload["metric"] = metric
+        payload["dimensions"] = dimensions or []
+    if result_format:
+        payload["format"] = result_format
+    return payload
+
+
+def _ask_batch_payload(questions: List[str], result_format: Optional[str]) -> Dict:
+    payload: Dict = {"questions": list(questions)}
+    if result_format:
+        payload["format"] = result_format
+    return payload
+
+
+_clients: Dict[Tuple[str, Optional[str]], MCPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(mcp_base_url: str, priority: Optional[str] = None) -> MCPClient:
+    """
+    Process-wide MCPClient per base URL (and priority), so repeated calls reuse pooled connections.
+    """
+    key = (mcp_base_url.rstrip("/"), priority)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = MCPClient(key[0], priority=priority)
+        return client
 
-    # explicit intent: orders
-    if "order" in q:
-        # common phrasing: "total orders"
-        if "total order" in q or "total orders" in q:
-            return "total_orders"
-        # other phrasing: count/number/how many
-        if "count" in q or "number" in q or "how many" in q:
-            return "total_orders"
 
-    # average intent
-    if "avg" in q or "average" in q:
-        return "avg_order_value"
+class _StageTimer:
+    """
+    Wall time of each orchestration stage, in milliseconds.
+    """
 
-    # quantity intent
-    if "quantity" in q or "units" in q:
-        return "total_quantity"
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._started = self._last = time.perf_counter()
 
-    # fallback
-    return "total_sales"
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self._last) * 1000, 3)
+        self._last = now
 
+    def done(self) -> Dict[str, float]:
+        self.timings["total"] = round((time.perf_counter() - self._started) * 1000, 3)
+        return self.timings
 
-def _pick_dimensions(question: str) -> List[str]:
-    q = _normalize(question)
-    dims: List[str] = []
 
-    # dimensions (simple keyword triggers)
-    if "region" in q or "city" in q or "location" in q:
-        dims.append("region")
-    if "product" in q:
-        dims.append("product")
-    if "category" in q:
-        dims.append("category")
-    if "date" in q or "day" in q:
-        dims.append("date")
-    if "month" in q:
-        dims.append("month")
-    if "year" in q:
-        dims.append("year")
+def _validation_failed(plan: SqlPlan, validation: Dict) -> Dict:
+    return {
+        "ok": False,
+        "stage": "validate",
+        "metric": plan.metric,
+        "dimensions": plan.dimensions,
+        "sql": plan.sql,
+        "violations": validation["violations"],
+    }
 
-    # default dimension for common phrasing "by region"
-    if " by " in q and not dims:
-        if "region" in q:
-            dims.append("region")
 
-    # If nothing, return empty = total metric only
-    return dims
+def _answer(plan: SqlPlan, safe_sql: str, result: Dict) -> Dict:
+    return {
+        "ok": result.get("ok", False),
+        "metric": plan.metric,
+        "dimensions": plan.dimensions,
+        **({"date_range": list(plan.date_range)} if plan.date_range is not None else {}),
+        "generated_sql": plan.sql,
+        "executed_sql": result.get("sql", safe_sql),
+        "result": result,
+    }
 
 
-def _build_sql(metric: str, dimensions: List[str]) -> str:
+def answer_question(
+    mcp_base_url: str,
+    question: str,
+    result_format: Optional[str] = None,
+    mode: str = "client",
+    page_size: Optional[int] = None,
+    priority: Optional[str] = None,
+) -> Dict:
     """
-    Builds a safe SQL statement using the known star schema.
-    NOTE: governance still applies in sql.validate + query.execute.
+    Orchestrates: question -> sql plan -> validate -> execute
+    result_format is passed through to query.execute ("rows" or "columnar").
+    page_size returns the first page of the full (not LIMIT-clamped) result;
+    get_client(url).execute_query(out["generated_sql"], cursor=next_cursor)
+    fetches the next. Paging needs mode="client".
+
+    mode="client" plans here and calls sql.validate then query.execute;
+    mode="ask" sends the question to query.ask, which does all three on the
+    server in a single round-trip (same output shape).
+
+    The output carries "timings_ms": wall time per stage (plan, validate,
+    execute -- or ask) and in total. priority is the server admission class
+    (default "interactive"); bulk callers such as the eval runner pass "batch".
     """
-    metric_expr_map = {
-        "total_sales": "SUM(f.total_amount)",
-        "total_orders": "COUNT(DISTINCT f.order_id)",
-        "avg_order_value": "AVG(f.total_amount)",
-        "total_quantity": "SUM(f.quantity)",
-    }
-
-    dim_select_map = {
-        "region": ("r.region_name", "dim_region r", "f.region_id = r.region_id"),
-        "product": ("p.product_name", "dim_product p", "f.product_id = p.product_id"),
-        "category": ("p.product_category", "dim_product p", "f.product_id = p.product_id"),
-        "date": ("d.date_value", "dim_date d", "f.date_id = d.date_id"),
-        "month": ("d.month", "dim_date d", "f.date_id = d.date_id"),
-        "year": ("d.year", "dim_date d", "f.date_id = d.date_id"),
-    }
+    client = get_client(mcp_base_url, priority)
+    timer = _StageTimer()
 
-    metric_expr = metric_expr_map.get(metric, metric_expr_map["total_sales"])
+    if mode == "ask":
+        if page_size is not None:
+            raise ValueError("page_size requires mode='client' (query.ask is not paged)")
+        out = client.ask(question=question, result_format=result_format)
+        timer.lap("ask")
+        return {**out, "timings_ms": timer.done()}
 
-    select_cols: List[str] = []
-    joins: Dict[str, Tuple[str, str]] = {}  # table_alias -> (table, condition)
-
-    for dim in dimensions:
-        if dim not in dim_select_map:
-            continue
-        col, table, cond = dim_select_map[dim]
-        select_cols.append(col)
-        alias = table.split()[-1]
-        joins[alias] = (table, cond)
+    plan = generate_sql_plan(question)
+    timer.lap("plan")
+    validation = client.validate_sql(plan.sql)
+    timer.lap("validate")
 
-    # Build query
-    select_clause = ", ".join(select_cols + [f"{metric_expr} AS {metric}"]) if select_cols else f"{metric_expr} AS {metric}"
-    sql = f"SELECT {select_clause} FROM fact_sales f "
+    if not validation["is_valid"]:
+        return {**_validation_failed(plan, validation), "timings_ms": timer.done()}
 
-    for alias, (table, cond) in joins.items():
-        sql += f"JOIN {table} ON {cond} "
+    # use sanitized SQL if provided; a paged query sends the plan unclamped
+    # (the server re-validates it and caps each page instead)
+    safe_sql = plan.sql if page_size is not None else validation.get("sanitized_sql") or plan.sql
+    result = client.execute_query(safe_sql, question=question, result_format=result_format, page_size=page_size)
+    timer.lap("execute")
 
-    if select_cols:
-        sql += "GROUP BY " + ", ".join(select_cols) + " "
-        sql += f"ORDER BY {metric} DESC "
+    return {**_answer(plan, safe_sql, result), "timings_ms": timer.done()}
 
-    # No ORDER BY by default (keeps it simple and deterministic)
-    return sql.strip()
 
+def answer_questions_batch(
+    mcp_base_url: str,
+    questions: List[str],
+    result_format: Optional[str] = None,
+    priority: Optional[str] = None,
+) -> Dict:
+    """
+    Answers many questions with as few fact-table scans as possible: the server
+    (query.ask_batch) plans them, fuses plans with the same dimension set into
+    one multi-metric statement and splits its result back per question.
 
-def generate_sql_plan(question: str) -> SqlPlan:
-    metric = _pick_metric(question)
-    dims = _pick_dimensions(question)
-    sql = _build_sql(metric, dims)
-    return SqlPlan(metric=metric, dimensions=dims, sql=sql)
+    Returns {"answers": [one answer_question(mode="ask") shape per question, in
+    order], "groups", "statements", "scans_saved", "timings_ms"}.
+    """
+    timer = _StageTimer()
+    out = get_client(mcp_base_url, priority).ask_batch(questions, result_format=result_format)
+    timer.lap("ask_batch")
+    return {**out, "timings_ms": timer.done()}
 
 
-def answer_question(mcp_base_url: str, question: str) -> Dict:
+class AsyncMCPClient:
     """
-    Orchestrates: question -> sql plan -> validate -> execute
+    asyncio client for the MCP tool server over one httpx connection pool.
+    Same retry/timeout policy as MCPClient.
+
+        async with AsyncMCPClient(url) as client:
+            answers = await client.answer_questions(questions)
     """
-    client = MCPClient(mcp_base_url)
 
-    plan = generate_sql_plan(question)
-    validation = client.validate_sql(plan.sql)
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 20,
+        retries: int = 2,
+        backoff_seconds: float = 0.2,
+        timeouts: Optional[Dict[str, float]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        priority: Optional[str] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+            headers={"X-Priority": priority} if priority else None,
+        )
+        self._etag_cache: Dict[str, Tuple[str, object]] = {}
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    async def __aenter__(self) -> "AsyncMCPClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        kind: str,
+        idempotent: bool,
+        timeout: Optional[float] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        attempts = 1 + (self.retries if idempotent else 0)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                r = await self.http.request(method, path, timeout=timeout or self.timeouts[kind], **kwargs)
+            except (httpx.ConnectError, httpx.TimeoutException):
+                if last:
+                    raise
+            else:
+                if last or r.status_code not in _RETRY_STATUSES:
+                    return r
+            await asyncio.sleep(self.backoff_seconds * (2 ** attempt))
+        raise AssertionError("unreachable")
+
+    async def _get_cached(self, path: str, timeout: Optional[float] = None):
+        headers = {}
+        cached = self._etag_cache.get(path)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        r = await self._request("GET", path, "catalog", idempotent=True, timeout=timeout, headers=headers)
+        if r.status_code == 304 and cached:
+            return cached[1]
+        r.raise_for_status()
 
-    if not validation["is_valid"]:
-        return {
-            "ok": False,
-            "stage": "validate",
-            "metric": plan.metric,
-            "dimensions": plan.dimensions,
-            "sql": plan.sql,
-            "violations": validation["violations"],
-        }
-
-    # use sanitized SQL if provided
-    safe_sql = validation.get("sanitized_sql") or plan.sql
-    result = client.execute_query(safe_sql, question=question)
+        data = r.json()["data"]
+        etag = r.headers.get("ETag")
+        if etag:
+            self._etag_cache[path] = (etag, data)
+        return data
 
-    return {
-        "ok": result.get("ok", False),
-        "metric": plan.metric,
-        "dimensions": plan.dimensions,
-        "generated_sql": plan.sql,
-        "executed_sql": result.get("sql", safe_sql),
-        "result": result,
-    }
+    async def list_metrics(self, timeout: Optional[float] = None) -> List[Dict]:
+        return await self._get_cached("/tools/catalog/list-metrics", timeout)
+
+    async def get_semantic_model(self, timeout: Optional[float] = None) -> Dict:
+        return await self._get_cached("/tools/catalog/get-semantic-model", timeout)
+
+    async def validate_sql(self, sql: str, timeout: Optional[float] = None) -> Dict:
+        r = await self._request(
+            "POST", "/tools/sql/validate", "validate", idempotent=True, timeout=timeout, json={"sql": sql}
+        )
+        r.raise_for_status()
+        return r.json()["data"]
+
+    async def execute_query(
+        self,
+        sql: str,
+        question: Optional[str] = None,
+        result_format: Optional[str] = None,
+        timeout: Optional[float] = None,
+        page_size: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        r = await self._request(
+            "POST", "/tools/query/execute", "execute", idempotent=False, timeout=timeout,
+            json=_execute_payload(sql, question, result_format, page_size, cursor),
+        )
+        r.raise_for_status()
+        return r.json()["data"]
+
+    async def ask(
+        self,
+        question: Optional[str] = None,
+        metric: Optional[str] = None,
+        dimensions: Optional[List[str]] = None,
+        result_format: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        r = await self._request(
+            "POST", "/tools/query/ask", "ask", idempotent=False, timeout=timeout,
+            json=_ask_payload(question, metric, dimensions, result_format),
+        )
+        r.raise_for_status()
+        return r.json()["data"]
+
+    async def ask_batch(
+        self, questions: List[str], result_format: Optional[str] = None, timeout: Optional[float] = None
+    ) -> Dict:
+        r = await self._request(
+            "POST", "/tools/query/ask-batch", "ask_batch", idempotent=False, timeout=timeout,
+            json=_ask_batch_payload(questions, result_format),
+        )
+        r.raise_for_status()
+        return r.json()["data"]
+
+    async def answer_question(self, question: str, result_format: Optional[str] = None, mode: str = "client") -> Dict:
+        timer = _StageTimer()
+        if mode == "ask":
+            out = await self.ask(question=question, result_format=result_format)
+            timer.lap("ask")
+            return {**out, "timings_ms": timer.done()}
+
+        plan = generate_sql_plan(question)
+        timer.lap("plan")
+        validation = await self.validate_sql(plan.sql)
+        timer.lap("validate")
+
+        if not validation["is_valid"]:
+            return {**_validation_failed(plan, validation), "timings_ms": timer.done()}
+
+        safe_sql = validation.get("sanitized_sql") or plan.sql
+        result = await self.execute_query(safe_sql, question=question, result_format=result_format)
+        timer.lap("execute")
+        return {**_answer(plan, safe_sql, result), "timings_ms": timer.done()}
+
+    async def answer_questions(
+        self,
+        questions: List[str],
+        result_format: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        mode: str = "client",
+    ) -> List[Dict]:
+        """
+        Answers many questions concurrently (at most `concurrency` in flight,
+        default: the pool size). Results are returned in input order; a question
+        that raises yields {"ok": False, "stage": "exception", ...} instead.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.pool_size)
+
+        async def one(question: str) -> Dict:
+            async with semaphore:
+                try:
+                    return await self.answer_question(question, result_format=result_format, mode=mode)
+                except Exception as e:
+                    return {"ok": False, "stage": "exception", "question": question, "error": str(e)}
+
+        return list(await asyncio.gather(*(one(q) for q in questions)))
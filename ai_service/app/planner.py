@@ -0,0 +1,263 @@
+"""
+Rule-based question planner: question -> (metric, dimensions) -> SQL.
+
+Has no HTTP dependencies so the MCP server can plan questions too (query.ask).
+"""
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from ai_service.app.time_ranges import DateIdRange, TimeExpr, date_id_predicate, date_id_range, extract_time_range
+
+
+@dataclass
+class SqlPlan:
+    metric: str
+    dimensions: List[str]
+    sql: str
+    # inclusive date_id bounds from a time phrase ("last 7 days"); None = all history
+    date_range: Optional[DateIdRange] = None
+
+
+_METRIC_EXPRESSIONS: Dict[str, str] = {
+    "total_sales": "SUM(f.total_amount)",
+    "total_orders": "COUNT(DISTINCT f.order_id)",
+    "avg_order_value": "AVG(f.total_amount)",
+    "total_quantity": "SUM(f.quantity)",
+}
+
+_DIMENSION_COLUMNS: Dict[str, Tuple[str, str, str]] = {
+    "region": ("r.region_name", "dim_region r", "f.region_id = r.region_id"),
+    "product": ("p.product_name", "dim_product p", "f.product_id = p.product_id"),
+    "category": ("p.product_category", "dim_product p", "f.product_id = p.product_id"),
+    "date": ("d.date_value", "dim_date d", "f.date_id = d.date_id"),
+    "month": ("d.month", "dim_date d", "f.date_id = d.date_id"),
+    "year": ("d.year", "dim_date d", "f.date_id = d.date_id"),
+}
+
+# keyword triggers; matched as substrings of the normalized question
+_ORDER_WORDS = frozenset({"total order", "count", "number", "how many"})
+_AVG_WORDS = frozenset({"avg", "average"})
+_QUANTITY_WORDS = frozenset({"quantity", "units"})
+
+# (dimension, triggers) in output order
+_DIMENSION_WORDS: Tuple[Tuple[str, FrozenSet[str]], ...] = (
+    ("region", frozenset({"region", "city", "location"})),
+    ("product", frozenset({"product"})),
+    ("category", frozenset({"category"})),
+    ("date", frozenset({"date", "day"})),
+    ("month", frozenset({"month"})),
+    ("year", frozenset({"year"})),
+)
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed vocabulary, compiled to a full
+    transition table so scanning costs one dict lookup per character.
+    `scan` returns every keyword occurring in the text (overlaps included),
+    i.e. exactly the keywords for which `keyword in text` is true.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[FrozenSet[str]] = [frozenset()]
+        for word in keywords:
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    goto.append({})
+                    outputs.append(frozenset())
+                    nxt = goto[state][ch] = len(goto) - 1
+                state = nxt
+            outputs[state] = outputs[state] | {word}
+
+        # breadth-first: failure links, merged outputs and the full transition table
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] | outputs[fail[state]]
+            # inherit the failure state's transitions, then override with our own edges
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+
+        self._delta = delta
+        self._outputs = outputs
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        delta, outputs = self._delta, self._outputs
+        found: FrozenSet[str] = frozenset()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found = found | outputs[state]
+        return found
+
+
+_KEYWORDS = KeywordAutomaton(
+    {"order"} | _ORDER_WORDS | _AVG_WORDS | _QUANTITY_WORDS
+    | frozenset().union(*(words for _, words in _DIMENSION_WORDS))
+)
+
+
+def _normalize(q: str) -> str:
+    # same result as re.sub(r"\s+", " ", q.strip().lower())
+    return " ".join(q.lower().split())
+
+
+def _resolve_metric(found: FrozenSet[str]) -> str:
+    # explicit intent: orders ("total orders", count/number/how many)
+    if "order" in found and not found.isdisjoint(_ORDER_WORDS):
+        return "total_orders"
+
+    # average intent
+    if not found.isdisjoint(_AVG_WORDS):
+        return "avg_order_value"
+
+    # quantity intent
+    if not found.isdisjoint(_QUANTITY_WORDS):
+        return "total_quantity"
+
+    # fallback
+    return "total_sales"
+
+
+def _resolve_dimensions(found: FrozenSet[str]) -> List[str]:
+    # If nothing, return empty = total metric only
+    return [dim for dim, words in _DIMENSION_WORDS if not found.isdisjoint(words)]
+
+
+def _pick_metric(question: str) -> str:
+    return _resolve_metric(_KEYWORDS.scan(_normalize(question)))
+
+
+def _pick_dimensions(question: str) -> List[str]:
+    return _resolve_dimensions(_KEYWORDS.scan(_normalize(question)))
+
+
+def _build_sql(metric: str, dimensions: List[str], date_range: Optional[DateIdRange] = None) -> str:
+    """
+    Builds a safe SQL statement using the known star schema.
+    NOTE: governance still applies in sql.validate + query.execute.
+    """
+    return _sql_for_shape(metric, tuple(dimensions), date_range)
+
+
+@lru_cache(maxsize=1024)
+def _sql_for_shape(metric: str, dimensions: Tuple[str, ...], date_range: Optional[DateIdRange] = None) -> str:
+    metric_expr = _METRIC_EXPRESSIONS.get(metric, _METRIC_EXPRESSIONS["total_sales"])
+
+    select_cols: List[str] = []
+    joins: Dict[str, Tuple[str, str]] = {}  # table_alias -> (table, condition)
+
+    for dim in dimensions:
+        if dim not in _DIMENSION_COLUMNS:
+            continue
+        col, table, cond = _DIMENSION_COLUMNS[dim]
+        select_cols.append(col)
+        alias = table.split()[-1]
+        joins[alias] = (table, cond)
+
+    # Build query
+    select_clause = ", ".join(select_cols + [f"{metric_expr} AS {metric}"]) if select_cols else f"{metric_expr} AS {metric}"
+    sql = f"SELECT {select_clause} FROM fact_sales f "
+
+    for alias, (table, cond) in joins.items():
+        sql += f"JOIN {table} ON {cond} "
+
+    # on the fact table's own key, so idx_fact_sales_date / partition pruning apply
+    predicate = date_id_predicate("f.date_id", date_range)
+    if predicate:
+        sql += f"WHERE {predicate} "
+
+    if select_cols:
+        sql += "GROUP BY " + ", ".join(select_cols) + " "
+        sql += f"ORDER BY {metric} DESC "
+
+    # No ORDER BY by default (keeps it simple and deterministic)
+    return sql.strip()
+
+
+class _PlanCache:
+    """
+    LRU of finished plans keyed on the normalized question.
+    Entries are immutable; callers get a fresh SqlPlan each time.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, Tuple[str, ...], Optional[TimeExpr]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, Tuple[str, ...], Optional[TimeExpr]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: str, entry: Tuple[str, Tuple[str, ...], Optional[TimeExpr]]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+_plan_cache = _PlanCache(max_entries=int(os.getenv("PLAN_CACHE_SIZE", "4096")))
+
+
+def generate_sql_plan(question: str) -> SqlPlan:
+    """
+    Plans a question. A time phrase ("last 7 days", "in March 2025") becomes
+    plan.date_range and a date_id predicate; relative phrases are resolved
+    against today on every call, so cached plans never go stale.
+    """
+    key = _normalize(question)
+    entry = _plan_cache.get(key)
+    if entry is None:
+        # the time phrase is cut out first so "last 7 days" doesn't read as a "day" dimension
+        time_expr, rest = extract_time_range(key)
+        # one scan resolves both the metric and the dimensions
+        found = _KEYWORDS.scan(rest)
+        metric = _resolve_metric(found)
+        dims = tuple(_resolve_dimensions(found))
+        entry = (metric, dims, time_expr)
+        _plan_cache.put(key, entry)
+
+    metric, dims, time_expr = entry
+    date_range = date_id_range(time_expr) if time_expr is not None else None
+    return SqlPlan(
+        metric=metric, dimensions=list(dims), sql=_sql_for_shape(metric, dims, date_range), date_range=date_range
+    )
+
+
+def plan_cache_stats() -> Dict[str, Any]:
+    return _plan_cache.stats()
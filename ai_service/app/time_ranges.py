@@ -0,0 +1,268 @@
+"""
+Time-range phrases in questions -> inclusive date_id bounds.
+
+    "last 7 days", "past week"             rolling window ending today
+    "last month", "previous quarter"       the previous calendar period
+    "this year", "month to date", "ytd"    current period up to today
+    "today", "yesterday"
+    "in March", "March 2025", "Q1 2025", "in 2025", "on 2025-01-03"
+    "between 2025-01-01 and 2025-01-05", "from ... to ...",
+    "since / after / until / before 2025-01-05"
+
+Parsing yields a TimeExpr that doesn't depend on the current date (so plans
+stay cacheable); `date_id_range` resolves it against today, which
+PLANNER_TODAY (ISO date) pins for reproducible runs. date_ids are
+YYYYMMDD integers, as in dim_date.
+"""
+import calendar
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# inclusive (first, last) date_id; None on an open side
+DateIdRange = Tuple[Optional[int], Optional[int]]
+
+_UNIT = r"(day|week|month|quarter|year)s?"
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+_NUMBER = r"(\d{1,4}|" + "|".join(_NUMBER_WORDS) + r")"
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTH_ABBREVIATIONS = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+_MONTH = r"(" + "|".join(_MONTHS) + r")"
+_ANY_MONTH = r"(" + "|".join(list(_MONTHS) + list(_MONTH_ABBREVIATIONS) + ["sept"]) + r")"
+_ISO_DATE = r"(\d{4}-\d{2}-\d{2})"
+# a preposition / article right before a phrase is removed along with it
+_LEAD_WORDS = (frozenset({"the"}), frozenset({"in", "on", "for", "during", "over", "within", "of"}))
+
+# (kind, hints, pattern), tried in order; the first match wins. A pattern is
+# only searched when the question has one of its hint words (None: a digit),
+# so a question without a time phrase costs one tokenizing pass.
+_PATTERNS = tuple(
+    (kind, frozenset(hints) if hints else None, re.compile(pattern))
+    for kind, hints, pattern in (
+        ("between", ("between", "from"), rf"\b(?:between|from)\s+{_ISO_DATE}\s+(?:and|to|until|through)\s+{_ISO_DATE}\b"),
+        ("since", ("since", "after", "from"), rf"\b(since|after|from)\s+{_ISO_DATE}\b"),
+        ("until", ("until", "through", "before"), rf"\b(until|through|before)\s+{_ISO_DATE}\b"),
+        ("day", None, rf"\b{_ISO_DATE}\b"),
+        ("quarter", None, r"\bq([1-4])\s+(\d{4})\b"),
+        ("month_year", None, rf"\b{_ANY_MONTH}\s+(\d{{4}})\b"),
+        ("year", None, r"\b((?:19|20)\d{2})\b(?!-\d)"),
+        ("rolling", ("last", "past", "previous", "trailing"), rf"\b(?:last|past|previous|trailing)\s+{_NUMBER}\s+{_UNIT}\b"),
+        ("relative_day", ("today", "yesterday"), r"\b(today|yesterday)\b"),
+        ("to_date", ("to", "wtd", "mtd", "qtd", "ytd"), r"\b(?:(week|month|quarter|year)[\s-]to[\s-]date|(w|m|q|y)td)\b"),
+        ("current", ("this", "current"), rf"\b(?:this|current)\s+{_UNIT}\b"),
+        ("previous", ("last", "previous", "prior"), rf"\b(?:last|previous|prior)\s+{_UNIT}\b"),
+        ("past", ("past",), rf"\bpast\s+{_UNIT}\b"),
+        ("month", tuple(_MONTHS), rf"\b{_MONTH}\b"),
+    )
+)
+# words, and single digits (which every pattern without hints needs)
+_TOKENS = re.compile(r"[a-z]+|\d")
+_TD_UNITS = {"w": "week", "m": "month", "q": "quarter", "y": "year"}
+
+
+@dataclass(frozen=True)
+class TimeExpr:
+    """
+    A parsed time phrase, independent of the current date.
+
+    kind: "range" (args: first, last as ISO dates or None), "rolling" (n, unit),
+    "current" (unit), "previous" (unit), "day_offset" (days back) or "month" (1-12)
+    """
+
+    kind: str
+    args: Tuple
+
+
+def _parse_date(text: str) -> date:
+    return date.fromisoformat(text)
+
+
+def _month_bounds(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _to_expr(kind: str, groups: Tuple) -> Optional[TimeExpr]:
+    try:
+        if kind == "between":
+            first, last = sorted((_parse_date(groups[0]), _parse_date(groups[1])))
+            return TimeExpr("range", (first.isoformat(), last.isoformat()))
+        if kind == "since":
+            first = _parse_date(groups[1]) + timedelta(days=1 if groups[0] == "after" else 0)
+            return TimeExpr("range", (first.isoformat(), None))
+        if kind == "until":
+            last = _parse_date(groups[1]) - timedelta(days=1 if groups[0] == "before" else 0)
+            return TimeExpr("range", (None, last.isoformat()))
+        if kind == "day":
+            return TimeExpr("range", (_parse_date(groups[0]).isoformat(),) * 2)
+        if kind == "quarter":
+            quarter, year = int(groups[0]), int(groups[1])
+            first, _ = _month_bounds(year, 3 * quarter - 2)
+            _, last = _month_bounds(year, 3 * quarter)
+            return TimeExpr("range", (first.isoformat(), last.isoformat()))
+        if kind == "month_year":
+            month = _MONTHS.get(groups[0]) or _MONTH_ABBREVIATIONS.get(groups[0][:3])
+            first, last = _month_bounds(int(groups[1]), month)
+            return TimeExpr("range", (first.isoformat(), last.isoformat()))
+        if kind == "year":
+            return TimeExpr("range", (f"{groups[0]}-01-01", f"{groups[0]}-12-31"))
+    except (ValueError, OverflowError):  # e.g. 2025-02-30, after 9999-12-31
+        return None
+    if kind == "rolling":
+        n = int(_NUMBER_WORDS.get(groups[0], groups[0]))
+        return TimeExpr("rolling", (n, groups[1])) if n > 0 else None
+    if kind == "relative_day":
+        return TimeExpr("day_offset", (0 if groups[0] == "today" else 1,))
+    if kind == "to_date":
+        return TimeExpr("current", (groups[0] or _TD_UNITS[groups[1]],))
+    if kind in ("current", "previous"):
+        return TimeExpr(kind, (groups[0],))
+    if kind == "past":
+        return TimeExpr("rolling", (1, groups[0]))
+    if kind == "month":
+        return TimeExpr("month", (_MONTHS[groups[0]],))
+    return None
+
+
+def extract_time_range(text: str) -> Tuple[Optional[TimeExpr], str]:
+    """
+    (time expression, text without the phrase) for a normalized question;
+    (None, text) when it names no time range. The phrase is cut out so its
+    words ("day", "month", "year") aren't read as group-by dimensions.
+    """
+    tokens = set(_TOKENS.findall(text))
+    has_digit = not tokens.isdisjoint("0123456789")
+    for kind, hints, pattern in _PATTERNS:
+        if not (has_digit if hints is None else not tokens.isdisjoint(hints)):
+            continue
+        match = pattern.search(text)
+        if match is None:
+            continue
+        expr = _to_expr(kind, match.groups())
+        if expr is not None:
+            head = text[: match.start()].rstrip()
+            for words in _LEAD_WORDS:
+                word = head.rsplit(" ", 1)[-1]
+                if word in words:
+                    head = head[: -len(word)].rstrip()
+            return expr, " ".join((head + " " + text[match.end():]).split())
+    return None, text
+
+
+_PINNED_TODAY = date.fromisoformat(os.environ["PLANNER_TODAY"]) if os.getenv("PLANNER_TODAY") else None
+
+
+def today() -> date:
+    return _PINNED_TODAY or date.today()
+
+
+def _shift_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    return date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _period_start(day: date, unit: str) -> date:
+    if unit == "day":
+        return day
+    if unit == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if unit == "month":
+        return day.replace(day=1)
+    if unit == "quarter":
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    return date(day.year, 1, 1)
+
+
+def _units_back(day: date, n: int, unit: str) -> Optional[date]:
+    """
+    `day` moved back n units; None when that is before date.min ("last 5000 years").
+    """
+    try:
+        if unit == "day":
+            return day - timedelta(days=n)
+        if unit == "week":
+            return day - timedelta(weeks=n)
+        return _shift_months(day, -n * {"month": 1, "quarter": 3, "year": 12}[unit])
+    except (ValueError, OverflowError):
+        return None
+
+
+def resolve(expr: TimeExpr, on: date) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Inclusive (first, last) dates of `expr` with `on` as today. A window
+    reaching back past date.min is open (None) on that side.
+    """
+    if expr.kind == "range":
+        return tuple(_parse_date(d) if d else None for d in expr.args)
+    if expr.kind == "rolling":
+        n, unit = expr.args
+        start = _units_back(on, n, unit)
+        return (start + timedelta(days=1) if start else None), on
+    if expr.kind == "current":
+        return _period_start(on, expr.args[0]), on
+    if expr.kind == "previous":
+        unit = expr.args[0]
+        previous = _units_back(_period_start(on, unit), 1, unit)
+        if previous is None or previous == date.min:
+            return None, None  # no previous period before the first day
+        return _period_start(previous, unit), _period_start(on, unit) - timedelta(days=1)
+    if expr.kind == "day_offset":
+        day = on - timedelta(days=expr.args[0])
+        return day, day
+    if expr.kind == "month":
+        month = expr.args[0]
+        # the most recent such month, this year's if it has started
+        year = on.year if month <= on.month else on.year - 1
+        return _month_bounds(year, month) if year >= date.min.year else (None, None)
+    raise ValueError(f"unknown time expression: {expr.kind}")
+
+
+def _date_id(day: Optional[date]) -> Optional[int]:
+    return day.year * 10000 + day.month * 100 + day.day if day else None
+
+
+def date_id_range(expr: TimeExpr, on: Optional[date] = None) -> DateIdRange:
+    return _date_id_range(expr, on or today())
+
+
+@lru_cache(maxsize=1024)
+def _date_id_range(expr: TimeExpr, on: date) -> DateIdRange:
+    first, last = resolve(expr, on)
+    return _date_id(first), _date_id(last)
+
+
+def parse_date_bound(value) -> Optional[int]:
+    """
+    date_id for an API bound given as an ISO date or a YYYYMMDD date_id
+    (None passes through). Raises ValueError otherwise.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, int) and not isinstance(value, bool):
+        try:
+            return _date_id(date(value // 10000, value // 100 % 100, value % 100))
+        except OverflowError:  # a year past C int range, e.g. 10**30
+            raise ValueError(f"date_id out of range: {value}")
+    return _date_id(date.fromisoformat(str(value)))
+
+
+def date_id_predicate(column: str, date_range: Optional[DateIdRange]) -> Optional[str]:
+    """
+    SQL predicate restricting `column` (a date_id) to the range; None when unbounded.
+    """
+    if date_range is None:
+        return None
+    first, last = date_range
+    if first is not None and last is not None:
+        return f"{column} BETWEEN {int(first)} AND {int(last)}"
+    if first is not None:
+        return f"{column} >= {int(first)}"
+    if last is not None:
+        return f"{column} <= {int(last)}"
+    return None
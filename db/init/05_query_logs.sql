@@ -7,7 +7,7 @@ CREATE TABLE IF NOT EXISTS query_logs (
     question        TEXT,
     raw_sql         TEXT,
     validated_sql   TEXT,
-    status          TEXT NOT NULL, -- success | blocked | error
+    status          TEXT NOT NULL, -- success | blocked | error | cache_hit | coalesced | rejected
     violation_codes TEXT[],
     row_count       INTEGER,
     execution_ms    INTEGER,
@@ -0,0 +1,49 @@
+-- 07_data_versions.sql
+-- Trigger-maintained data version per table, used to invalidate server-side caches
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name  TEXT PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO data_versions (table_name)
+VALUES
+    ('fact_sales'),
+    ('dim_date'),
+    ('dim_region'),
+    ('dim_product')
+ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_data_version() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE data_versions
+       SET version = version + 1,
+           updated_at = NOW()
+     WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level: one bump per write statement, not per row
+DROP TRIGGER IF EXISTS trg_fact_sales_data_version ON fact_sales;
+CREATE TRIGGER trg_fact_sales_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON fact_sales
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS trg_dim_date_data_version ON dim_date;
+CREATE TRIGGER trg_dim_date_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_date
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS trg_dim_region_data_version ON dim_region;
+CREATE TRIGGER trg_dim_region_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_region
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS trg_dim_product_data_version ON dim_product;
+CREATE TRIGGER trg_dim_product_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_product
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+GRANT SELECT ON data_versions TO readonly_user;
@@ -0,0 +1,24 @@
+-- 08_semantic_versions.sql
+-- Track semantic layer changes so the MCP server can refresh its cached model
+
+INSERT INTO data_versions (table_name)
+VALUES
+    ('semantic_metrics'),
+    ('semantic_dimensions'),
+    ('semantic_joins')
+ON CONFLICT DO NOTHING;
+
+DROP TRIGGER IF EXISTS trg_semantic_metrics_data_version ON semantic_metrics;
+CREATE TRIGGER trg_semantic_metrics_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON semantic_metrics
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS trg_semantic_dimensions_data_version ON semantic_dimensions;
+CREATE TRIGGER trg_semantic_dimensions_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON semantic_dimensions
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS trg_semantic_joins_data_version ON semantic_joins;
+CREATE TRIGGER trg_semantic_joins_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON semantic_joins
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
@@ -0,0 +1,101 @@
+-- 09_rollups.sql
+-- Pre-aggregated rollups of fact_sales. query.ask routes a plan to the smallest
+-- rollup that answers it exactly (see mcp_server/app/rollups).
+--
+-- Each rollup keeps additive measures only; COUNT(DISTINCT order_id) runs on
+-- fact_sales (a per-group order set is about as large as fact_sales itself).
+
+CREATE TABLE IF NOT EXISTS rollup_sales_daily (
+    date_id       INTEGER NOT NULL,
+    region_id     INTEGER NOT NULL,
+    product_id    INTEGER NOT NULL,
+    sum_amount    NUMERIC NOT NULL,
+    sum_quantity  BIGINT NOT NULL,
+    row_count     BIGINT NOT NULL,
+    PRIMARY KEY (date_id, region_id, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_sales_monthly (
+    year          INTEGER NOT NULL,
+    month         INTEGER NOT NULL,
+    region_id     INTEGER NOT NULL,
+    product_id    INTEGER NOT NULL,
+    sum_amount    NUMERIC NOT NULL,
+    sum_quantity  BIGINT NOT NULL,
+    row_count     BIGINT NOT NULL,
+    PRIMARY KEY (year, month, region_id, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_sales_region_product (
+    region_id     INTEGER NOT NULL,
+    product_id    INTEGER NOT NULL,
+    sum_amount    NUMERIC NOT NULL,
+    sum_quantity  BIGINT NOT NULL,
+    row_count     BIGINT NOT NULL,
+    PRIMARY KEY (region_id, product_id)
+);
+
+-- Star-schema data version (sum of data_versions for fact_sales + dims) each
+-- rollup was built from. A rollup is only used while this equals the current version.
+CREATE TABLE IF NOT EXISTS rollup_state (
+    rollup_name     TEXT PRIMARY KEY,
+    source_version  BIGINT,
+    row_count       BIGINT NOT NULL DEFAULT 0,
+    refreshed_at    TIMESTAMP
+);
+
+INSERT INTO rollup_state (rollup_name)
+VALUES
+    ('rollup_sales_daily'),
+    ('rollup_sales_monthly'),
+    ('rollup_sales_region_product')
+ON CONFLICT DO NOTHING;
+
+-- Full rebuild of every rollup. Returns the source version it was built from.
+CREATE OR REPLACE FUNCTION refresh_rollups() RETURNS BIGINT AS $$
+DECLARE
+    v BIGINT;
+BEGIN
+    -- read the version first: a write that lands mid-refresh leaves the rollups
+    -- labelled with an older version, i.e. stale (never wrongly fresh)
+    SELECT COALESCE(SUM(version), 0) INTO v
+      FROM data_versions
+     WHERE table_name IN ('fact_sales', 'dim_date', 'dim_region', 'dim_product');
+
+    TRUNCATE rollup_sales_daily, rollup_sales_monthly, rollup_sales_region_product;
+
+    INSERT INTO rollup_sales_daily
+    SELECT f.date_id, f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+     GROUP BY f.date_id, f.region_id, f.product_id;
+
+    INSERT INTO rollup_sales_monthly
+    SELECT d.year, d.month, f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+      JOIN dim_date d ON f.date_id = d.date_id
+     GROUP BY d.year, d.month, f.region_id, f.product_id;
+
+    INSERT INTO rollup_sales_region_product
+    SELECT f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+     GROUP BY f.region_id, f.product_id;
+
+    UPDATE rollup_state s
+       SET source_version = v,
+           refreshed_at = NOW(),
+           row_count = CASE s.rollup_name
+               WHEN 'rollup_sales_daily' THEN (SELECT COUNT(*) FROM rollup_sales_daily)
+               WHEN 'rollup_sales_monthly' THEN (SELECT COUNT(*) FROM rollup_sales_monthly)
+               WHEN 'rollup_sales_region_product' THEN (SELECT COUNT(*) FROM rollup_sales_region_product)
+           END;
+
+    RETURN v;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_rollups();
+
+GRANT SELECT ON rollup_sales_daily, rollup_sales_monthly, rollup_sales_region_product, rollup_state TO readonly_user;
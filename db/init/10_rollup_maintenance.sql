@@ -0,0 +1,247 @@
+-- 10_rollup_maintenance.sql
+-- Incremental rollup maintenance driven by a fact_sales.sale_id watermark.
+--
+-- fold_rollups() upserts only the fact rows above the watermark into every
+-- rollup. It holds a SHARE lock on fact_sales for its (short) transaction:
+-- readers are not blocked, and in-flight inserts finish first, so no row can
+-- commit below the watermark afterwards. UPDATE / DELETE / TRUNCATE on
+-- fact_sales (and changes to dim_date, whose year/month are copied into the
+-- monthly rollup) can't be folded; they flag a full rebuild instead.
+--
+-- Folds and rebuilds serialize on one transaction-level advisory lock, taken
+-- before anything else: a second fold waits, then reads the watermark the
+-- first one committed instead of folding (and double-counting) the same rows.
+-- Lock order is always advisory lock -> fact_sales -> rollup_state, the order
+-- an UPDATE's mark_rollups_for_rebuild() trigger also uses (fact_sales, then
+-- rollup_state), so maintenance can't deadlock with writers.
+--
+-- A full rebuild only reads its watermark under the SHARE lock
+-- (start_rollup_rebuild(), committed right away) and then rebuilds up to it
+-- without blocking inserts (rebuild_rollups()).
+
+ALTER TABLE rollup_state ADD COLUMN IF NOT EXISTS high_water_sale_id BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE rollup_state ADD COLUMN IF NOT EXISTS rebuild_required BOOLEAN NOT NULL DEFAULT TRUE;
+-- last time the rollups included every committed fact row
+ALTER TABLE rollup_state ADD COLUMN IF NOT EXISTS caught_up_at TIMESTAMP;
+ALTER TABLE rollup_state ADD COLUMN IF NOT EXISTS folded_at TIMESTAMP;
+-- between start_rollup_rebuild() and the end of rebuild_rollups()
+ALTER TABLE rollup_state ADD COLUMN IF NOT EXISTS rebuilding BOOLEAN NOT NULL DEFAULT FALSE;
+-- distinct orders are counted on fact_sales: merging per-group order arrays
+-- rewrote each group's whole order history on every fold
+ALTER TABLE rollup_sales_daily DROP COLUMN IF EXISTS order_ids;
+ALTER TABLE rollup_sales_monthly DROP COLUMN IF EXISTS order_ids;
+ALTER TABLE rollup_sales_region_product DROP COLUMN IF EXISTS order_ids;
+
+CREATE OR REPLACE FUNCTION mark_rollups_for_rebuild() RETURNS TRIGGER AS $$
+BEGIN
+    -- during a rebuild, write the flag even if it's set: rebuild_rollups() is
+    -- about to clear it, and this waits for that and sets it again
+    UPDATE rollup_state SET rebuild_required = TRUE WHERE NOT rebuild_required OR rebuilding;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_fact_sales_rollup_rebuild ON fact_sales;
+CREATE TRIGGER trg_fact_sales_rollup_rebuild
+    AFTER UPDATE OR DELETE OR TRUNCATE ON fact_sales
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_rollups_for_rebuild();
+
+DROP TRIGGER IF EXISTS trg_dim_date_rollup_rebuild ON dim_date;
+CREATE TRIGGER trg_dim_date_rollup_rebuild
+    AFTER UPDATE OR DELETE OR TRUNCATE ON dim_date
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_rollups_for_rebuild();
+
+CREATE OR REPLACE FUNCTION _lock_rollup_maintenance() RETURNS VOID AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('rollup_maintenance'));
+END;
+$$ LANGUAGE plpgsql;
+
+-- The watermark for rebuild_rollups(): every fact row up to the returned
+-- sale_id has committed, and no later insert can get a smaller one. Call in
+-- its own transaction and commit, so the SHARE lock is only held for this.
+CREATE OR REPLACE FUNCTION start_rollup_rebuild() RETURNS BIGINT AS $$
+DECLARE
+    hi BIGINT;
+BEGIN
+    LOCK TABLE fact_sales IN SHARE MODE;
+    SELECT COALESCE(MAX(sale_id), 0) INTO hi FROM fact_sales;
+    UPDATE rollup_state SET rebuilding = TRUE;
+    RETURN hi;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION _rollup_state_counts(hi BIGINT, v BIGINT) RETURNS VOID AS $$
+BEGIN
+    UPDATE rollup_state s
+       SET source_version = v,
+           high_water_sale_id = hi,
+           folded_at = NOW(),
+           row_count = CASE s.rollup_name
+               WHEN 'rollup_sales_daily' THEN (SELECT COUNT(*) FROM rollup_sales_daily)
+               WHEN 'rollup_sales_monthly' THEN (SELECT COUNT(*) FROM rollup_sales_monthly)
+               WHEN 'rollup_sales_region_product' THEN (SELECT COUNT(*) FROM rollup_sales_region_product)
+           END;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Full rebuild from the fact rows up to `hi` (start_rollup_rebuild() in an
+-- earlier transaction); returns the source version. DELETE rather than
+-- TRUNCATE so concurrent readers of the rollups keep their snapshot instead
+-- of blocking. Clearing rebuild_required first holds the rollup_state rows:
+-- an UPDATE / DELETE that commits after that waits in its trigger until this
+-- commits, then flags the rebuild again; one that committed before is in the
+-- rows read below.
+CREATE OR REPLACE FUNCTION rebuild_rollups(hi BIGINT) RETURNS BIGINT AS $$
+DECLARE
+    v BIGINT;
+BEGIN
+    PERFORM _lock_rollup_maintenance();
+    UPDATE rollup_state SET rebuild_required = FALSE, rebuilding = FALSE;
+
+    SELECT COALESCE(SUM(version), 0) INTO v
+      FROM data_versions
+     WHERE table_name IN ('fact_sales', 'dim_date', 'dim_region', 'dim_product');
+
+    DELETE FROM rollup_sales_daily;
+    DELETE FROM rollup_sales_monthly;
+    DELETE FROM rollup_sales_region_product;
+
+    INSERT INTO rollup_sales_daily
+    SELECT f.date_id, f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+     WHERE f.sale_id <= hi
+     GROUP BY f.date_id, f.region_id, f.product_id;
+
+    INSERT INTO rollup_sales_monthly
+    SELECT d.year, d.month, f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+      JOIN dim_date d ON f.date_id = d.date_id
+     WHERE f.sale_id <= hi
+     GROUP BY d.year, d.month, f.region_id, f.product_id;
+
+    INSERT INTO rollup_sales_region_product
+    SELECT f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+     WHERE f.sale_id <= hi
+     GROUP BY f.region_id, f.product_id;
+
+    PERFORM _rollup_state_counts(hi, v);
+    UPDATE rollup_state SET refreshed_at = NOW();
+    IF NOT EXISTS (SELECT 1 FROM fact_sales WHERE sale_id > hi) THEN
+        UPDATE rollup_state SET caught_up_at = NOW();
+    END IF;
+
+    RETURN v;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Full rebuild in one transaction (replaces the 09 version): blocks fact_sales
+-- writers throughout, so only for setup and psql; the server runs
+-- start_rollup_rebuild() and rebuild_rollups() as two transactions.
+CREATE OR REPLACE FUNCTION refresh_rollups() RETURNS BIGINT AS $$
+BEGIN
+    PERFORM _lock_rollup_maintenance();
+    RETURN rebuild_rollups(start_rollup_rebuild());
+END;
+$$ LANGUAGE plpgsql;
+
+-- Folds up to max_rows fact rows above the watermark into the rollups.
+-- Returns the number of rows folded, or -1 without folding when a full
+-- rebuild is flagged (the caller runs it; see rebuild_rollups()).
+CREATE OR REPLACE FUNCTION fold_rollups(max_rows BIGINT DEFAULT 100000) RETURNS BIGINT AS $$
+DECLARE
+    v       BIGINT;
+    lo      BIGINT;
+    hi      BIGINT;
+    folded  BIGINT;
+BEGIN
+    -- serializes folds; the watermark below is read after the previous fold committed
+    PERFORM _lock_rollup_maintenance();
+    IF (SELECT bool_or(rebuild_required) FROM rollup_state) THEN
+        RETURN -1;
+    END IF;
+    LOCK TABLE fact_sales IN SHARE MODE;
+
+    SELECT MIN(high_water_sale_id) INTO lo FROM rollup_state;
+
+    SELECT COALESCE(SUM(version), 0) INTO v
+      FROM data_versions
+     WHERE table_name IN ('fact_sales', 'dim_date', 'dim_region', 'dim_product');
+
+    SELECT MAX(sale_id), COUNT(*) INTO hi, folded
+      FROM (SELECT sale_id FROM fact_sales WHERE sale_id > lo ORDER BY sale_id LIMIT max_rows) batch;
+
+    IF hi IS NULL THEN
+        UPDATE rollup_state SET caught_up_at = NOW(), folded_at = NOW(), source_version = v;
+        RETURN 0;
+    END IF;
+
+    INSERT INTO rollup_sales_daily AS t
+    SELECT f.date_id, f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+     WHERE f.sale_id > lo AND f.sale_id <= hi
+     GROUP BY f.date_id, f.region_id, f.product_id
+    ON CONFLICT (date_id, region_id, product_id) DO UPDATE
+       SET sum_amount = t.sum_amount + EXCLUDED.sum_amount,
+           sum_quantity = t.sum_quantity + EXCLUDED.sum_quantity,
+           row_count = t.row_count + EXCLUDED.row_count;
+
+    INSERT INTO rollup_sales_monthly AS t
+    SELECT d.year, d.month, f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+      JOIN dim_date d ON f.date_id = d.date_id
+     WHERE f.sale_id > lo AND f.sale_id <= hi
+     GROUP BY d.year, d.month, f.region_id, f.product_id
+    ON CONFLICT (year, month, region_id, product_id) DO UPDATE
+       SET sum_amount = t.sum_amount + EXCLUDED.sum_amount,
+           sum_quantity = t.sum_quantity + EXCLUDED.sum_quantity,
+           row_count = t.row_count + EXCLUDED.row_count;
+
+    INSERT INTO rollup_sales_region_product AS t
+    SELECT f.region_id, f.product_id,
+           SUM(f.total_amount), SUM(f.quantity), COUNT(*)
+      FROM fact_sales f
+     WHERE f.sale_id > lo AND f.sale_id <= hi
+     GROUP BY f.region_id, f.product_id
+    ON CONFLICT (region_id, product_id) DO UPDATE
+       SET sum_amount = t.sum_amount + EXCLUDED.sum_amount,
+           sum_quantity = t.sum_quantity + EXCLUDED.sum_quantity,
+           row_count = t.row_count + EXCLUDED.row_count;
+
+    PERFORM _rollup_state_counts(hi, v);
+    IF NOT EXISTS (SELECT 1 FROM fact_sales WHERE sale_id > hi) THEN
+        UPDATE rollup_state SET caught_up_at = NOW();
+    END IF;
+
+    RETURN folded;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rollup lag: rows committed above the watermark and how long since the
+-- rollups last included every fact row.
+CREATE OR REPLACE VIEW rollup_lag AS
+SELECT s.rollup_name,
+       s.source_version,
+       s.row_count,
+       s.refreshed_at,
+       s.folded_at,
+       s.high_water_sale_id,
+       s.rebuild_required,
+       behind.rows_behind,
+       CASE WHEN behind.rows_behind = 0 AND NOT s.rebuild_required THEN 0.0
+            ELSE COALESCE(EXTRACT(EPOCH FROM (NOW() - s.caught_up_at))::float8, 'Infinity'::float8)
+       END AS seconds_behind
+  FROM rollup_state s
+ CROSS JOIN LATERAL (
+       SELECT COUNT(*) AS rows_behind FROM fact_sales f WHERE f.sale_id > s.high_water_sale_id
+ ) behind;
+
+SELECT refresh_rollups();
+
+GRANT SELECT ON rollup_lag TO readonly_user;
@@ -0,0 +1,74 @@
+-- 11_fact_sales_partitions.sql
+-- Monthly date_id range partitions for fact_sales, once it has been converted
+-- with db/migrations/partition_fact_sales.sql. On the stock (unpartitioned)
+-- table these functions do nothing.
+--
+-- Partition <table>_pYYYYMM holds date_ids [YYYYMM01, next month's YYYYMM01).
+-- Rows no partition covers land in <table>_default; creating a partition
+-- moves its month out of the default partition first (ATTACH would fail on
+-- them otherwise), so run maintenance ahead of the data to keep that empty.
+
+CREATE OR REPLACE FUNCTION ensure_fact_sales_partitions(parent REGCLASS, first_date_id INTEGER, last_date_id INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    nsp TEXT;
+    rel TEXT;
+    default_part REGCLASS;
+    month_start DATE;
+    stop DATE;
+    lo INTEGER;
+    hi INTEGER;
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = parent) THEN
+        RETURN 0;
+    END IF;
+
+    SELECT n.nspname, c.relname INTO nsp, rel
+      FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+     WHERE c.oid = parent;
+    SELECT i.inhrelid::REGCLASS INTO default_part
+      FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+     WHERE i.inhparent = parent AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT';
+
+    month_start := date_trunc('month', to_date(first_date_id::TEXT, 'YYYYMMDD'))::DATE;
+    stop := to_date(last_date_id::TEXT, 'YYYYMMDD');
+    WHILE month_start <= stop LOOP
+        lo := to_char(month_start, 'YYYYMMDD')::INTEGER;
+        hi := to_char(month_start + INTERVAL '1 month', 'YYYYMMDD')::INTEGER;
+        part_name := rel || '_p' || to_char(month_start, 'YYYYMM');
+
+        IF to_regclass(format('%I.%I', nsp, part_name)) IS NULL THEN
+            IF default_part IS NULL THEN
+                EXECUTE format('CREATE TABLE %I.%I PARTITION OF %s FOR VALUES FROM (%s) TO (%s)',
+                               nsp, part_name, parent, lo, hi);
+            ELSE
+                EXECUTE format('CREATE TABLE %I.%I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                               nsp, part_name, parent);
+                EXECUTE format('WITH moved AS (DELETE FROM %s WHERE date_id >= %s AND date_id < %s RETURNING *) '
+                               'INSERT INTO %I.%I SELECT * FROM moved',
+                               default_part, lo, hi, nsp, part_name);
+                EXECUTE format('ALTER TABLE %s ATTACH PARTITION %I.%I FOR VALUES FROM (%s) TO (%s)',
+                               parent, nsp, part_name, lo, hi);
+            END IF;
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions from the current month through `months_ahead` months ahead.
+-- Returns how many were created (0 when fact_sales isn't partitioned).
+CREATE OR REPLACE FUNCTION maintain_fact_sales_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+BEGIN
+    RETURN ensure_fact_sales_partitions(
+        'fact_sales',
+        to_char(date_trunc('month', CURRENT_DATE), 'YYYYMMDD')::INTEGER,
+        to_char(date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead), 'YYYYMMDD')::INTEGER
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,22 @@
+-- 12_hot_tier.sql
+-- Lets the in-process hot tier (mcp_server/app/hot_tier) tell appends from
+-- rewrites. data_versions.version moves on every write statement;
+-- rewrite_version only on UPDATE / DELETE / TRUNCATE. A fact_sales snapshot
+-- whose rewrite_version still matches catches up by loading the rows above its
+-- sale_id watermark; otherwise it reloads.
+
+ALTER TABLE data_versions ADD COLUMN IF NOT EXISTS rewrite_version BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_rewrite_version() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE data_versions
+       SET rewrite_version = rewrite_version + 1
+     WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_fact_sales_rewrite_version ON fact_sales;
+CREATE TRIGGER trg_fact_sales_rewrite_version
+    AFTER UPDATE OR DELETE OR TRUNCATE ON fact_sales
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_rewrite_version();
@@ -0,0 +1,92 @@
+-- partition_fact_sales.sql (optional, run once after db/init)
+--
+--     psql -d analytics -v ON_ERROR_STOP=1 -f db/migrations/partition_fact_sales.sql
+--
+-- Rebuilds fact_sales range-partitioned by date_id: one partition per month of
+-- data through three months ahead, plus a default partition, so the planner's
+-- date_id range predicates prune whole months. Keep partitions ahead of the
+-- data with maintain_fact_sales_partitions() (db/init/11), e.g.
+-- python -m mcp_server.app.db.partitions.
+--
+-- It copies every row under an ACCESS EXCLUSIVE lock: run it in a maintenance
+-- window. The primary key becomes (sale_id, date_id) because a partitioned
+-- table's unique keys must include the partition key; sale_id still comes
+-- from the same sequence. The rollup watermark (sale_id) and the data version
+-- triggers carry over unchanged.
+
+BEGIN;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'fact_sales'::REGCLASS) THEN
+        RAISE EXCEPTION 'fact_sales is already partitioned';
+    END IF;
+END $$;
+
+LOCK TABLE fact_sales IN ACCESS EXCLUSIVE MODE;
+
+-- the sequence would otherwise be dropped with the old table
+ALTER SEQUENCE fact_sales_sale_id_seq OWNED BY NONE;
+-- recreated below on the new table
+DROP VIEW rollup_lag;
+ALTER TABLE fact_sales RENAME TO fact_sales_unpartitioned;
+
+CREATE TABLE fact_sales (LIKE fact_sales_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    PARTITION BY RANGE (date_id);
+ALTER TABLE fact_sales ADD PRIMARY KEY (sale_id, date_id);
+ALTER TABLE fact_sales ADD CONSTRAINT fact_sales_date_id_fkey FOREIGN KEY (date_id) REFERENCES dim_date (date_id);
+ALTER TABLE fact_sales ADD CONSTRAINT fact_sales_region_id_fkey FOREIGN KEY (region_id) REFERENCES dim_region (region_id);
+ALTER TABLE fact_sales ADD CONSTRAINT fact_sales_product_id_fkey FOREIGN KEY (product_id) REFERENCES dim_product (product_id);
+
+SELECT ensure_fact_sales_partitions(
+    'fact_sales',
+    COALESCE((SELECT MIN(date_id) FROM fact_sales_unpartitioned), to_char(CURRENT_DATE, 'YYYYMMDD')::INTEGER),
+    GREATEST(
+        (SELECT MAX(date_id) FROM fact_sales_unpartitioned),
+        to_char(date_trunc('month', CURRENT_DATE) + INTERVAL '3 months', 'YYYYMMDD')::INTEGER
+    )
+);
+-- created after the monthly partitions so those are plain CREATE ... PARTITION OF
+CREATE TABLE fact_sales_default PARTITION OF fact_sales DEFAULT;
+
+INSERT INTO fact_sales SELECT * FROM fact_sales_unpartitioned;
+DROP TABLE fact_sales_unpartitioned;
+ALTER SEQUENCE fact_sales_sale_id_seq OWNED BY fact_sales.sale_id;
+
+CREATE INDEX idx_fact_sales_date ON fact_sales (date_id);
+CREATE INDEX idx_fact_sales_region ON fact_sales (region_id);
+CREATE INDEX idx_fact_sales_product ON fact_sales (product_id);
+
+-- as in 07_data_versions.sql, 10_rollup_maintenance.sql and 12_hot_tier.sql
+CREATE TRIGGER trg_fact_sales_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON fact_sales
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+CREATE TRIGGER trg_fact_sales_rollup_rebuild
+    AFTER UPDATE OR DELETE OR TRUNCATE ON fact_sales
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_rollups_for_rebuild();
+CREATE TRIGGER trg_fact_sales_rewrite_version
+    AFTER UPDATE OR DELETE OR TRUNCATE ON fact_sales
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_rewrite_version();
+
+CREATE VIEW rollup_lag AS
+SELECT s.rollup_name,
+       s.source_version,
+       s.row_count,
+       s.refreshed_at,
+       s.folded_at,
+       s.high_water_sale_id,
+       s.rebuild_required,
+       behind.rows_behind,
+       CASE WHEN behind.rows_behind = 0 AND NOT s.rebuild_required THEN 0.0
+            ELSE COALESCE(EXTRACT(EPOCH FROM (NOW() - s.caught_up_at))::float8, 'Infinity'::float8)
+       END AS seconds_behind
+  FROM rollup_state s
+ CROSS JOIN LATERAL (
+       SELECT COUNT(*) AS rows_behind FROM fact_sales f WHERE f.sale_id > s.high_water_sale_id
+ ) behind;
+
+GRANT SELECT ON fact_sales, rollup_lag TO readonly_user;
+
+COMMIT;
+
+ANALYZE fact_sales;
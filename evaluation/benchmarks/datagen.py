@@ -0,0 +1,311 @@
+"""
+Synthetic star-schema generator: dim_date, dim_region, dim_product and
+fact_sales at production-like volumes, loaded into their own schema so the
+seed data in `public` (and the golden questions) are left alone.
+
+Usage:
+    python -m evaluation.benchmarks.datagen --rows 1m                 # -> schema scale_1m
+    python -m evaluation.benchmarks.datagen --rows 100m --schema big --replace
+
+Rows accept k / m / b suffixes. fact_sales is generated in numpy batches and
+streamed into COPY through a file-like reader, so memory stays flat whatever
+the scale; primary keys, foreign keys and indexes are built after the load,
+then the schema is ANALYZEd.
+
+Skew (deterministic for a given --seed):
+    products  Zipf(s=1.1) popularity over --products, in --categories categories
+    regions   Zipf(s=0.8) over --regions
+    dates     --days back from 2025-12-31, weekend and December peaks, +30%/yr growth
+    orders    1-6 lines per order (geometric), quantity 1-20 (geometric)
+    prices    per-product list price (lognormal), +-5% per line
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import time
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+import numpy as np
+import psycopg2
+
+from mcp_server.app.telemetry.logger import log_event
+
+BATCH_ROWS = 200_000
+END_DATE = date(2025, 12, 31)
+
+
+def parse_rows(text: str) -> int:
+    text = text.strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("kmb")) * scale)
+
+
+def rows_label(rows: int) -> str:
+    for suffix, scale in (("b", 1_000_000_000), ("m", 1_000_000), ("k", 1_000)):
+        if rows >= scale and rows % scale == 0:
+            return f"{rows // scale}{suffix}"
+    return str(rows)
+
+
+def _connect():
+    # admin credentials, same env vars as mcp_server/app/db/connection.py
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        dbname=os.getenv("DB_NAME", "analytics"),
+        user=os.getenv("DB_USER", "admin"),
+        password=os.getenv("DB_PASSWORD", "admin_password"),
+    )
+
+
+def _zipf_weights(n: int, s: float, rng: np.random.Generator) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** s
+    rng.shuffle(w)  # popularity is not ordered by id
+    return w / w.sum()
+
+
+class _CopyReader(io.RawIOBase):
+    """
+    File-like view over an iterator of encoded chunks, for cursor.copy_expert.
+    Only one chunk is held at a time.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+class StarSchemaGenerator:
+    def __init__(
+        self,
+        rows: int,
+        days: int = 1095,
+        regions: int = 50,
+        products: int = 2000,
+        categories: int = 25,
+        seed: int = 42,
+    ):
+        self.rows = rows
+        self.days = days
+        self.regions = regions
+        self.products = products
+        self.categories = categories
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        self.region_p = _zipf_weights(regions, 0.8, rng)
+        self.product_p = _zipf_weights(products, 1.1, rng)
+        self.product_category = rng.integers(0, categories, size=products)
+        self.product_price = np.round(rng.lognormal(mean=1.5, sigma=0.6, size=products), 2) + 0.5
+
+        self.dates = [END_DATE - timedelta(days=days - 1 - i) for i in range(days)]
+        weight = np.array(
+            [
+                (1.35 if d.weekday() >= 5 else 1.0)
+                * (1.6 if d.month == 12 else 1.0)
+                * 1.3 ** ((d - self.dates[0]).days / 365.0)
+                for d in self.dates
+            ]
+        )
+        self.date_p = weight / weight.sum()
+        self.date_ids = np.array([d.year * 10000 + d.month * 100 + d.day for d in self.dates])
+
+    # ---------- dimensions ----------
+
+    def dim_date(self) -> Iterator[bytes]:
+        lines = [
+            f"{d.year * 10000 + d.month * 100 + d.day}\t{d.isoformat()}\t{d.year}\t{d.month}\t{d.day}\t{d.isocalendar()[1]}\n"
+            for d in self.dates
+        ]
+        yield "".join(lines).encode()
+
+    def dim_region(self) -> Iterator[bytes]:
+        yield "".join(f"{i}\tRegion {i:03d}\n" for i in range(1, self.regions + 1)).encode()
+
+    def dim_product(self) -> Iterator[bytes]:
+        yield "".join(
+            f"{i + 1}\tProduct {i + 1:05d}\tCategory {self.product_category[i] + 1:02d}\n"
+            for i in range(self.products)
+        ).encode()
+
+    # ---------- facts ----------
+
+    def fact_sales(self) -> Iterator[bytes]:
+        """
+        Tab-separated fact rows, BATCH_ROWS at a time. Lines of one order
+        share its date and region.
+        """
+        rng = np.random.default_rng(self.seed + 1)
+        sale_id = 0
+        order_id = 0
+        while sale_id < self.rows:
+            n = min(BATCH_ROWS, self.rows - sale_id)
+
+            lines_per_order = np.minimum(rng.geometric(0.45, size=n), 6)
+            lines_per_order = lines_per_order[np.cumsum(lines_per_order) - lines_per_order < n]
+            order_of_line = np.repeat(np.arange(len(lines_per_order)), lines_per_order)[:n]
+            orders = len(lines_per_order)
+
+            order_date = rng.choice(self.date_ids, size=orders, p=self.date_p)
+            order_region = rng.choice(self.regions, size=orders, p=self.region_p) + 1
+
+            product = rng.choice(self.products, size=n, p=self.product_p)
+            quantity = np.minimum(rng.geometric(0.5, size=n), 20)
+            unit_price = np.round(self.product_price[product] * rng.uniform(0.95, 1.05, size=n), 2)
+            total = np.round(unit_price * quantity, 2)
+
+            ids = np.arange(sale_id + 1, sale_id + n + 1)
+            order_ids = order_of_line + order_id + 1
+            yield "".join(
+                f"{s}\t{dt}\t{rg}\t{p}\tO{o:010d}\t{q}\t{u:.2f}\t{t:.2f}\n"
+                for s, dt, rg, p, o, q, u, t in zip(
+                    ids.tolist(),
+                    order_date[order_of_line].tolist(),
+                    order_region[order_of_line].tolist(),
+                    (product + 1).tolist(),
+                    order_ids.tolist(),
+                    quantity.tolist(),
+                    unit_price.tolist(),
+                    total.tolist(),
+                )
+            ).encode()
+
+            sale_id += n
+            order_id += orders
+
+
+_TABLES = """
+CREATE TABLE {s}.dim_date (
+    date_id INTEGER NOT NULL, date_value DATE NOT NULL, year INTEGER NOT NULL,
+    month INTEGER NOT NULL, day INTEGER NOT NULL, week INTEGER NOT NULL
+);
+CREATE TABLE {s}.dim_region (region_id INTEGER NOT NULL, region_name TEXT NOT NULL);
+CREATE TABLE {s}.dim_product (
+    product_id INTEGER NOT NULL, product_name TEXT NOT NULL, product_category TEXT NOT NULL
+);
+CREATE TABLE {s}.fact_sales (
+    sale_id BIGINT NOT NULL, date_id INTEGER NOT NULL, region_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL, order_id TEXT NOT NULL, quantity INTEGER NOT NULL,
+    unit_price NUMERIC(12,2) NOT NULL, total_amount NUMERIC(12,2) NOT NULL
+);
+"""
+
+# same keys and indexes as db/init/01_schema.sql, built once the data is in
+_CONSTRAINTS = [
+    "ALTER TABLE {s}.dim_date ADD PRIMARY KEY (date_id)",
+    "ALTER TABLE {s}.dim_region ADD PRIMARY KEY (region_id)",
+    "ALTER TABLE {s}.dim_product ADD PRIMARY KEY (product_id)",
+    "ALTER TABLE {s}.fact_sales ADD PRIMARY KEY (sale_id)",
+    "ALTER TABLE {s}.fact_sales ADD FOREIGN KEY (date_id) REFERENCES {s}.dim_date (date_id)",
+    "ALTER TABLE {s}.fact_sales ADD FOREIGN KEY (region_id) REFERENCES {s}.dim_region (region_id)",
+    "ALTER TABLE {s}.fact_sales ADD FOREIGN KEY (product_id) REFERENCES {s}.dim_product (product_id)",
+    "CREATE INDEX ON {s}.fact_sales (date_id)",
+    "CREATE INDEX ON {s}.fact_sales (region_id)",
+    "CREATE INDEX ON {s}.fact_sales (product_id)",
+]
+
+
+def load(generator: StarSchemaGenerator, schema: str, replace: bool = False, conn=None) -> dict:
+    """
+    Creates `schema` and bulk-loads it. Returns timings in seconds.
+    """
+    own = conn is None
+    conn = conn or _connect()
+    timings = {}
+    try:
+        with conn.cursor() as cur:
+            if replace:
+                cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            cur.execute(f"CREATE SCHEMA {schema}")
+            cur.execute(_TABLES.format(s=schema))
+            # the data can be regenerated: don't wait for the WAL flush at commit
+            cur.execute("SET LOCAL synchronous_commit = off")
+
+            for table, chunks in (
+                ("dim_date", generator.dim_date()),
+                ("dim_region", generator.dim_region()),
+                ("dim_product", generator.dim_product()),
+                ("fact_sales", generator.fact_sales()),
+            ):
+                started = time.monotonic()
+                cur.copy_expert(f"COPY {schema}.{table} FROM STDIN", io.BufferedReader(_CopyReader(chunks), 1 << 20))
+                timings[f"copy_{table}"] = round(time.monotonic() - started, 3)
+                log_event({"event": "datagen_copied", "schema": schema, "table": table, "seconds": timings[f"copy_{table}"]})
+
+            started = time.monotonic()
+            cur.execute("SET LOCAL maintenance_work_mem = '512MB'")
+            for statement in _CONSTRAINTS:
+                cur.execute(statement.format(s=schema))
+            timings["indexes"] = round(time.monotonic() - started, 3)
+        conn.commit()
+
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            started = time.monotonic()
+            cur.execute(f"ANALYZE {schema}.dim_date, {schema}.dim_region, {schema}.dim_product, {schema}.fact_sales")
+            timings["analyze"] = round(time.monotonic() - started, 3)
+            # the server's read-only role can query it (benchmarks, ad-hoc checks)
+            cur.execute(f"GRANT USAGE ON SCHEMA {schema} TO readonly_user")
+            cur.execute(f"GRANT SELECT ON ALL TABLES IN SCHEMA {schema} TO readonly_user")
+        conn.autocommit = False
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own:
+            conn.close()
+    return timings
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", required=True, help="fact_sales rows, e.g. 1m, 50m, 500m")
+    parser.add_argument("--schema", default=None, help="target schema (default: scale_<rows>)")
+    parser.add_argument("--replace", action="store_true", help="drop the schema first if it exists")
+    parser.add_argument("--days", type=int, default=1095)
+    parser.add_argument("--regions", type=int, default=50)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--categories", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rows = parse_rows(args.rows)
+    schema = args.schema or f"scale_{rows_label(rows)}"
+    generator = StarSchemaGenerator(
+        rows, days=args.days, regions=args.regions, products=args.products, categories=args.categories, seed=args.seed
+    )
+    started = time.monotonic()
+    timings = load(generator, schema, replace=args.replace)
+    total = time.monotonic() - started
+    log_event(
+        {
+            "event": "datagen_done",
+            "schema": schema,
+            "rows": rows,
+            "seconds": round(total, 3),
+            "rows_per_second": round(rows / total),
+            **timings,
+        }
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""
+Hot tier check and benchmark: every metric x dimension-set plan (with and
+without date ranges) answered by the in-memory engine
+(mcp_server/app/hot_tier) and by Postgres, compared value for value.
+
+Usage:
+    python -m evaluation.benchmarks.hot_tier_bench                     # the live star schema
+    python -m evaluation.benchmarks.datagen --rows 1m
+    python -m evaluation.benchmarks.hot_tier_bench --schema scale_1m [--max-dims 2] [--repeats 3]
+    python -m evaluation.benchmarks.hot_tier_bench --numeric-only       # no database needed
+
+Plans come from the semantic layer and run exactly as query.ask runs them
+(validated SQL with the sanitizer's LIMIT). Results match when the row
+multisets are equal; when the LIMIT cuts a result, ties on the first metric
+at the cut may legitimately differ, so then the metric sequence and every
+row above the cut must match. Exits 1 on any mismatch.
+
+Latency is the median per plan: Postgres execution + fetch vs engine time,
+both warm. The snapshot load time and size are reported too.
+
+Before connecting, engine.numeric_avg is checked against AVG() results
+recorded from Postgres (NUMERIC_AVG_CASES: value and scale), and the exact
+tie-break in engine._descending against float64 ties.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import time
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_service.app.time_ranges import DateIdRange
+from evaluation.benchmarks import datagen
+from mcp_server.app.cache.semantic_cache import semantic_cache
+from mcp_server.app.governance.policies import DEFAULT_POLICY
+from mcp_server.app.governance.validator import validate_sql_cached
+from mcp_server.app.hot_tier import engine
+from mcp_server.app.hot_tier.snapshot import load_snapshot
+from mcp_server.app.semantic.compiler import compile_plan
+
+
+# (sum of total_amount in cents, row count, AVG(total_amount) as Postgres 16 returns it)
+NUMERIC_AVG_CASES: List[Tuple[int, int, str]] = [
+    (12345, 1, "123.4500000000000000"),
+    (-12345, 1, "-123.4500000000000000"),
+    (100, 3, "0.33333333333333333333"),
+    (-100, 3, "-0.33333333333333333333"),
+    (200, 3, "0.66666666666666666667"),
+    (-200, 3, "-0.66666666666666666667"),
+    (5, 2, "0.02500000000000000000"),
+    (-5, 2, "-0.02500000000000000000"),
+    (1, 7, "0.00142857142857142857"),
+    (0, 5, "0.00000000000000000000"),
+    (99999999, 1000000, "0.99999999000000000000"),
+    (999999, 999999, "0.01000000000000000000"),
+    (1, 30000, "0.000000333333333333333333"),
+    (3, 12345678, "0.0000000024300001992600163393"),
+    (123456789012345678, 7, "176366841446208.1114"),
+    (-123456789012345678, 7, "-176366841446208.1114"),
+    (100000000000000000000, 3, "333333333333333333.33"),
+]
+
+# (sums, counts, expected descending order): 1/3 and the double just below it tie as float64
+DESCENDING_CASES: List[Tuple[List[int], List[int], List[int]]] = [
+    ([6004799503160661, 1, 5], [18014398509481984, 3, 1], [2, 1, 0]),
+    ([1, 6004799503160661, 5], [3, 18014398509481984, 1], [2, 0, 1]),
+    ([2, 1, 4], [2, 1, 4], [0, 1, 2]),  # exact ties keep their order
+]
+
+
+def _check_numeric() -> int:
+    """Checks numeric_avg and _descending without a database; returns the mismatches."""
+    mismatches = 0
+    for sum_cents, count, expected in NUMERIC_AVG_CASES:
+        got, want = engine.numeric_avg(sum_cents, count), Decimal(expected)
+        # psycopg2 decodes numeric with its scale, so compare the exponent too
+        if got != want or got.as_tuple().exponent != want.as_tuple().exponent:
+            mismatches += 1
+            print(f"MISMATCH numeric_avg({sum_cents}, {count}): postgres {expected}, hot tier {got}")
+    for sums, counts, expected in DESCENDING_CASES:
+        values = engine.np.array([s / c for s, c in zip(sums, counts)])
+        got = engine._descending(values, None, lambda i: Fraction(sums[i], counts[i])).tolist()
+        if got != expected:
+            mismatches += 1
+            print(f"MISMATCH _descending({sums}, {counts}): expected {expected}, got {got}")
+    print(f"numeric checks: {len(NUMERIC_AVG_CASES) + len(DESCENDING_CASES)} cases, {mismatches} mismatches")
+    return mismatches
+
+
+def _date_id(day: date) -> int:
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def _ranges(first: int, last: int) -> List[Tuple[str, Optional[DateIdRange]]]:
+    end = date(last // 10000, last // 100 % 100, last % 100)
+    return [
+        ("all history", None),
+        ("last 7 days", (_date_id(end - timedelta(days=6)), last)),
+        ("last 90 days", (_date_id(end - timedelta(days=89)), last)),
+        ("since start", (first, None)),
+        ("until first", (None, first)),
+        ("empty", (_date_id(end + timedelta(days=1)), None)),
+    ]
+
+
+def _compare(expected: List[Tuple], actual: List[Tuple], n_dims: int, limit: int) -> Optional[str]:
+    if len(expected) != len(actual):
+        return f"row counts differ: postgres {len(expected)}, hot tier {len(actual)}"
+    first_metric = n_dims
+    if [r[first_metric] for r in expected] != [r[first_metric] for r in actual]:
+        return "first metric sequence differs"
+    if len(expected) < limit:
+        if Counter(expected) != Counter(actual):
+            return "rows differ"
+        return None
+    # cut by LIMIT: rows tied with the last one may be any of the tied groups
+    boundary = expected[-1][first_metric]
+    above = [r for r in expected if r[first_metric] != boundary]
+    if Counter(above) != Counter(r for r in actual if r[first_metric] != boundary):
+        return "rows above the LIMIT cut differ"
+    return None
+
+
+def _types_match(expected: List[Tuple], actual: List[Tuple]) -> bool:
+    return all(
+        type(e) is type(a) for row_e, row_a in zip(expected, actual) for e, a in zip(row_e, row_a)
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default="public", help="schema holding the star schema tables")
+    parser.add_argument("--max-dims", type=int, default=2, help="largest dimension set to combine")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-rows", type=int, default=20000000)
+    parser.add_argument("--statement-timeout-ms", type=int, default=600000)
+    parser.add_argument("--out", default="evaluation/reports/hot_tier_bench.json")
+    parser.add_argument("--numeric-only", action="store_true", help="only run the database-free numeric checks")
+    args = parser.parse_args(argv)
+
+    numeric_mismatches = _check_numeric()
+    if args.numeric_only:
+        return 1 if numeric_mismatches else 0
+
+    semantic = semantic_cache.get()
+    metrics = [m["metric_name"] for m in semantic.metrics]
+    dimensions = [d["dimension_name"] for d in semantic.dimensions]
+    limit = DEFAULT_POLICY.max_limit
+
+    conn = datagen._connect()
+    report: Dict[str, Any] = {"schema": args.schema, "plans": []}
+    mismatches = numeric_mismatches
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SET search_path TO {args.schema}, public")
+            cur.execute(f"SET statement_timeout = {int(args.statement_timeout_ms)}")
+            cur.execute("SELECT MIN(date_id), MAX(date_id) FROM fact_sales")
+            first, last = cur.fetchone()
+        conn.commit()
+
+        started = time.perf_counter()
+        snapshot = load_snapshot(conn, semantic, args.max_rows)
+        report["load"] = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "rows": snapshot.rows,
+            "orders": snapshot.n_orders,
+            "bytes": snapshot.nbytes(),
+        }
+        print(f"loaded {snapshot.rows} rows ({snapshot.nbytes() / 1e6:.1f} MB) in {report['load']['seconds']}s")
+
+        conn.autocommit = True
+        ranges = _ranges(first, last) if first is not None else [("all history", None)]
+        dim_sets = [
+            list(c) for n in range(args.max_dims + 1) for c in itertools.combinations(dimensions, n)
+        ]
+        with conn.cursor() as cur:
+            for metric, dims, (label, date_range) in itertools.product(metrics, dim_sets, ranges):
+                compiled = compile_plan(semantic, [metric], dims, date_range)
+                safe_sql = validate_sql_cached(compiled.sql).sanitized_sql or compiled.sql
+
+                sql_ms = []
+                for _ in range(args.repeats):
+                    t0 = time.perf_counter()
+                    cur.execute(safe_sql)
+                    expected = cur.fetchall()
+                    sql_ms.append((time.perf_counter() - t0) * 1000)
+                hot_ms = []
+                for _ in range(args.repeats):
+                    t0 = time.perf_counter()
+                    result = engine.answer(snapshot, semantic, compiled, limit)
+                    hot_ms.append((time.perf_counter() - t0) * 1000)
+
+                if result is None:
+                    problem = "unsupported"
+                else:
+                    problem = _compare(expected, result["rows"], len(compiled.dimensions), limit)
+                    if problem is None and not _types_match(expected, result["rows"]):
+                        problem = "value types differ"
+                mismatches += problem is not None
+                entry = {
+                    "metric": metric,
+                    "dimensions": dims,
+                    "range": label,
+                    "rows": len(expected),
+                    "sql_ms": round(statistics.median(sql_ms), 3),
+                    "hot_tier_ms": round(statistics.median(hot_ms), 3),
+                    "mismatch": problem,
+                }
+                report["plans"].append(entry)
+                print(
+                    f"{metric:<17}{','.join(dims) or '-':<18}{label:<13}{entry['rows']:>5} rows"
+                    f"{entry['sql_ms']:>11.2f} ms{entry['hot_tier_ms']:>10.2f} ms"
+                    f"{entry['sql_ms'] / max(entry['hot_tier_ms'], 1e-3):>8.1f}x  {problem or 'ok'}"
+                )
+    finally:
+        conn.close()
+
+    plans = report["plans"]
+    report["summary"] = {
+        "plans": len(plans),
+        "mismatches": mismatches,
+        "median_sql_ms": round(statistics.median(p["sql_ms"] for p in plans), 3),
+        "median_hot_tier_ms": round(statistics.median(p["hot_tier_ms"] for p in plans), 3),
+    }
+    print(json.dumps(report["summary"]))
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
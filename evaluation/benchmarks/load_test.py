@@ -0,0 +1,421 @@
+"""
+Open-loop load generator for the MCP tool server.
+
+Requests are fired on a fixed schedule (`--rps`, optionally Poisson arrivals)
+whether or not earlier ones have finished, so a saturated server shows up as
+rising latency and errors instead of a politely slower client. Latency is
+measured from each request's *scheduled* start, which keeps queueing delay in
+the numbers (no coordinated omission). At most `--concurrency` requests are in
+flight; arrivals beyond that are counted as `dropped`.
+
+Usage:
+    # against a running server (docker compose up / uvicorn) and its Postgres
+    python -m evaluation.benchmarks.load_test --url http://localhost:8000 --rps 200 --duration 30
+
+    # in-process through httpx.ASGITransport: app layer only, no sockets
+    python -m evaluation.benchmarks.load_test --in-process --rps 500 --duration 10
+
+    # endpoint mix (relative weights)
+    python -m evaluation.benchmarks.load_test --mix execute=4,ask=2,validate=2,list-metrics=1,semantic-model=1
+
+The report (throughput, latency histogram and percentiles per endpoint, error
+rates, Postgres connection counts from pg_stat_activity and the server's
+/health/pool) is printed and written to --out.
+
+Requests carry X-Priority: batch (the server's admission class, see
+/health/admission) unless --priority says otherwise; admission rejections
+show up as http_429 errors.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import yaml
+
+from ai_service.app.planner import generate_sql_plan
+
+
+DEFAULT_MIX = "execute=4,ask=2,validate=2,list-metrics=1,semantic-model=1"
+
+# latency histogram bucket upper bounds, ms (last bucket is open-ended)
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    body: Callable[[random.Random], Optional[Dict[str, Any]]]
+
+
+@dataclass
+class EndpointStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+    sent: int = 0
+
+
+def _load_questions(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    return [t["question"] for t in cfg.get("tests", [])]
+
+
+def _endpoints(questions: List[str], result_format: str) -> Dict[str, Endpoint]:
+    # SQL is planned once up front so the load is on the server, not the planner
+    planned = [(q, generate_sql_plan(q).sql) for q in questions]
+
+    def execute(rng: random.Random) -> Dict[str, Any]:
+        q, sql = rng.choice(planned)
+        return {"question": q, "sql": sql, "format": result_format}
+
+    def ask(rng: random.Random) -> Dict[str, Any]:
+        return {"question": rng.choice(questions), "format": result_format}
+
+    def validate(rng: random.Random) -> Dict[str, Any]:
+        return {"sql": rng.choice(planned)[1]}
+
+    return {
+        "execute": Endpoint("execute", "POST", "/tools/query/execute", execute),
+        "ask": Endpoint("ask", "POST", "/tools/query/ask", ask),
+        "validate": Endpoint("validate", "POST", "/tools/sql/validate", validate),
+        "list-metrics": Endpoint("list-metrics", "GET", "/tools/catalog/list-metrics", lambda rng: None),
+        "semantic-model": Endpoint("semantic-model", "GET", "/tools/catalog/get-semantic-model", lambda rng: None),
+    }
+
+
+def _parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition("=")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+def _error_of(response: httpx.Response) -> Optional[str]:
+    """
+    None for a success; otherwise "http_<status>" or the tool's error code
+    (tools answer 200 with data.ok == false).
+    """
+    if response.status_code >= 400:
+        return f"http_{response.status_code}"
+    if response.headers.get("content-type", "").startswith("application/json"):
+        data = response.json().get("data")
+        if isinstance(data, dict) and data.get("ok") is False:
+            return f"tool_{data.get('error') or data.get('stage') or 'error'}"
+    return None
+
+
+class ConnectionSampler:
+    """
+    Samples Postgres connection counts (pg_stat_activity, by state) and, when
+    available, the server's own pool stats once per `interval` seconds on a
+    background thread.
+    """
+
+    def __init__(self, interval: float, pool_stats: Optional[Callable[[], Dict[str, Any]]]):
+        self.interval = interval
+        self._pool_stats = pool_stats
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="load-test-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        conn = None
+        try:
+            import psycopg2  # same settings as the server (mcp_server/app/db/connection.py)
+
+            conn = psycopg2.connect(
+                host=os.getenv("DB_HOST", "localhost"),
+                port=int(os.getenv("DB_PORT", "5432")),
+                dbname=os.getenv("DB_NAME", "analytics"),
+                user=os.getenv("DB_USER", "admin"),
+                password=os.getenv("DB_PASSWORD", "admin_password"),
+            )
+            conn.autocommit = True
+        except Exception as e:
+            self.error = f"pg_stat_activity unavailable: {e}"
+
+        while not self._stop.is_set():
+            sample: Dict[str, Any] = {"t": time.monotonic()}
+            if conn is not None:
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            "SELECT COALESCE(state, 'unknown'), COUNT(*) FROM pg_stat_activity "
+                            "WHERE datname = current_database() AND pid <> pg_backend_pid() GROUP BY 1"
+                        )
+                        sample["pg"] = dict(cur.fetchall())
+                except Exception as e:
+                    self.error = str(e)
+            if self._pool_stats is not None:
+                try:
+                    sample["pool"] = self._pool_stats()
+                except Exception as e:
+                    self.error = str(e)
+            self.samples.append(sample)
+            self._stop.wait(self.interval)
+
+        if conn is not None:
+            conn.close()
+
+    def summary(self) -> Dict[str, Any]:
+        pg_totals = [sum(s["pg"].values()) for s in self.samples if "pg" in s]
+        pg_active = [s["pg"].get("active", 0) for s in self.samples if "pg" in s]
+        pools = [s["pool"] for s in self.samples if "pool" in s]
+        out: Dict[str, Any] = {"samples": len(self.samples)}
+        if pg_totals:
+            out["pg_connections"] = {"max": max(pg_totals), "mean": round(float(np.mean(pg_totals)), 1)}
+            out["pg_active"] = {"max": max(pg_active), "mean": round(float(np.mean(pg_active)), 1)}
+        if pools:
+            out["pool"] = {
+                "max_in_use": max(p.get("in_use", 0) for p in pools),
+                "final": pools[-1],
+            }
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+def _histogram(latencies_ms: List[float]) -> Dict[str, int]:
+    counts = np.histogram(latencies_ms, bins=[0] + BUCKETS_MS + [float("inf")])[0]
+    labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+    return {label: int(c) for label, c in zip(labels, counts)}
+
+
+def _latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    if not latencies_ms:
+        return {}
+    arr = np.asarray(latencies_ms)
+    p50, p90, p95, p99 = np.percentile(arr, [50, 90, 95, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(arr.max()), 3),
+        "mean": round(float(arr.mean()), 3),
+    }
+
+
+async def _run_load(
+    client: httpx.AsyncClient,
+    endpoints: Dict[str, Endpoint],
+    mix: List[Tuple[str, float]],
+    rps: float,
+    duration: float,
+    concurrency: int,
+    poisson: bool,
+    seed: int,
+) -> Tuple[Dict[str, EndpointStats], int, float]:
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [w for _, w in mix]
+    stats = {name: EndpointStats() for name in names}
+    in_flight = 0
+    dropped = 0
+    tasks = set()
+
+    async def fire(endpoint: Endpoint, body: Optional[Dict[str, Any]], scheduled: float) -> None:
+        nonlocal in_flight
+        s = stats[endpoint.name]
+        try:
+            response = await client.request(endpoint.method, endpoint.path, json=body)
+            error = _error_of(response)
+        except httpx.TimeoutException:
+            error = "timeout"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        finally:
+            in_flight -= 1
+        s.latencies_ms.append((time.perf_counter() - scheduled) * 1000)
+        if error:
+            s.errors[error] += 1
+
+    started = time.perf_counter()
+    next_at = started
+    end = started + duration
+    while next_at < end:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        endpoint = endpoints[rng.choices(names, weights)[0]]
+        if in_flight >= concurrency:
+            dropped += 1
+        else:
+            in_flight += 1
+            stats[endpoint.name].sent += 1
+            task = asyncio.create_task(fire(endpoint, endpoint.body(rng), next_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        next_at += rng.expovariate(rps) if poisson else 1.0 / rps
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return stats, dropped, time.perf_counter() - started
+
+
+def _report(
+    stats: Dict[str, EndpointStats], dropped: int, elapsed: float, connections: Dict[str, Any], settings: Dict[str, Any]
+) -> Dict[str, Any]:
+    all_latencies = [ms for s in stats.values() for ms in s.latencies_ms]
+    completed = len(all_latencies)
+    errors = sum(sum(s.errors.values()) for s in stats.values())
+    return {
+        "settings": settings,
+        "summary": {
+            "elapsed_seconds": round(elapsed, 3),
+            "offered_rps": settings["rps"],
+            "completed": completed,
+            "throughput_rps": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+            "goodput_rps": round((completed - errors) / elapsed, 2) if elapsed > 0 else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / completed, 4) if completed else 0.0,
+            "dropped": dropped,
+            "latency_ms": _latency_summary(all_latencies),
+            "histogram": _histogram(all_latencies),
+        },
+        "endpoints": {
+            name: {
+                "sent": s.sent,
+                "completed": len(s.latencies_ms),
+                "error_rate": round(sum(s.errors.values()) / len(s.latencies_ms), 4) if s.latencies_ms else 0.0,
+                "errors": dict(s.errors),
+                "latency_ms": _latency_summary(s.latencies_ms),
+                "histogram": _histogram(s.latencies_ms),
+            }
+            for name, s in stats.items()
+        },
+        "connections": connections,
+    }
+
+
+async def _main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    questions = _load_questions(args.questions)
+    endpoints = _endpoints(questions, args.format)
+    mix = _parse_mix(args.mix)
+    unknown = [name for name, _ in mix if name not in endpoints]
+    if unknown:
+        raise SystemExit(f"unknown endpoints in --mix: {unknown} (known: {sorted(endpoints)})")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    headers = {"X-Priority": args.priority}
+    settings = {
+        "target": "in-process" if args.in_process else args.url,
+        "rps": args.rps,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "arrivals": "poisson" if args.poisson else "uniform",
+        "mix": dict(mix),
+        "format": args.format,
+        "priority": args.priority,
+    }
+
+    if args.in_process:
+        from mcp_server.app.db.connection import get_pool
+        from mcp_server.app.main import app
+
+        # ASGITransport doesn't run the lifespan; do it here so the pool,
+        # semantic cache and background writers come up as in the server
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://mcp", timeout=timeout, headers=headers
+            ) as client:
+                sampler = ConnectionSampler(args.sample_interval, lambda: get_pool().stats())
+                sampler.start()
+                try:
+                    stats, dropped, elapsed = await _run_load(
+                        client, endpoints, mix, args.rps, args.duration, args.concurrency, args.poisson, args.seed
+                    )
+                finally:
+                    sampler.stop()
+    else:
+        with httpx.Client(base_url=args.url, timeout=5.0) as health:
+
+            def pool_stats() -> Dict[str, Any]:
+                return health.get("/health/pool").json()["pool"]
+
+            async with httpx.AsyncClient(
+                base_url=args.url, limits=limits, timeout=timeout, headers=headers
+            ) as client:
+                sampler = ConnectionSampler(args.sample_interval, pool_stats)
+                sampler.start()
+                try:
+                    stats, dropped, elapsed = await _run_load(
+                        client, endpoints, mix, args.rps, args.duration, args.concurrency, args.poisson, args.seed
+                    )
+                finally:
+                    sampler.stop()
+
+    return _report(stats, dropped, elapsed, sampler.summary(), settings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("MCP_BASE_URL", "http://localhost:8000"))
+    parser.add_argument("--in-process", action="store_true", help="drive the app through httpx.ASGITransport")
+    parser.add_argument("--rps", type=float, default=50.0, help="offered request rate")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight,...")
+    parser.add_argument("--questions", default="evaluation/golden_questions.yml")
+    parser.add_argument("--format", default="columnar", choices=("rows", "columnar"))
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times")
+    parser.add_argument(
+        "--priority", default="batch", choices=("interactive", "batch", "telemetry"),
+        help="admission class sent as X-Priority",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout, seconds")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="connection sampling period, seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="evaluation/reports/load_test.json")
+    args = parser.parse_args()
+
+    report = asyncio.run(_main_async(args))
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    summary = report["summary"]
+    print(json.dumps({k: v for k, v in summary.items() if k != "histogram"}, indent=2))
+    print(f"{'endpoint':<16}{'sent':>8}{'err%':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, e in report["endpoints"].items():
+        lat = e["latency_ms"]
+        print(
+            f"{name:<16}{e['sent']:>8}{e['error_rate'] * 100:>7.1f}%"
+            f"{lat.get('p50', 0):>10.2f}{lat.get('p95', 0):>10.2f}{lat.get('p99', 0):>10.2f}"
+        )
+    print(f"connections: {json.dumps(report['connections'])}")
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
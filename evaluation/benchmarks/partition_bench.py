@@ -0,0 +1,194 @@
+"""
+Partition-pruning benchmark: planner SQL with and without a date_id range
+(ai_service/app/time_ranges.py) against a generated star schema, both as
+generated (one fact_sales table with idx on date_id) and as a copy whose
+fact_sales is range-partitioned by month like db/migrations/partition_fact_sales.sql.
+
+Usage:
+    python -m evaluation.benchmarks.datagen --rows 1m
+    python -m evaluation.benchmarks.partition_bench --schema scale_1m [--repeats 3] [--rebuild]
+
+The partitioned copy (<schema>_part: partitioned fact_sales, dimension views
+onto <schema>) is built on first use with ensure_fact_sales_partitions()
+from db/init/11_fact_sales_partitions.sql. Relative phrases resolve against
+--today, by default the schema's last date_id.
+
+Per query: median time, and from EXPLAIN (ANALYZE, BUFFERS) the fact rows
+read (returned + filtered out), fact partitions scanned and buffers touched.
+Scan reduction is relative to the same query without a range.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_service.app.planner import _build_sql
+from ai_service.app.time_ranges import DateIdRange, date_id_range, extract_time_range
+from evaluation.benchmarks import datagen
+
+
+_SHAPES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("total_sales", ()),
+    ("total_sales", ("region",)),
+    ("total_orders", ("month",)),
+    ("avg_order_value", ("category",)),
+]
+_PHRASES = ["yesterday", "last 7 days", "last month", "last quarter", "this year", "last year"]
+
+
+def build_partitioned(cur, schema: str, target: str) -> Dict[str, Any]:
+    """
+    Creates `target` with a month-partitioned copy of schema.fact_sales.
+    """
+    started = time.monotonic()
+    cur.execute(f"CREATE SCHEMA {target}")
+    for table in ("dim_date", "dim_region", "dim_product"):
+        cur.execute(f"CREATE VIEW {target}.{table} AS SELECT * FROM {schema}.{table}")
+    cur.execute(f"CREATE TABLE {target}.fact_sales (LIKE {schema}.fact_sales) PARTITION BY RANGE (date_id)")
+    cur.execute(f"SELECT MIN(date_id), MAX(date_id) FROM {schema}.fact_sales")
+    first, last = cur.fetchone()
+    cur.execute("SELECT ensure_fact_sales_partitions(%s, %s, %s)", (f"{target}.fact_sales", first, last))
+    partitions = cur.fetchone()[0]
+    cur.execute(f"CREATE TABLE {target}.fact_sales_default PARTITION OF {target}.fact_sales DEFAULT")
+    cur.execute("SET LOCAL synchronous_commit = off")
+    cur.execute(f"INSERT INTO {target}.fact_sales SELECT * FROM {schema}.fact_sales")
+    cur.execute("SET LOCAL maintenance_work_mem = '512MB'")
+    # same keys and indexes as the migration
+    cur.execute(f"ALTER TABLE {target}.fact_sales ADD PRIMARY KEY (sale_id, date_id)")
+    for column in ("date_id", "region_id", "product_id"):
+        cur.execute(f"CREATE INDEX ON {target}.fact_sales ({column})")
+    cur.connection.commit()
+    cur.execute(f"ANALYZE {target}.fact_sales")
+    cur.execute(f"GRANT USAGE ON SCHEMA {target} TO readonly_user")
+    cur.execute(f"GRANT SELECT ON ALL TABLES IN SCHEMA {target} TO readonly_user")
+    cur.connection.commit()
+    return {"partitions": partitions + 1, "seconds": round(time.monotonic() - started, 3)}
+
+
+def _fact_scans(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    scans = []
+    if str(node.get("Relation Name", "")).startswith("fact_sales"):
+        scans.append(node)
+    for child in node.get("Plans", []):
+        scans += _fact_scans(child)
+    return scans
+
+
+def _scan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    root = plan["Plan"]
+    scans = _fact_scans(root)
+    rows_read = sum(
+        (s.get("Actual Rows", 0) + s.get("Rows Removed by Filter", 0) + s.get("Rows Removed by Index Recheck", 0))
+        * s.get("Actual Loops", 1)
+        for s in scans
+    )
+    return {
+        "fact_rows_read": int(rows_read),
+        "fact_partitions_scanned": len({s["Relation Name"] for s in scans if s.get("Actual Loops", 1)}),
+        "scan_nodes": sorted({s["Node Type"] for s in scans}),
+        "shared_blocks": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "execution_ms": plan.get("Execution Time"),
+    }
+
+
+def _time_query(cur, sql: str, repeats: int) -> Dict[str, Any]:
+    cur.execute(sql)  # warm-up
+    cur.fetchall()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        cur.execute(sql)
+        cur.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+    plan = cur.fetchone()[0][0]
+    return {"ms": round(statistics.median(timings), 3), **_scan_summary(plan)}
+
+
+def bench_variant(cur, schema: str, ranges: List[Tuple[str, Optional[DateIdRange]]], repeats: int) -> List[Dict[str, Any]]:
+    cur.execute(f"SET search_path TO {schema}, public")
+    results = []
+    for metric, dims in _SHAPES:
+        unbounded: Optional[Dict[str, Any]] = None
+        for label, date_range in ranges:
+            sql = _build_sql(metric, list(dims), date_range)
+            entry = {"metric": metric, "dimensions": list(dims), "range": label, "date_range": date_range, "sql": sql}
+            entry.update(_time_query(cur, sql, repeats))
+            if unbounded is None:
+                unbounded = entry
+            else:
+                entry["rows_read_reduction"] = round(1 - entry["fact_rows_read"] / max(1, unbounded["fact_rows_read"]), 4)
+                entry["blocks_reduction"] = round(1 - entry["shared_blocks"] / max(1, unbounded["shared_blocks"]), 4)
+                entry["speedup"] = round(unbounded["ms"] / max(entry["ms"], 1e-3), 2)
+            results.append(entry)
+            print(
+                f"{schema:<16}{metric:<17}{','.join(dims) or '-':<10}{label:<14}{entry['ms']:>10.2f} ms"
+                f"{entry['fact_rows_read']:>10} rows{entry['fact_partitions_scanned']:>4} parts{entry['shared_blocks']:>8} blks"
+                + (f"{entry['rows_read_reduction']:>8.1%} fewer{entry['speedup']:>7.1f}x" if "speedup" in entry else "")
+            )
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default="scale_1m", help="generated schema to benchmark (see datagen)")
+    parser.add_argument("--today", default=None, help="ISO date relative phrases resolve against")
+    parser.add_argument("--phrases", default=",".join(_PHRASES), help="comma-separated time phrases")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the partitioned copy")
+    parser.add_argument("--statement-timeout-ms", type=int, default=600000)
+    parser.add_argument("--out", default="evaluation/reports/partition_bench.json")
+    args = parser.parse_args(argv)
+
+    target = f"{args.schema}_part"
+    conn = datagen._connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT nspname FROM pg_namespace WHERE nspname = %s", (target,))
+            exists = cur.fetchone() is not None
+            build = None
+            if args.rebuild and exists:
+                cur.execute(f"DROP SCHEMA {target} CASCADE")
+                conn.commit()
+                exists = False
+            if not exists:
+                build = build_partitioned(cur, args.schema, target)
+                print(f"built {target}: {build['partitions']} partitions in {build['seconds']}s")
+
+            cur.execute(f"SELECT MAX(date_id) FROM {args.schema}.fact_sales")
+            last = cur.fetchone()[0]
+        conn.commit()
+
+        today = date.fromisoformat(args.today) if args.today else date(last // 10000, last // 100 % 100, last % 100)
+        ranges: List[Tuple[str, Optional[DateIdRange]]] = [("all history", None)]
+        for phrase in (p.strip() for p in args.phrases.split(",") if p.strip()):
+            expr, _ = extract_time_range(phrase)
+            if expr is None:
+                parser.error(f"not a time phrase: {phrase!r}")
+            ranges.append((phrase, date_id_range(expr, on=today)))
+
+        conn.autocommit = True
+        report: Dict[str, Any] = {"schema": args.schema, "today": today.isoformat(), "repeats": args.repeats, "build": build}
+        with conn.cursor() as cur:
+            cur.execute(f"SET statement_timeout = {int(args.statement_timeout_ms)}")
+            report["variants"] = {
+                "unpartitioned": bench_variant(cur, args.schema, ranges, args.repeats),
+                "partitioned": bench_variant(cur, target, ranges, args.repeats),
+            }
+    finally:
+        conn.close()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
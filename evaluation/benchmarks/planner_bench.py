@@ -0,0 +1,116 @@
+"""
+Differential check + throughput benchmark: keyword-automaton planner with
+plan cache vs the legacy substring planner (evaluation/benchmarks/legacy_planner.py).
+
+Usage:
+    python -m evaluation.benchmarks.planner_bench [--questions N] [--distinct N]
+
+Exits non-zero if any synthetic question gets a different plan from the two
+implementations.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from ai_service.app import planner
+from ai_service.app.time_ranges import extract_time_range
+from evaluation.benchmarks import legacy_planner
+
+
+_OPENERS = ["", "what is the ", "show ", "show me ", "give me the ", "how many ", "list ", "What were the "]
+_METRIC_PHRASES = [
+    "total sales", "revenue", "total orders", "number of orders", "order count", "orders",
+    "average order value", "avg sales", "quantity sold", "units", "total quantity",
+]
+_DIMENSION_PHRASES = [
+    "region", "city", "location", "product", "product category", "category", "date", "day",
+    "month", "year", "today", "monthly", "yearly",
+]
+_FILLERS = ["", " please", " in 2025", " for last quarter", "?", " for the board deck", " (excluding returns)"]
+_SPACES = [" ", "  ", "\t", "\n", " ", " "]
+
+
+def _question(rng: random.Random) -> str:
+    dims = rng.sample(_DIMENSION_PHRASES, rng.randint(0, 3))
+    text = rng.choice(_OPENERS) + rng.choice(_METRIC_PHRASES)
+    if dims:
+        text += rng.choice([" by ", " per ", " for each "]) + " and ".join(dims)
+    text += rng.choice(_FILLERS)
+    if rng.random() < 0.3:
+        text = text.upper() if rng.random() < 0.5 else text.title()
+    if rng.random() < 0.3:
+        text = rng.choice(_SPACES).join(text.split(" "))
+    return rng.choice(["", " ", "\n"]) + text + rng.choice(["", " ", "\t"])
+
+
+def _questions(n: int, distinct: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    pool = [_question(rng) for _ in range(distinct)]
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def _plan_tuple(plan) -> tuple:
+    return (plan.metric, tuple(plan.dimensions), plan.sql)
+
+
+def _diff(questions: List[str]) -> int:
+    mismatches = 0
+    for q in dict.fromkeys(questions):
+        # the legacy planner has no time ranges: it gets the question without
+        # its time phrase, and the new plan is compared without its date_id range
+        _, rest = extract_time_range(planner._normalize(q))
+        old = _plan_tuple(legacy_planner.generate_sql_plan(rest))
+        plan = planner.generate_sql_plan(q)
+        new = (plan.metric, tuple(plan.dimensions), planner._build_sql(plan.metric, plan.dimensions))
+        if old != new:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {q!r}\n  legacy:    {old}\n  automaton: {new}")
+    print(f"differential corpus: {len(set(questions))} distinct questions, {mismatches} mismatches")
+    return mismatches
+
+
+def _rate(fn: Callable[[str], object], questions: List[str], before: Callable[[], None] = lambda: None) -> float:
+    best = float("inf")
+    for _ in range(3):
+        before()
+        t0 = time.perf_counter()
+        for q in questions:
+            fn(q)
+        best = min(best, time.perf_counter() - t0)
+    return len(questions) / best
+
+
+def _bench(questions: List[str]) -> None:
+    unique = list(dict.fromkeys(questions))
+    rows = [
+        ("legacy", len(questions), _rate(legacy_planner.generate_sql_plan, questions)),
+        # every question is new: automaton scan + plan build, no cache hits
+        ("automaton, cold", len(unique), _rate(planner.generate_sql_plan, unique, planner._plan_cache.clear)),
+        # realistic mix of repeated questions
+        ("automaton, cached", len(questions), _rate(planner.generate_sql_plan, questions, planner._plan_cache.clear)),
+    ]
+    baseline = rows[0][2]
+    print(f"\n{'planner':<20}{'questions':>10}{'plans/s':>14}{'speedup':>10}")
+    for label, n, rate in rows:
+        print(f"{label:<20}{n:>10}{rate:>14,.0f}{rate / baseline:>9.2f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200_000)
+    parser.add_argument("--distinct", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    questions = _questions(args.questions, args.distinct, args.seed)
+    mismatches = _diff(questions)
+    _bench(questions)
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+"""
+Scale benchmark: every planner metric x dimension combination
+(ai_service/app/planner.py) against star schemas generated by
+evaluation.benchmarks.datagen, with timings and EXPLAIN plans.
+
+Usage:
+    python -m evaluation.benchmarks.datagen --rows 1m
+    python -m evaluation.benchmarks.datagen --rows 10m
+    python -m evaluation.benchmarks.scale_bench --schemas scale_1m,scale_10m [--max-dims 2] [--repeats 3]
+
+    # generate missing schemas first
+    python -m evaluation.benchmarks.scale_bench --rows 1m,10m --generate
+
+Each query is run `--repeats` times (after one warm-up) with the schema first
+on the search_path, exactly as _build_sql emits it; then once more under
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON). Results go to --out.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from ai_service.app.planner import _DIMENSION_COLUMNS, _METRIC_EXPRESSIONS, _build_sql
+from evaluation.benchmarks import datagen
+
+
+def _shapes(max_dims: int) -> List[Tuple[str, Tuple[str, ...]]]:
+    dims = list(_DIMENSION_COLUMNS)
+    return [
+        (metric, combo)
+        for metric in _METRIC_EXPRESSIONS
+        for k in range(max_dims + 1)
+        for combo in itertools.combinations(dims, k)
+    ]
+
+
+def _plan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    root = plan["Plan"]
+    node_types: List[str] = []
+
+    def walk(node: Dict[str, Any]) -> None:
+        node_types.append(node["Node Type"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(root)
+    return {
+        "root": root["Node Type"],
+        "total_cost": root["Total Cost"],
+        "estimated_rows": root["Plan Rows"],
+        "actual_rows": root.get("Actual Rows"),
+        "execution_ms": plan.get("Execution Time"),
+        "planning_ms": plan.get("Planning Time"),
+        "shared_hit_blocks": root.get("Shared Hit Blocks"),
+        "shared_read_blocks": root.get("Shared Read Blocks"),
+        "node_types": node_types,
+    }
+
+
+def bench_schema(cur, schema: str, shapes, repeats: int, statement_timeout_ms: int) -> Dict[str, Any]:
+    cur.execute(f"SET search_path TO {schema}, public")
+    cur.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+    cur.execute("SELECT COUNT(*) FROM fact_sales")
+    rows = cur.fetchone()[0]
+
+    results = []
+    for metric, dims in shapes:
+        sql = _build_sql(metric, list(dims))
+        entry: Dict[str, Any] = {"metric": metric, "dimensions": list(dims), "sql": sql}
+        try:
+            cur.execute(sql)  # warm-up
+            cur.fetchall()
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                cur.execute(sql)
+                result_rows = len(cur.fetchall())
+                timings.append((time.perf_counter() - started) * 1000)
+            cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+            plan = cur.fetchone()[0][0]
+            entry.update(
+                {
+                    "result_rows": result_rows,
+                    "ms": {
+                        "min": round(min(timings), 3),
+                        "median": round(statistics.median(timings), 3),
+                        "max": round(max(timings), 3),
+                    },
+                    "plan": _plan_summary(plan),
+                    "explain": plan,
+                }
+            )
+        except Exception as e:
+            cur.connection.rollback()
+            cur.execute(f"SET search_path TO {schema}, public")
+            cur.execute(f"SET statement_timeout = {int(statement_timeout_ms)}")
+            entry["error"] = str(e).strip()
+        results.append(entry)
+        print(
+            f"{schema:<14}{metric:<18}{','.join(dims) or '-':<22}"
+            + (f"{entry['ms']['median']:>12.2f} ms  {entry['plan']['root']}" if "ms" in entry else f"  {entry['error']}")
+        )
+    return {"schema": schema, "fact_rows": rows, "queries": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schemas", default=None, help="comma-separated schemas to benchmark")
+    parser.add_argument("--rows", default=None, help="scale factors, e.g. 1m,10m,100m (schemas scale_<rows>)")
+    parser.add_argument("--generate", action="store_true", help="generate schemas for --rows that don't exist")
+    parser.add_argument("--max-dims", type=int, default=2, help="largest dimension combination")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--statement-timeout-ms", type=int, default=600000)
+    parser.add_argument("--out", default="evaluation/reports/scale_bench.json")
+    args = parser.parse_args(argv)
+
+    schemas: List[str] = [s for s in (args.schemas or "").split(",") if s]
+    scales = [datagen.parse_rows(r) for r in (args.rows or "").split(",") if r]
+    schemas += [f"scale_{datagen.rows_label(rows)}" for rows in scales]
+    if not schemas:
+        parser.error("give --schemas or --rows")
+
+    conn = datagen._connect()
+    try:
+        if args.generate:
+            with conn.cursor() as cur:
+                cur.execute("SELECT nspname FROM pg_namespace")
+                existing = {row[0] for row in cur.fetchall()}
+            conn.rollback()
+            for rows in scales:
+                schema = f"scale_{datagen.rows_label(rows)}"
+                if schema not in existing:
+                    datagen.load(datagen.StarSchemaGenerator(rows), schema, conn=conn)
+
+        conn.autocommit = True
+        shapes = _shapes(args.max_dims)
+        report = {"max_dims": args.max_dims, "repeats": args.repeats, "scales": []}
+        with conn.cursor() as cur:
+            for schema in schemas:
+                report["scales"].append(bench_schema(cur, schema, shapes, args.repeats, args.statement_timeout_ms))
+    finally:
+        conn.close()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,185 @@
+"""
+Differential check + microbenchmark: single-pass lexer validator vs the
+legacy regex pipeline (evaluation/benchmarks/legacy_validator.py).
+
+Usage:
+    python -m evaluation.benchmarks.validator_bench [--iterations N]
+
+Exits non-zero if any case in SAME_VERDICT_CASES gets a different verdict
+or sanitized SQL from the two implementations, one accepts a case in
+SAME_REJECTION_CASES, or the lexer's sanitized SQL for any case validates
+differently from the case itself (what it accepts is what Postgres runs).
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import timeit
+from typing import Dict, List
+
+from ai_service.app.planner import _build_sql
+from evaluation.benchmarks import legacy_validator
+from mcp_server.app.governance import validator
+
+
+_METRICS = ["total_sales", "total_orders", "avg_order_value", "total_quantity"]
+_DIMENSIONS = ["region", "product", "category", "date", "month", "year"]
+
+
+def _planner_cases() -> List[str]:
+    cases = []
+    for metric in _METRICS:
+        for n in range(0, 3):
+            for dims in itertools.combinations(_DIMENSIONS, n):
+                cases.append(_build_sql(metric, list(dims)))
+    return cases
+
+
+# Cases both implementations must agree on (verdict, violations and sanitized SQL).
+SAME_VERDICT_CASES: List[str] = _planner_cases() + [
+    "",
+    "   ",
+    "SELECT 1",
+    "select * from fact_sales",
+    "SELECT * FROM fact_sales;",
+    "SELECT * FROM fact_sales ;",
+    "SELECT * FROM fact_sales;;",
+    "SELECT * FROM fact_sales LIMIT 10",
+    "SELECT * FROM fact_sales LIMIT 10;",
+    "SELECT * FROM fact_sales LIMIT 5000",
+    "SELECT * FROM fact_sales limit 501;",
+    "SELECT * FROM fact_sales LIMIT 500",
+    "SELECT * FROM public.fact_sales",
+    "SELECT * FROM PUBLIC.FACT_SALES",
+    "SELECT * FROM users",
+    "SELECT * FROM fact_sales f JOIN secrets s ON f.sale_id = s.id",
+    "SELECT * FROM semantic_metrics ORDER BY metric_name",
+    "-- leading comment\nSELECT * FROM fact_sales",
+    "SELECT * FROM fact_sales -- trailing comment",
+    "/* block */ SELECT * FROM fact_sales /* another */",
+    "SELECT * FROM fact_sales; DROP TABLE fact_sales;",
+    "SELECT 1; SELECT 2",
+    "DROP TABLE fact_sales",
+    "DELETE FROM fact_sales",
+    "UPDATE fact_sales SET quantity = 0",
+    "INSERT INTO fact_sales VALUES (1)",
+    "TRUNCATE fact_sales",
+    "ALTER TABLE fact_sales ADD COLUMN x INT",
+    "CREATE TABLE x (id INT)",
+    "GRANT SELECT ON fact_sales TO public",
+    "COPY fact_sales TO '/tmp/x'",
+    "CALL do_something()",
+    "DO $$ BEGIN END $$",
+    "WITH x AS (SELECT 1) SELECT * FROM x",
+    "SELECT pg_sleep(10)",
+    "SELECT * FROM fact_sales WHERE pg_sleep(1) IS NULL",
+    "SELECT * FROM fact_sales; -- trailing",
+    "EXPLAIN SELECT * FROM fact_sales",
+    "SELECT r.region_name FROM fact_sales f JOIN dim_region r ON f.region_id = r.region_id WHERE f.quantity > 2",
+    "SELECT COUNT(*) FROM fact_sales WHERE order_id = 'ORD-001'",
+    "SELECT * FROM pg_read_file('/etc/passwd')",
+    "SELECT * FROM pg_catalog.pg_ls_dir('.') AS t",
+    "SELECT * FROM generate_series(1, 100000000000) g",
+]
+
+# Cases both must reject, though the violations may name different things.
+SAME_REJECTION_CASES: List[str] = [
+    # the regex pipeline reads LATERAL as the relation name
+    "SELECT * FROM fact_sales f JOIN LATERAL pg_ls_dir('/') d ON true",
+]
+
+# Cases where the lexer deliberately disagrees with the regex pipeline.
+INTENDED_DIFFERENCES: Dict[str, str] = {
+    "SELECT 'drop table' AS note FROM fact_sales": "keywords inside string literals are data, not SQL",
+    "SELECT EXTRACT(YEAR FROM d.date_value) FROM dim_date d": "FROM inside EXTRACT() is not a FROM clause",
+    "SELECT * FROM fact_sales f, secrets s": "comma-joined relations are checked against the allowlist",
+    'SELECT * FROM "secrets"': "quoted identifiers are checked against the allowlist",
+    "SELECT * FROM (SELECT * FROM fact_sales LIMIT 10) t": "only a top-level LIMIT caps the result",
+    "SELECT '--not a comment' FROM fact_sales": "comment markers inside strings are kept",
+    # Postgres reads a comment as whitespace; dropping it outright used to glue
+    # the halves into a keyword in the sanitized SQL
+    "SELECT * FR/**/OM pg_shadow": "a comment splits tokens: FR/**/OM is not FROM",
+    "SELECT r.region_name FROM dim_region r JO/**/IN pg_authid a ON true": (
+        "a comment splits tokens: JO/**/IN is not JOIN"
+    ),
+    "SELECT pg_sl/**/eep(5) FROM dim_region": "a comment splits tokens: pg_sl/**/eep is not pg_sleep",
+}
+
+
+def _verdict(result) -> tuple:
+    return (result.is_valid, tuple(result.violations), result.sanitized_sql)
+
+
+def _diff() -> int:
+    mismatches = 0
+    for sql in SAME_VERDICT_CASES:
+        old = _verdict(legacy_validator.validate_sql(sql))
+        new = _verdict(validator.validate_sql(sql))
+        if old != new:
+            mismatches += 1
+            print(f"MISMATCH {sql!r}\n  legacy: {old}\n  lexer:  {new}")
+
+    for sql in SAME_REJECTION_CASES:
+        old = legacy_validator.validate_sql(sql)
+        new = validator.validate_sql(sql)
+        if old.is_valid or new.is_valid:
+            mismatches += 1
+            print(f"MISMATCH {sql!r}\n  legacy: {_verdict(old)}\n  lexer:  {_verdict(new)}")
+
+    for sql in SAME_VERDICT_CASES + SAME_REJECTION_CASES + list(INTENDED_DIFFERENCES):
+        new = validator.validate_sql(sql)
+        if new.is_valid and _verdict(validator.validate_sql(new.sanitized_sql)) != _verdict(new):
+            mismatches += 1
+            print(f"MISMATCH {sql!r}\n  sanitized SQL validates differently: {new.sanitized_sql!r}")
+
+    cases = len(SAME_VERDICT_CASES) + len(SAME_REJECTION_CASES) + len(INTENDED_DIFFERENCES)
+    print(f"differential corpus: {cases} cases, {mismatches} mismatches")
+    print("intended differences:")
+    for sql, why in INTENDED_DIFFERENCES.items():
+        old = _verdict(legacy_validator.validate_sql(sql))
+        new = _verdict(validator.validate_sql(sql))
+        print(f"  - {why}\n      {sql!r}\n      legacy={old}\n      lexer= {new}")
+    return mismatches
+
+
+def _large_query(target_bytes: int = 50 * 1024) -> str:
+    parts = ["SELECT r.region_name"]
+    i = 0
+    while sum(len(p) for p in parts) < target_bytes:
+        parts.append(
+            f", SUM(CASE WHEN f.product_id = {i} AND f.order_id <> 'ORD-{i:05d}' "
+            f"THEN f.total_amount ELSE 0 END) AS product_{i} -- bucket {i}\n"
+        )
+        i += 1
+    parts.append(
+        " FROM fact_sales f JOIN dim_region r ON f.region_id = r.region_id"
+        " /* grouped */ GROUP BY r.region_name ORDER BY 1 LIMIT 1000"
+    )
+    return "".join(parts)
+
+
+def _bench(iterations: int) -> None:
+    short_sql = _build_sql("total_sales", ["region"])
+    large_sql = _large_query()
+    # the lexer leaves a space where each comment was, so only the decision must match
+    assert _verdict(legacy_validator.validate_sql(large_sql))[:2] == _verdict(validator.validate_sql(large_sql))[:2]
+
+    print(f"\n{'query':<10}{'bytes':>8}{'legacy us/op':>16}{'lexer us/op':>16}{'speedup':>10}")
+    for label, sql, n in (("short", short_sql, iterations), ("50KB", large_sql, max(1, iterations // 100))):
+        old = min(timeit.repeat(lambda: legacy_validator.validate_sql(sql), number=n, repeat=5)) / n
+        new = min(timeit.repeat(lambda: validator.validate_sql(sql), number=n, repeat=5)) / n
+        print(f"{label:<10}{len(sql):>8}{old * 1e6:>16.1f}{new * 1e6:>16.1f}{old / new:>9.2f}x")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    mismatches = _diff()
+    _bench(args.iterations)
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
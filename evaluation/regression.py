@@ -0,0 +1,182 @@
+"""
+Latency regression gate for the golden question suite.
+
+Each environment (local, ci, staging, ...) has a baseline file in
+evaluation/baselines/<env>.json holding the per-test `total` latency samples
+of a known-good run. A test regresses when its current samples are
+significantly slower than the baseline's (one-sided Mann-Whitney U, p < alpha)
+AND its p50 grew by more than `threshold` (relative) and `min_delta_ms`.
+Both conditions are needed: the test alone flags tiny-but-consistent shifts,
+the threshold alone flags noise.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BASELINE_DIR = "evaluation/baselines"
+HISTORY_DIR = "evaluation/reports/history"
+
+# fewer samples than this on either side and the U test can't reach any useful p
+MIN_SAMPLES = 5
+
+
+def mann_whitney_greater(current: List[float], baseline: List[float]) -> float:
+    """
+    One-sided p-value that `current` tends to be larger than `baseline`
+    (normal approximation with tie and continuity correction).
+    """
+    x = np.asarray(current, dtype=float)
+    y = np.asarray(baseline, dtype=float)
+    n1, n2 = len(x), len(y)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+
+    combined = np.concatenate([x, y])
+    _, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    # average rank of each group of tied values (1-based)
+    avg_rank = np.cumsum(counts) - (counts - 1) / 2.0
+    ranks = avg_rank[inverse]
+
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    ties = float(((counts ** 3) - counts).sum())
+    sigma = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = (u1 - n1 * n2 / 2.0 - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def baseline_path(env: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{env}.json")
+
+
+def load_baseline(env: str) -> Optional[Dict[str, Any]]:
+    path = baseline_path(env)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(env: str, report: Dict[str, Any]) -> str:
+    baseline = {
+        "env": env,
+        "timestamp": report["timestamp"],
+        "run": report["run"],
+        "tests": {
+            r["id"]: {
+                "p50": r["latency_ms"].get("total", {}).get("p50"),
+                "p95": r["latency_ms"].get("total", {}).get("p95"),
+                "samples_ms": r["samples_ms"],
+            }
+            for r in report["results"]
+        },
+    }
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(env)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+    return path
+
+
+def write_history(env: str, report: Dict[str, Any], keep: int) -> str:
+    """
+    Copies the report into evaluation/reports/history/<env>/ and prunes all
+    but the newest `keep` reports.
+    """
+    directory = os.path.join(HISTORY_DIR, env)
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.fromisoformat(report["timestamp"]).strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, f"{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    reports = sorted(glob.glob(os.path.join(directory, "*.json")))
+    for old in reports[: max(0, len(reports) - keep)]:
+        os.remove(old)
+    return path
+
+
+def _pct(current: Optional[float], baseline: Optional[float]) -> Optional[float]:
+    if current is None or not baseline:
+        return None
+    return round((current - baseline) / baseline * 100.0, 1)
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    alpha: float,
+    min_delta_ms: float,
+) -> List[Dict[str, Any]]:
+    """
+    One diff row per test in the current report.
+    status: ok | regressed | new (not in baseline) | too_few_samples
+    """
+    rows = []
+    for r in report["results"]:
+        current = r["latency_ms"].get("total", {})
+        base = baseline["tests"].get(r["id"])
+        row: Dict[str, Any] = {
+            "id": r["id"],
+            "baseline_p50": base["p50"] if base else None,
+            "baseline_p95": base["p95"] if base else None,
+            "current_p50": current.get("p50"),
+            "current_p95": current.get("p95"),
+            "delta_p50_pct": _pct(current.get("p50"), base["p50"] if base else None),
+            "delta_p95_pct": _pct(current.get("p95"), base["p95"] if base else None),
+            "p_value": None,
+            "status": "ok",
+        }
+        if base is None:
+            row["status"] = "new"
+        elif len(r["samples_ms"]) < MIN_SAMPLES or len(base["samples_ms"]) < MIN_SAMPLES:
+            row["status"] = "too_few_samples"
+        else:
+            p = mann_whitney_greater(r["samples_ms"], base["samples_ms"])
+            row["p_value"] = round(p, 6)
+            delta_ms = row["current_p50"] - row["baseline_p50"]
+            if p < alpha and delta_ms > threshold * row["baseline_p50"] and delta_ms >= min_delta_ms:
+                row["status"] = "regressed"
+        rows.append(row)
+    return rows
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    def num(v: Any) -> str:
+        return "-" if v is None else f"{v:.2f}"
+
+    def pct(v: Any) -> str:
+        return "-" if v is None else f"{v:+.1f}%"
+
+    header = ("test", "base p50", "base p95", "cur p50", "cur p95", "delta p50", "delta p95", "p", "status")
+    lines = [
+        (
+            r["id"],
+            num(r["baseline_p50"]),
+            num(r["baseline_p95"]),
+            num(r["current_p50"]),
+            num(r["current_p95"]),
+            pct(r["delta_p50_pct"]),
+            pct(r["delta_p95_pct"]),
+            "-" if r["p_value"] is None else f"{r['p_value']:.4f}",
+            r["status"],
+        )
+        for r in rows
+    ]
+    widths = [max(len(str(c)) for c in col) for col in zip(header, *lines)]
+    out = []
+    for i, line in enumerate([header] + lines):
+        out.append("  ".join(str(c).ljust(w) if j == 0 else str(c).rjust(w) for j, (c, w) in enumerate(zip(line, widths))))
+        if i == 0:
+            out.append("  ".join("-" * w for w in widths))
+    return "\n".join(out)
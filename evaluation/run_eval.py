@@ -1,16 +1,21 @@
 from __future__ import annotations
 
+import argparse
 import json
 import os
 import re
-import sys
-from dataclasses import dataclass
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+import numpy as np
+import pandas as pd
 import yaml
 
 from ai_service.app.orchestrator import answer_question
+from evaluation import regression
 
 
 @dataclass
@@ -19,6 +24,8 @@ class TestResult:
     ok: bool
     error: str | None
     details: Dict[str, Any]
+    # wall time per stage (plan / validate / execute or ask, total), ms
+    timings_ms: Dict[str, float] = field(default_factory=dict)
 
 
 def _load_yaml(path: str) -> Dict[str, Any]:
@@ -26,10 +33,19 @@ def _load_yaml(path: str) -> Dict[str, Any]:
         return yaml.safe_load(f)
 
 
-def _ensure_columns(rows: List[Dict[str, Any]], expected_cols: List[str]) -> bool:
-    if not rows:
+def _result_frame(result: Any) -> pd.DataFrame:
+    """
+    DataFrame straight from a columnar query.execute payload (no per-row dicts).
+    """
+    if not isinstance(result, dict) or "columns" not in result:
+        return pd.DataFrame()
+    return pd.DataFrame({c["name"]: v for c, v in zip(result["columns"], result["values"])})
+
+
+def _ensure_columns(df: pd.DataFrame, expected_cols: List[str]) -> bool:
+    if df.empty:
         return False
-    cols = set(rows[0].keys())
+    cols = set(df.columns)
     return all(c in cols for c in expected_cols)
 
 
@@ -41,100 +57,282 @@ def _matches_forbidden(sql: str, patterns: List[str]) -> List[str]:
     return hits
 
 
-def run_test(mcp_base_url: str, test: Dict[str, Any]) -> TestResult:
+def _within(actual: Any, expected: float, tolerance: float) -> bool:
+    try:
+        actual = float(actual)
+    except (TypeError, ValueError):
+        return False
+    return abs(actual - expected) <= tolerance * max(1.0, abs(expected))
+
+
+def _compare_values(df: pd.DataFrame, expected_rows: List[Dict[str, Any]], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Each expected row is located by its non-numeric fields (e.g. region_name);
+    its numeric fields must match within `tolerance` (relative, absolute below 1).
+    Returns the mismatches.
+    """
+    mismatches = []
+    for exp in expected_rows:
+        keys = {k: v for k, v in exp.items() if not isinstance(v, (int, float)) or isinstance(v, bool)}
+        numbers = {k: float(v) for k, v in exp.items() if k not in keys}
+
+        missing = [c for c in exp if c not in df.columns]
+        if missing:
+            mismatches.append({"expected": exp, "error": "missing_columns", "columns": missing})
+            continue
+
+        match = df
+        for k, v in keys.items():
+            match = match[match[k] == v]
+        if len(match) != 1:
+            mismatches.append({"expected": exp, "error": "row_not_found", "matching_rows": len(match)})
+            continue
+
+        row = match.iloc[0]
+        for k, v in numbers.items():
+            if not _within(row[k], v, tolerance):
+                mismatches.append({"expected": exp, "column": k, "actual": _jsonable(row[k])})
+    return mismatches
+
+
+def _jsonable(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def run_test(mcp_base_url: str, test: Dict[str, Any], tolerance: float = 0.0, mode: str = "client") -> TestResult:
     test_id = test["id"]
     question = test["question"]
     expect = test.get("expect", {})
 
     try:
-        out = answer_question(mcp_base_url=mcp_base_url, question=question)
+        started = time.perf_counter()
+        out = answer_question(
+            mcp_base_url=mcp_base_url, question=question, result_format="columnar", mode=mode, priority="batch"
+        )
+        timings = {**out.get("timings_ms", {}), "total": round((time.perf_counter() - started) * 1000, 3)}
+        result = _check(test_id, expect, out, float(expect.get("tolerance", tolerance)))
+        result.timings_ms = timings
+        return result
+
+    except Exception as e:
+        return TestResult(id=test_id, ok=False, error="exception", details={"exception": str(e)})
+
 
-        # Basic expectations
-        if expect.get("ok") is True and not out.get("ok", False):
+def _check(test_id: str, expect: Dict[str, Any], out: Dict[str, Any], tolerance: float) -> TestResult:
+    # Basic expectations
+    if expect.get("ok") is True and not out.get("ok", False):
+        return TestResult(
+            id=test_id,
+            ok=False,
+            error="expected_ok_but_failed",
+            details={"response": out},
+        )
+
+    # Forbidden SQL patterns check (on generated + executed SQL)
+    forbidden = expect.get("forbidden_sql_patterns", [])
+    if forbidden:
+        gen_sql = out.get("generated_sql", "") or ""
+        exe_sql = out.get("executed_sql", "") or ""
+        hits = _matches_forbidden(gen_sql + "\n" + exe_sql, forbidden)
+        if hits:
             return TestResult(
                 id=test_id,
                 ok=False,
-                error="expected_ok_but_failed",
-                details={"response": out},
+                error="forbidden_sql_detected",
+                details={"hits": hits, "generated_sql": gen_sql, "executed_sql": exe_sql},
             )
 
-        # Forbidden SQL patterns check (on generated + executed SQL)
-        forbidden = expect.get("forbidden_sql_patterns", [])
-        if forbidden:
-            gen_sql = out.get("generated_sql", "") or ""
-            exe_sql = out.get("executed_sql", "") or ""
-            hits = _matches_forbidden(gen_sql + "\n" + exe_sql, forbidden)
-            if hits:
-                return TestResult(
-                    id=test_id,
-                    ok=False,
-                    error="forbidden_sql_detected",
-                    details={"hits": hits, "generated_sql": gen_sql, "executed_sql": exe_sql},
-                )
-
-        # Row/column checks (only if successful and result rows exist)
-        result = out.get("result", {})
-        rows = result.get("rows", []) if isinstance(result, dict) else []
-
-        min_rows = expect.get("min_rows")
-        if min_rows is not None:
-            if len(rows) < int(min_rows):
-                return TestResult(
-                    id=test_id,
-                    ok=False,
-                    error="min_rows_not_met",
-                    details={"expected_min_rows": min_rows, "actual_rows": len(rows), "response": out},
-                )
-
-        cols = expect.get("columns")
-        if cols:
-            if not _ensure_columns(rows, cols):
-                return TestResult(
-                    id=test_id,
-                    ok=False,
-                    error="missing_expected_columns",
-                    details={"expected_columns": cols, "sample_row": rows[0] if rows else None, "response": out},
-                )
-
-        return TestResult(id=test_id, ok=True, error=None, details={"response": out})
+    # Row/column checks (only if successful and result rows exist)
+    df = _result_frame(out.get("result", {}))
 
-    except Exception as e:
-        return TestResult(id=test_id, ok=False, error="exception", details={"exception": str(e)})
+    min_rows = expect.get("min_rows")
+    if min_rows is not None:
+        if len(df) < int(min_rows):
+            return TestResult(
+                id=test_id,
+                ok=False,
+                error="min_rows_not_met",
+                details={"expected_min_rows": min_rows, "actual_rows": len(df), "response": out},
+            )
 
+    cols = expect.get("columns")
+    if cols:
+        if not _ensure_columns(df, cols):
+            return TestResult(
+                id=test_id,
+                ok=False,
+                error="missing_expected_columns",
+                details={
+                    "expected_columns": cols,
+                    "sample_row": df.iloc[0].to_dict() if not df.empty else None,
+                    "response": out,
+                },
+            )
 
-def main() -> int:
-    cfg_path = os.getenv("EVAL_CONFIG", "evaluation/golden_questions.yml")
-    cfg = _load_yaml(cfg_path)
+    expected_rows = expect.get("expected_values")
+    if expected_rows:
+        mismatches = _compare_values(df, expected_rows, tolerance)
+        if mismatches:
+            return TestResult(
+                id=test_id,
+                ok=False,
+                error="expected_values_mismatch",
+                details={"tolerance": tolerance, "mismatches": mismatches, "response": out},
+            )
 
-    mcp_base_url = cfg.get("config", {}).get("mcp_base_url", "http://localhost:8000")
+    return TestResult(id=test_id, ok=True, error=None, details={"response": out})
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    arr = np.asarray(samples, dtype=float)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(arr.mean()), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+def _stage_percentiles(runs: List[TestResult]) -> Dict[str, Dict[str, float]]:
+    stages: Dict[str, List[float]] = {}
+    for r in runs:
+        for stage, ms in r.timings_ms.items():
+            stages.setdefault(stage, []).append(ms)
+    return {stage: _percentiles(ms) for stage, ms in stages.items()}
+
+
+def _aggregate(test_id: str, runs: List[TestResult]) -> Dict[str, Any]:
+    """
+    One report entry per test: passes only if every repeat passed; details
+    are those of the first failing run (or the last run).
+    """
+    failed = [r for r in runs if not r.ok]
+    shown = failed[0] if failed else runs[-1]
+    return {
+        "id": test_id,
+        "ok": not failed,
+        "error": shown.error,
+        "runs": len(runs),
+        "passed_runs": len(runs) - len(failed),
+        "latency_ms": _stage_percentiles(runs),
+        # raw end-to-end latencies, compared against the baseline's by the regression gate
+        "samples_ms": [r.timings_ms["total"] for r in runs if "total" in r.timings_ms],
+        "details": shown.details,
+    }
+
+
+def _setting(args_value: Any, env: str, cfg: Dict[str, Any], key: str, default: Any) -> Any:
+    # precedence: command line, environment, golden_questions.yml config, default
+    if args_value is not None:
+        return args_value
+    if os.getenv(env) is not None:
+        return type(default)(os.environ[env])
+    return type(default)(cfg.get(key, default))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the golden questions against the MCP server.")
+    parser.add_argument("--config", default=None, help="golden questions file (default: EVAL_CONFIG)")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent questions in flight")
+    parser.add_argument("--repeats", type=int, default=None, help="measured runs per test")
+    parser.add_argument("--warmup", type=int, default=None, help="unmeasured runs per test before timing")
+    parser.add_argument("--mode", choices=("client", "ask"), default=None, help="answer_question mode")
+    parser.add_argument("--env", default=None, help="baseline / history environment name")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the env's baseline")
+    parser.add_argument("--threshold", type=float, default=None, help="relative p50 slowdown that can fail the run")
+    parser.add_argument("--alpha", type=float, default=None, help="significance level of the slowdown test")
+    args = parser.parse_args(argv)
+
+    cfg_path = args.config or os.getenv("EVAL_CONFIG", "evaluation/golden_questions.yml")
+    cfg = _load_yaml(cfg_path)
+    config = cfg.get("config", {})
+
+    mcp_base_url = config.get("mcp_base_url", "http://localhost:8000")
+    tolerance = float(config.get("tolerance", 0.0))
+    workers = max(1, _setting(args.workers, "EVAL_WORKERS", config, "workers", 1))
+    repeats = max(1, _setting(args.repeats, "EVAL_REPEATS", config, "repeats", 1))
+    warmup = max(0, _setting(args.warmup, "EVAL_WARMUP", config, "warmup", 0))
+    mode = _setting(args.mode, "EVAL_MODE", config, "mode", "client")
+    env = _setting(args.env, "EVAL_ENV", config, "env", "local")
+    gate = config.get("regression", {})
+    threshold = _setting(args.threshold, "EVAL_REGRESSION_THRESHOLD", gate, "threshold", 0.2)
+    alpha = _setting(args.alpha, "EVAL_REGRESSION_ALPHA", gate, "alpha", 0.01)
+    min_delta_ms = _setting(None, "EVAL_REGRESSION_MIN_DELTA_MS", gate, "min_delta_ms", 1.0)
     tests = cfg.get("tests", [])
 
-    results: List[TestResult] = []
-    for t in tests:
-        results.append(run_test(mcp_base_url, t))
+    def run(t: Dict[str, Any]) -> TestResult:
+        return run_test(mcp_base_url, t, tolerance=tolerance, mode=mode)
 
-    passed = sum(1 for r in results if r.ok)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # warm-up: connection pools, plan/template caches, prepared statements
+        list(pool.map(run, [t for t in tests for _ in range(warmup)]))
+
+        started = time.perf_counter()
+        runs = list(pool.map(run, [t for t in tests for _ in range(repeats)]))
+        wall_seconds = time.perf_counter() - started
+
+    by_test: Dict[str, List[TestResult]] = {t["id"]: [] for t in tests}
+    for r in runs:
+        by_test[r.id].append(r)
+    results = [_aggregate(test_id, rs) for test_id, rs in by_test.items()]
+
+    passed = sum(1 for r in results if r["ok"])
     failed = len(results) - passed
 
     report = {
         "timestamp": datetime.utcnow().isoformat(),
         "mcp_base_url": mcp_base_url,
-        "summary": {"total": len(results), "passed": passed, "failed": failed},
-        "results": [
-            {"id": r.id, "ok": r.ok, "error": r.error, "details": r.details}
-            for r in results
-        ],
+        "env": env,
+        "run": {"mode": mode, "workers": workers, "repeats": repeats, "warmup": warmup, "tolerance": tolerance},
+        "summary": {
+            "total": len(results),
+            "passed": passed,
+            "failed": failed,
+            "requests": len(runs),
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_qps": round(len(runs) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+            "latency_ms": _stage_percentiles(runs),
+        },
+        "results": results,
     }
 
+    baseline = None if args.update_baseline else regression.load_baseline(env)
+    regressed: List[str] = []
+    if baseline is not None:
+        rows = regression.compare(report, baseline, threshold, alpha, min_delta_ms)
+        regressed = [r["id"] for r in rows if r["status"] == "regressed"]
+        report["summary"]["regressed"] = len(regressed)
+        report["regression"] = {
+            "baseline": regression.baseline_path(env),
+            "baseline_timestamp": baseline["timestamp"],
+            "threshold": threshold,
+            "alpha": alpha,
+            "min_delta_ms": min_delta_ms,
+            "regressed": regressed,
+            "diff": rows,
+        }
+
     os.makedirs("evaluation/reports", exist_ok=True)
     out_path = "evaluation/reports/latest.json"
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2)
+    history_path = regression.write_history(env, report, keep=int(config.get("history_size", 50)))
 
     print(json.dumps(report["summary"], indent=2))
-    print(f"Report written to {out_path}")
+    if baseline is not None:
+        print(f"\nLatency vs baseline {regression.baseline_path(env)} ({baseline['timestamp']}), total ms:")
+        print(regression.format_table(report["regression"]["diff"]))
+    print(f"Report written to {out_path} (history: {history_path})")
+
+    # a baseline is only taken from a clean run; the first clean run of an env seeds it
+    if failed == 0 and (args.update_baseline or regression.load_baseline(env) is None):
+        print(f"Baseline written to {regression.save_baseline(env, report)}")
 
-    return 0 if failed == 0 else 1
+    return 0 if failed == 0 and not regressed else 1
 
 
 if __name__ == "__main__":
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from mcp_server.app.db.repository import fetch_data_versions
+
+
+STAR_SCHEMA_TABLES = ("fact_sales", "dim_date", "dim_region", "dim_product")
+
+
+@dataclass
+class _Entry:
+    value: Dict[str, Any]
+    size_bytes: int
+    data_version: int
+    expires_at: float
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of query results with a memory budget in bytes.
+
+    Entries are tagged with the data version they were computed at; a lookup
+    with a newer version treats the entry as stale and evicts it.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "expired": 0, "evicted": 0, "rejected": 0}
+
+    @staticmethod
+    def key_for(sanitized_sql: str) -> str:
+        return hashlib.sha256(sanitized_sql.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, data_version: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.data_version != data_version:
+                self._remove(key)
+                self._stats["stale"] += 1
+                self._stats["misses"] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.value
+
+    def put(self, key: str, data_version: int, value: Dict[str, Any]) -> bool:
+        size = _estimate_size(value)
+        with self._lock:
+            if size > self.max_bytes:
+                self._stats["rejected"] += 1
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(
+                value=value,
+                size_bytes=size,
+                data_version=data_version,
+                expires_at=time.monotonic() + self.ttl_seconds,
+            )
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evicted"] += 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                **self._stats,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+
+
+class DataVersionTracker:
+    """
+    Reads the combined version of a set of tables, re-checking the database
+    at most once per `check_interval_seconds`.
+    Returns None when the version can't be read, which callers treat as "don't cache".
+    """
+
+    def __init__(
+        self,
+        tables: Iterable[str],
+        check_interval_seconds: float = 1.0,
+        fetch: Callable[[], Dict[str, int]] = fetch_data_versions,
+    ):
+        self.tables = tuple(tables)
+        self.check_interval_seconds = check_interval_seconds
+        self._fetch = fetch
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[int]:
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.check_interval_seconds:
+                return self._version
+        try:
+            versions = self._fetch()
+            version = sum(versions.get(t, 0) for t in self.tables)
+        except Exception:
+            version = None
+        with self._lock:
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+
+def _estimate_size(value: Dict[str, Any]) -> int:
+    return len(json.dumps(value, default=str))
+
+
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")),
+)
+
+star_schema_version = DataVersionTracker(
+    STAR_SCHEMA_TABLES,
+    check_interval_seconds=float(os.getenv("DATA_VERSION_CHECK_INTERVAL_SECONDS", "1.0")),
+)
+
+
+def result_cache_enabled() -> bool:
+    return os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from mcp_server.app.cache.result_cache import DataVersionTracker
+from mcp_server.app.db.repository import (
+    fetch_semantic_dimensions,
+    fetch_semantic_joins,
+    fetch_semantic_metrics,
+)
+
+
+SEMANTIC_TABLES = ("semantic_metrics", "semantic_dimensions", "semantic_joins")
+
+
+@dataclass(frozen=True)
+class SemanticSnapshot:
+    metrics: List[Dict[str, Any]]
+    dimensions: List[Dict[str, Any]]
+    joins: List[Dict[str, Any]]
+    version: Optional[int]
+    etag: str
+
+
+class SemanticModelCache:
+    """
+    In-process copy of the semantic layer (metrics, dimensions, joins).
+
+    Loaded once at startup, reloaded when the semantic tables' data version
+    moves (checked at most every `check_interval_seconds`) or on `refresh()`.
+    """
+
+    def __init__(self, check_interval_seconds: float = 5.0):
+        self._tracker = DataVersionTracker(SEMANTIC_TABLES, check_interval_seconds=check_interval_seconds)
+        self._snapshot: Optional[SemanticSnapshot] = None
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0}
+
+    def get(self) -> SemanticSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+
+        version = self._tracker.current()
+        if version is not None and version != snapshot.version:
+            return self.refresh(version)
+        return snapshot
+
+    def refresh(self, version: Optional[int] = None, force: bool = False) -> SemanticSnapshot:
+        with self._lock:
+            if version is None:
+                version = self._tracker.current()
+            # another thread may have reloaded while we waited for the lock
+            if not force and self._snapshot is not None and version is not None and self._snapshot.version == version:
+                return self._snapshot
+
+            metrics = fetch_semantic_metrics()
+            dimensions = fetch_semantic_dimensions()
+            joins = fetch_semantic_joins()
+            body = json.dumps([metrics, dimensions, joins], sort_keys=True, default=str)
+
+            self._snapshot = SemanticSnapshot(
+                metrics=metrics,
+                dimensions=dimensions,
+                joins=joins,
+                version=version,
+                etag=hashlib.sha256(body.encode("utf-8")).hexdigest()[:32],
+            )
+            self._stats["loads"] += 1
+            return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "etag": snapshot.etag if snapshot else None,
+            **self._stats,
+        }
+
+
+semantic_cache = SemanticModelCache(
+    check_interval_seconds=float(os.getenv("SEMANTIC_CACHE_CHECK_INTERVAL_SECONDS", "5.0")),
+)
@@ -0,0 +1,93 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (leader)
+    runs `fn`; callers arriving while it is in flight wait for and share its
+    return value or exception instead of running `fn` again.
+
+    Nothing is remembered once the call finishes -- that is the result cache's job.
+    Shared values must not be mutated by callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # executions_saved: callers that joined an in-flight call instead of running it
+        self._stats = {"executions": 0, "executions_saved": 0, "errors_shared": 0, "reruns": 0}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        timeout: Optional[float] = None,
+        rerun_on: Tuple[type, ...] = (),
+    ) -> Tuple[Any, bool]:
+        """
+        Returns (value, shared); shared is True for callers that joined another's call.
+
+        A joined caller runs `fn` itself when the call is still in flight after
+        `timeout` seconds. When the call fails with one of `rerun_on` (errors
+        about the leader, not the work), its joined callers start over: one
+        leads a new call and the others join it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self._stats["executions"] += 1
+            else:
+                call.waiters += 1
+                leader = False
+                self._stats["executions_saved"] += 1
+
+        if not leader:
+            finished = call.done.wait(timeout)
+            if not finished or isinstance(call.error, rerun_on):
+                with self._lock:
+                    self._stats["reruns"] += 1
+                    self._stats["executions_saved"] -= 1
+                if not finished:
+                    return fn(), False
+                return self.do(key, fn, timeout, rerun_on)
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is not None and not isinstance(call.error, rerun_on):
+                    self._stats["errors_shared"] += call.waiters
+            call.done.set()
+        return call.value, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+
+query_flights = SingleFlight()
+
+
+def coalescing_enabled() -> bool:
+    return os.getenv("QUERY_COALESCING_ENABLED", "true").lower() in ("1", "true", "yes")
@@ -0,0 +1,254 @@
+"""
+Admission control in front of the warehouse.
+
+Every DB execution takes a slot first. At most `max_concurrent` executions run
+at once across all priority classes, and each class has its own cap, so a
+burst of batch (eval / load test) work always leaves room for interactive
+users. Callers that find no free slot queue per class; a freed slot goes to
+the waiter of the highest-priority class (FIFO within a class) that is under
+its cap.
+
+A caller is rejected with AdmissionRejected (HTTP 429 + Retry-After) instead of
+being left to time out when
+
+- its class's queue is full ("queue_full"),
+- the estimated wait already exceeds its deadline ("deadline"): the queue ahead
+  of it divided by the class's capacity, times the recent average time a slot
+  is held, or
+- it is still queued when the deadline passes ("wait_timeout").
+
+A caller's deadline is its class's max wait, or less if the request asks for it.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, priority: str, reason: str, retry_after_seconds: float):
+        super().__init__(f"{priority} request rejected by admission control: {reason}")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    name: str
+    rank: int  # lower ranks are served first
+    max_concurrent: int
+    max_queue: int
+    max_wait_seconds: float
+
+
+class _Waiter:
+    __slots__ = ("granted",)
+
+    def __init__(self):
+        self.granted = False
+
+
+class _ClassState:
+    def __init__(self, samples: int):
+        self.in_flight = 0
+        self.waiting: Deque[_Waiter] = deque()
+        self.wait_ms: Deque[float] = deque(maxlen=samples)
+        self.stats = {"admitted": 0, "queued": 0, "queue_full": 0, "deadline": 0, "wait_timeout": 0}
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with priority classes and deadline-aware rejection.
+
+        with controller.slot("batch"):
+            ...  # run the query
+    """
+
+    def __init__(self, max_concurrent: int, classes: List[PriorityClass], wait_samples: int = 1024):
+        if max_concurrent < 1:
+            raise ValueError(f"invalid max_concurrent: {max_concurrent}")
+        self.max_concurrent = max_concurrent
+        self.classes: Dict[str, PriorityClass] = {c.name: c for c in sorted(classes, key=lambda c: c.rank)}
+        self._state = {name: _ClassState(wait_samples) for name in self.classes}
+        self._in_flight = 0
+        # exponentially weighted average of how long a slot is held, in seconds
+        self._service_seconds: Optional[float] = None
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self, priority: str, timeout_seconds: Optional[float] = None) -> Iterator[float]:
+        """
+        Holds one execution slot for the body; yields the seconds spent queued.
+        """
+        waited = self.acquire(priority, timeout_seconds)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(priority, time.monotonic() - started)
+
+    def acquire(self, priority: str, timeout_seconds: Optional[float] = None) -> float:
+        cls = self.classes[priority]
+        state = self._state[priority]
+        budget = cls.max_wait_seconds if timeout_seconds is None else min(timeout_seconds, cls.max_wait_seconds)
+        started = time.monotonic()
+        deadline = started + budget
+
+        with self._cond:
+            if not state.waiting and self._has_room(cls):
+                self._admit(cls, 0.0)
+                return 0.0
+            if len(state.waiting) >= cls.max_queue:
+                self._reject(cls, "queue_full")
+            if self._estimated_wait(cls) > budget:
+                self._reject(cls, "deadline")
+
+            waiter = _Waiter()
+            state.waiting.append(waiter)
+            state.stats["queued"] += 1
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    state.waiting.remove(waiter)
+                    self._reject(cls, "wait_timeout")
+                self._cond.wait(remaining)
+
+            waited = time.monotonic() - started
+            state.wait_ms.append(waited * 1000)
+            return waited
+
+    def release(self, priority: str, held_seconds: float) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._state[priority].in_flight -= 1
+            if self._service_seconds is None:
+                self._service_seconds = held_seconds
+            else:
+                self._service_seconds += 0.2 * (held_seconds - self._service_seconds)
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            classes = {}
+            for name, cls in self.classes.items():
+                state = self._state[name]
+                waits = sorted(state.wait_ms)
+                classes[name] = {
+                    "max_concurrent": cls.max_concurrent,
+                    "max_queue": cls.max_queue,
+                    "max_wait_seconds": cls.max_wait_seconds,
+                    "in_flight": state.in_flight,
+                    "queue_depth": len(state.waiting),
+                    "admitted": state.stats["admitted"],
+                    "queued": state.stats["queued"],
+                    "rejected": {
+                        reason: state.stats[reason] for reason in ("queue_full", "deadline", "wait_timeout")
+                    },
+                    "wait_ms": {
+                        "samples": len(waits),
+                        "p50": round(_percentile(waits, 0.50), 3) if waits else 0.0,
+                        "p95": round(_percentile(waits, 0.95), 3) if waits else 0.0,
+                        "max": round(waits[-1], 3) if waits else 0.0,
+                    },
+                    "estimated_wait_ms": round(self._estimated_wait(cls) * 1000, 3),
+                }
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "avg_service_ms": round((self._service_seconds or 0.0) * 1000, 3),
+                "classes": classes,
+            }
+
+    # ---------- internals (hold self._cond) ----------
+
+    def _has_room(self, cls: PriorityClass) -> bool:
+        return self._in_flight < self.max_concurrent and self._state[cls.name].in_flight < cls.max_concurrent
+
+    def _admit(self, cls: PriorityClass, waited_ms: Optional[float]) -> None:
+        self._in_flight += 1
+        state = self._state[cls.name]
+        state.in_flight += 1
+        state.stats["admitted"] += 1
+        if waited_ms is not None:
+            state.wait_ms.append(waited_ms)
+
+    def _dispatch(self) -> None:
+        granted = False
+        for cls in self.classes.values():
+            waiting = self._state[cls.name].waiting
+            while waiting and self._has_room(cls):
+                waiting.popleft().granted = True
+                self._admit(cls, None)  # the waiter records its own wait
+                granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _estimated_wait(self, cls: PriorityClass) -> float:
+        if self._service_seconds is None:
+            return 0.0
+        ahead = 1 + sum(len(self._state[c.name].waiting) for c in self.classes.values() if c.rank <= cls.rank)
+        capacity = min(cls.max_concurrent, self.max_concurrent)
+        return math.ceil(ahead / capacity) * self._service_seconds
+
+    def _reject(self, cls: PriorityClass, reason: str) -> None:
+        self._state[cls.name].stats[reason] += 1
+        raise AdmissionRejected(cls.name, reason, self._estimated_wait(cls))
+
+
+DEFAULT_PRIORITY = "interactive"
+
+
+def _priority_class(name: str, rank: int, max_concurrent: int, max_queue: int, max_wait_seconds: float) -> PriorityClass:
+    prefix = f"ADMISSION_{name.upper()}_"
+    return PriorityClass(
+        name=name,
+        rank=rank,
+        max_concurrent=max(1, int(os.getenv(prefix + "MAX_CONCURRENT", str(max_concurrent)))),
+        max_queue=int(os.getenv(prefix + "MAX_QUEUE", str(max_queue))),
+        max_wait_seconds=float(os.getenv(prefix + "MAX_WAIT_SECONDS", str(max_wait_seconds))),
+    )
+
+
+# leaves pool connections for work outside admission (rollup maintenance, admin refreshes, catalog loads)
+_max_concurrent = int(
+    os.getenv("ADMISSION_MAX_CONCURRENT", str(max(1, int(os.getenv("DB_POOL_MAX_SIZE", "10")) - 2)))
+)
+
+_controller = AdmissionController(
+    max_concurrent=_max_concurrent,
+    classes=[
+        _priority_class("interactive", 0, _max_concurrent, 32, 2.0),
+        # batch leaves two slots that only interactive work can use
+        _priority_class("batch", 1, max(1, _max_concurrent - 2), 256, 30.0),
+        _priority_class("telemetry", 2, 1, 4, 30.0),
+    ],
+)
+
+
+def get_admission() -> AdmissionController:
+    return _controller
+
+
+def admission_enabled() -> bool:
+    return os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def execution_slot(priority: str = DEFAULT_PRIORITY, timeout_seconds: Optional[float] = None) -> Iterator[None]:
+    """
+    Slot for one DB execution (a no-op when ADMISSION_ENABLED is off).
+    """
+    if not admission_enabled():
+        yield
+        return
+    with _controller.slot(priority, timeout_seconds):
+        yield
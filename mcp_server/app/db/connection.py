@@ -1,14 +1,21 @@
 import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
 import psycopg2
 from psycopg2.extensions import connection
 from dotenv import load_dotenv
 
+from mcp_server.app.db.pool import ConnectionPool, PooledConnection
+
 load_dotenv()  # loads mcp_server/.env if present when run from that directory
 
 
-def get_db_connection() -> connection:
+def get_db_connection(connection_factory=None) -> connection:
     """
-    Creates a new DB connection per request.
+    Creates a new, unpooled DB connection.
+    Request handlers should use `pooled_connection()` instead.
     """
     return psycopg2.connect(
         host=os.getenv("DB_HOST", "localhost"),
@@ -16,4 +23,49 @@ def get_db_connection() -> connection:
         dbname=os.getenv("DB_NAME", "analytics"),
         user=os.getenv("DB_USER", "admin"),
         password=os.getenv("DB_PASSWORD", "admin_password"),
+        connection_factory=connection_factory,
     )
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Process-wide connection pool, created lazily from DB_POOL_* env vars.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    connect=lambda: get_db_connection(connection_factory=PooledConnection),
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                    timeout_seconds=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "5")),
+                    max_idle_seconds=float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300")),
+                    max_lifetime_seconds=float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "3600")),
+                )
+    return _pool
+
+
+@contextmanager
+def pooled_connection() -> Iterator[PooledConnection]:
+    """
+    Borrow a connection from the pool; it is rolled back and returned on exit.
+    """
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def open_pool() -> None:
+    get_pool().open()
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
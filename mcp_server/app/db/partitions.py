@@ -0,0 +1,43 @@
+"""
+fact_sales partition maintenance, for deployments that ran
+db/migrations/partition_fact_sales.sql. Keeps monthly date_id partitions
+created ahead of the data so new rows never land in the default partition:
+
+    python -m mcp_server.app.db.partitions --once            # create what's missing, then exit
+    python -m mcp_server.app.db.partitions --interval 3600   # loop
+
+Harmless on an unpartitioned fact_sales (nothing to create).
+"""
+import argparse
+import os
+import time
+
+from mcp_server.app.db.repository import maintain_fact_sales_partitions
+from mcp_server.app.telemetry.logger import log_event
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="create missing partitions once and exit")
+    parser.add_argument(
+        "--months-ahead", type=int, default=int(os.getenv("PARTITION_MONTHS_AHEAD", "3")),
+        help="keep partitions through this many months after the current one",
+    )
+    parser.add_argument("--interval", type=float, default=float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "3600")))
+    args = parser.parse_args()
+
+    while True:
+        try:
+            created = maintain_fact_sales_partitions(args.months_ahead)
+            log_event({"event": "fact_sales_partitions_maintained", "created": created, "months_ahead": args.months_ahead})
+        except Exception as e:
+            if args.once:
+                raise
+            log_event({"event": "fact_sales_partition_maintenance_failed", "error": str(e)})
+        if args.once:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN, connection
+
+
+class PoolExhaustedError(RuntimeError):
+    """
+    Raised when no connection becomes available within the checkout timeout.
+    """
+
+
+class PooledConnection(connection):
+    """
+    psycopg2 connection that carries pool bookkeeping.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        now = time.monotonic()
+        self.created_at = now
+        self.last_used_at = now
+        # SQL text -> server-side prepared statement name (see db/prepared.py)
+        self.prepared_statements: "OrderedDict[str, str]" = OrderedDict()
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections.
+
+    - keeps at least `min_size` connections open (pre-warmed on `open()`)
+    - never holds more than `max_size` connections (idle + checked out)
+    - pings idle connections on checkout and replaces broken ones
+    - recycles connections idle for longer than `max_idle_seconds`
+      or older than `max_lifetime_seconds`
+    - waits up to `timeout_seconds` for a free slot, then raises PoolExhaustedError
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], PooledConnection],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout_seconds: float = 5.0,
+        max_idle_seconds: float = 300.0,
+        max_lifetime_seconds: float = 3600.0,
+        health_check_after_seconds: float = 5.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"invalid pool bounds: min_size={min_size}, max_size={max_size}")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout_seconds = timeout_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.health_check_after_seconds = health_check_after_seconds
+
+        self._idle: Deque[PooledConnection] = deque()
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "broken": 0,
+        }
+
+    # ---------- lifecycle ----------
+
+    def open(self) -> None:
+        """
+        Pre-warm the pool up to `min_size` connections.
+        """
+        with self._cond:
+            self._closed = False
+            missing = self.min_size - (len(self._idle) + self._in_use)
+        for _ in range(max(0, missing)):
+            conn = self._new_connection()
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    # ---------- checkout / checkin ----------
+
+    def getconn(self) -> PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.timeout_seconds
+        waited = False
+
+        while True:
+            conn: Optional[PooledConnection] = None
+            create = False
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolExhaustedError("connection pool is closed")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use + len(self._idle) < self.max_size:
+                        self._in_use += 1
+                        create = True
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolExhaustedError(
+                            f"connection pool exhausted: {self.max_size} connections in use, "
+                            f"none released within {self.timeout_seconds:.1f}s"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    conn = self._new_connection()
+                except Exception:
+                    self._release_slot()
+                    raise
+            elif not self._is_usable(conn):
+                self._discard(conn)
+                self._release_slot()
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                    self._stats["wait_ms_total"] += (time.monotonic() - started) * 1000
+            return conn
+
+    def putconn(self, conn: PooledConnection, broken: bool = False) -> None:
+        """
+        Return a connection. Any open transaction is rolled back so the next
+        borrower starts clean; broken connections are dropped.
+        """
+        if not broken and not conn.closed:
+            try:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                broken = True
+
+        if broken or conn.closed or self._closed:
+            if broken:
+                self._bump("broken")
+            self._discard(conn)
+            self._release_slot()
+            return
+
+        conn.last_used_at = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            broken = bool(conn.closed)
+            raise
+        finally:
+            self.putconn(conn, broken=broken)
+
+    # ---------- stats ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "checkouts": checkouts,
+                "waits": self._stats["waits"],
+                "avg_wait_ms": round(self._stats["wait_ms_total"] / self._stats["waits"], 3)
+                if self._stats["waits"]
+                else 0.0,
+                "timeouts": self._stats["timeouts"],
+                "created": self._stats["created"],
+                "recycled": self._stats["recycled"],
+                "broken": self._stats["broken"],
+            }
+
+    # ---------- internals ----------
+
+    def _new_connection(self) -> PooledConnection:
+        conn = self._connect()
+        self._bump("created")
+        return conn
+
+    def _is_usable(self, conn: PooledConnection) -> bool:
+        now = time.monotonic()
+        if conn.closed or conn.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN:
+            self._bump("broken")
+            return False
+        if now - conn.last_used_at > self.max_idle_seconds or now - conn.created_at > self.max_lifetime_seconds:
+            self._bump("recycled")
+            return False
+        if now - conn.last_used_at < self.health_check_after_seconds:
+            # recently returned healthy; skip the round-trip
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            self._bump("broken")
+            return False
+
+    def _discard(self, conn: PooledConnection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _bump(self, key: str) -> None:
+        with self._cond:
+            self._stats[key] += 1
@@ -0,0 +1,56 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+from mcp_server.app.db.pool import PooledConnection
+
+
+PREPARED_STATEMENTS_PER_CONNECTION = int(os.getenv("PREPARED_STATEMENTS_PER_CONNECTION", "128"))
+
+_stats_lock = threading.Lock()
+_stats = {"prepares": 0, "executions": 0, "deallocations": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def statement_name(sql: str) -> str:
+    return "mcp_" + hashlib.blake2b(sql.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def execute_prepared(cur, sql: str) -> None:
+    """
+    Runs `sql` (no parameters, no trailing ";") through a server-side prepared
+    statement on the cursor's connection, preparing it on first use.
+
+    Prepared names are tracked per pooled connection (LRU, DEALLOCATEd on
+    eviction). Prepared statements survive ROLLBACK, so the cache stays valid
+    for the life of the connection; a recycled connection starts empty.
+    """
+    conn: PooledConnection = cur.connection
+    prepared: "OrderedDict[str, str]" = conn.prepared_statements
+
+    name = prepared.get(sql)
+    if name is None:
+        name = statement_name(sql)
+        cur.execute(f"PREPARE {name} AS {sql}")
+        prepared[sql] = name
+        _count("prepares")
+        while len(prepared) > PREPARED_STATEMENTS_PER_CONNECTION:
+            _, evicted = prepared.popitem(last=False)
+            cur.execute(f"DEALLOCATE {evicted}")
+            _count("deallocations")
+    else:
+        prepared.move_to_end(sql)
+
+    cur.execute(f"EXECUTE {name}")
+    _count("executions")
+
+
+def prepared_statement_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {"max_per_connection": PREPARED_STATEMENTS_PER_CONNECTION, **_stats}
@@ -1,7 +1,7 @@
 from typing import List, Dict, Any
 from psycopg2.extras import RealDictCursor
 
-from mcp_server.app.db.connection import get_db_connection
+from mcp_server.app.db.connection import pooled_connection
 
 
 def fetch_semantic_metrics() -> List[Dict[str, Any]]:
@@ -14,11 +14,117 @@ def fetch_semantic_metrics() -> List[Dict[str, Any]]:
         ORDER BY metric_name;
     """
 
-    conn = get_db_connection()
-    try:
+    with pooled_connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(query)
             rows = cur.fetchall()
             return [dict(r) for r in rows]
-    finally:
-        conn.close()
+
+
+def fetch_semantic_dimensions() -> List[Dict[str, Any]]:
+    """
+    Returns governed dimensions from the semantic layer.
+    """
+    query = """
+        SELECT dimension_name, description, table_name, column_name, data_type
+        FROM semantic_dimensions
+        ORDER BY dimension_name;
+    """
+
+    with pooled_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query)
+            rows = cur.fetchall()
+            return [dict(r) for r in rows]
+
+
+def fetch_semantic_joins() -> List[Dict[str, Any]]:
+    """
+    Returns approved fact -> dimension joins from the semantic layer.
+    """
+    query = """
+        SELECT join_name, left_table, right_table, join_condition
+        FROM semantic_joins
+        ORDER BY join_name;
+    """
+
+    with pooled_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query)
+            rows = cur.fetchall()
+            return [dict(r) for r in rows]
+
+
+def fetch_data_versions() -> Dict[str, int]:
+    """
+    Returns the trigger-maintained version of each tracked table
+    (bumped on every write statement, see db/init/07_data_versions.sql).
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT table_name, version FROM data_versions;")
+            return {name: int(version) for name, version in cur.fetchall()}
+
+
+def fetch_rollup_state() -> List[Dict[str, Any]]:
+    """
+    Returns each rollup's size, watermark and lag behind fact_sales
+    (see db/init/09_rollups.sql and 10_rollup_maintenance.sql).
+    """
+    query = """
+        SELECT rollup_name, source_version, row_count, refreshed_at, folded_at,
+               high_water_sale_id, rebuild_required, rows_behind, seconds_behind
+        FROM rollup_lag
+        ORDER BY rollup_name;
+    """
+
+    with pooled_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query)
+            return [dict(r) for r in cur.fetchall()]
+
+
+def refresh_rollups() -> int:
+    """
+    Rebuilds every rollup table; returns the source version they now reflect.
+    The sale_id watermark is read (under a SHARE lock on fact_sales) and
+    committed first, so the rebuild itself doesn't block inserts.
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT start_rollup_rebuild();")
+            high_water = cur.fetchone()[0]
+        conn.commit()
+        with conn.cursor() as cur:
+            cur.execute("SELECT rebuild_rollups(%s);", (high_water,))
+            version = cur.fetchone()[0]
+        conn.commit()
+        return int(version)
+
+
+def fold_rollups(max_rows: int) -> int:
+    """
+    Folds up to `max_rows` new fact_sales rows into the rollups.
+    Returns the rows folded, or -1 if a full rebuild was required and done.
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT fold_rollups(%s);", (max_rows,))
+            folded = cur.fetchone()[0]
+        conn.commit()
+    if folded < 0:
+        refresh_rollups()
+    return int(folded)
+
+
+def maintain_fact_sales_partitions(months_ahead: int) -> int:
+    """
+    Creates the monthly fact_sales partitions through `months_ahead` months
+    ahead; returns how many were created (0 if fact_sales isn't partitioned).
+    """
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT maintain_fact_sales_partitions(%s);", (months_ahead,))
+            created = cur.fetchone()[0]
+        conn.commit()
+        return int(created)
@@ -1,7 +1,8 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from psycopg2.extras import execute_values
 
-from mcp_server.app.db.connection import get_db_connection
+from mcp_server.app.db.admission import execution_slot
+from mcp_server.app.db.connection import pooled_connection
 
 
 def insert_query_log(
@@ -14,8 +15,7 @@ def insert_query_log(
     row_count: Optional[int],
     execution_ms: Optional[int],
 ):
-    conn = get_db_connection()
-    try:
+    with pooled_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -43,5 +43,37 @@ def insert_query_log(
                 ),
             )
             conn.commit()
-    finally:
-        conn.close()
+
+
+QUERY_LOG_COLUMNS = (
+    "tool_name",
+    "status",
+    "question",
+    "raw_sql",
+    "validated_sql",
+    "violation_codes",
+    "row_count",
+    "execution_ms",
+    "created_at",
+)
+
+
+def insert_query_logs(rows: List[Tuple]) -> int:
+    """
+    Bulk insert of query_logs rows (tuples ordered as QUERY_LOG_COLUMNS)
+    in a single statement and commit. Runs in the "telemetry" admission class,
+    so under load query_logs writes yield to query execution.
+    """
+    if not rows:
+        return 0
+
+    with execution_slot("telemetry"), pooled_connection() as conn:
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                f"INSERT INTO query_logs ({', '.join(QUERY_LOG_COLUMNS)}) VALUES %s",
+                rows,
+                page_size=max(len(rows), 100),
+            )
+            conn.commit()
+    return len(rows)
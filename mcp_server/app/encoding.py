@@ -0,0 +1,85 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
+
+import orjson
+
+try:  # optional: only needed for format=arrow
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+
+# Postgres type OIDs (pg_type) that are returned as Decimal by psycopg2
+NUMERIC_OID = 1700
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def json_default(value: Any) -> Any:
+    """
+    JSON fallback for values psycopg2 returns that json can't encode natively.
+    Matches FastAPI's encoder: Decimal -> float, dates/times -> ISO 8601.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_line(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=json_default, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Fast JSON encoding (orjson: native date/datetime, Decimal via json_default).
+    """
+    return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def columns_meta(description: Sequence) -> List[Dict[str, Any]]:
+    return [{"name": d.name, "type_oid": d.type_code} for d in description]
+
+
+def to_records(columns: List[Dict[str, Any]], rows: List[tuple]) -> List[Dict[str, Any]]:
+    names = [c["name"] for c in columns]
+    return [dict(zip(names, r)) for r in rows]
+
+
+def to_columnar(columns: List[Dict[str, Any]], rows: List[tuple]) -> List[List[Any]]:
+    """
+    Transposes row tuples into one value list per column. NUMERIC columns are
+    converted to float once here instead of per value in the encoder.
+    """
+    if not rows:
+        return [[] for _ in columns]
+    values = [list(col) for col in zip(*rows)]
+    for i, c in enumerate(columns):
+        if c["type_oid"] == NUMERIC_OID:
+            values[i] = [float(v) if v is not None else None for v in values[i]]
+    return values
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def to_arrow_ipc(columns: List[Dict[str, Any]], values: List[List[Any]], metadata: Dict[str, str]) -> bytes:
+    """
+    Arrow IPC stream (one record batch) built from columnar values.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    table = pa.Table.from_arrays(
+        [pa.array(v) for v in values],
+        names=[c["name"] for c in columns],
+        metadata={k: str(v) for k, v in metadata.items()},
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
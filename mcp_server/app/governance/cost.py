@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp_server.app.governance.policies import SqlPolicy
+
+
+@dataclass(frozen=True)
+class CostEstimate:
+    """
+    Planner estimates from EXPLAIN (FORMAT JSON).
+
+    total_cost: the root node's total cost (includes LIMIT short-circuiting)
+    estimated_rows: the largest row estimate of any plan node, i.e. the most
+        rows the query is expected to push through one step (a LIMIT 500 over a
+        full sort of fact_sales still estimates the whole table here)
+    """
+
+    total_cost: float
+    estimated_rows: float
+
+
+def _max_rows(node: Dict[str, Any]) -> float:
+    return max([node.get("Plan Rows", 0)] + [_max_rows(child) for child in node.get("Plans", [])])
+
+
+def explain(cur, sql: str) -> CostEstimate:
+    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = cur.fetchone()[0][0]["Plan"]
+    return CostEstimate(total_cost=float(plan["Total Cost"]), estimated_rows=float(_max_rows(plan)))
+
+
+def budget_violations(estimate: CostEstimate, policy: SqlPolicy) -> List[str]:
+    if policy.max_total_cost is not None and estimate.total_cost > policy.max_total_cost:
+        return ["cost_budget_exceeded"]
+    if policy.max_estimated_rows is not None and estimate.estimated_rows > policy.max_estimated_rows:
+        return ["cost_budget_exceeded"]
+    return []
+
+
+def budget_details(estimate: CostEstimate, policy: SqlPolicy) -> Dict[str, Any]:
+    return {
+        "total_cost": estimate.total_cost,
+        "estimated_rows": estimate.estimated_rows,
+        "max_total_cost": policy.max_total_cost,
+        "max_estimated_rows": policy.max_estimated_rows,
+    }
+
+
+class ExplainCache:
+    """
+    LRU of EXPLAIN estimates keyed on the SQL text hash. query.ask SQL comes
+    from per-shape templates, so in practice there is one entry per plan shape.
+
+    Entries carry the star-schema data version they were taken at; after a
+    write the next lookup re-plans (row estimates follow the data).
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[Optional[int], CostEstimate]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_explain(self, cur, sql: str, data_version: Optional[int]) -> CostEstimate:
+        key = hashlib.blake2b(sql.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and data_version is not None and entry[0] == data_version:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        estimate = explain(cur, sql)
+
+        with self._lock:
+            self._entries[key] = (data_version, estimate)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return estimate
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+explain_cache = ExplainCache(max_entries=int(os.getenv("EXPLAIN_CACHE_SIZE", "4096")))
+
+
+def check_cost_budget(cur, sql: str, policy: SqlPolicy, data_version: Optional[int]) -> Tuple[List[str], Optional[CostEstimate]]:
+    """
+    Violations (["cost_budget_exceeded"] or []) for running `sql` under
+    `policy`, plus the estimate. No EXPLAIN at all when the policy sets no budget.
+    """
+    if policy.max_total_cost is None and policy.max_estimated_rows is None:
+        return [], None
+    estimate = explain_cache.get_or_explain(cur, sql, data_version)
+    return budget_violations(estimate, policy), estimate
@@ -0,0 +1,280 @@
+import re
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Optional, Set, Tuple
+
+
+# One alternation, tried left to right at each position; leading whitespace is
+# consumed by the same match. Unterminated strings, quoted identifiers and
+# block comments run to the end of the input.
+_TOKEN_RE = re.compile(
+    r"""
+    \s*
+    (?:
+      (?P<line_comment>--[^\n]*)
+    | (?P<block_comment>/\*.*?(?:\*/|\Z))
+    | (?P<estring>[Ee]'(?:[^'\\]|\\.|'')*(?:'|\Z))
+    | (?P<string>(?:[BbXxNn]|[Uu]&)?'(?:[^']|'')*(?:'|\Z))
+    | (?P<dollar>\$(?P<tag>[A-Za-z_][A-Za-z0-9_]*)?\$.*?\$(?P=tag)\$)
+    | (?P<param>\$\d+)
+    | (?P<qident>(?:[Uu]&)?"(?:[^"]|"")*(?:"|\Z))
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[Ee][+-]?\d+)?)
+    | (?P<word>[A-Za-z_\u0080-\uffff][A-Za-z0-9_$\u0080-\uffff]*)
+    | (?P<punct>[(),;.])
+    | (?P<op>.)
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# keywords that end a FROM list (after which a comma no longer introduces a table)
+_FROM_LIST_END = frozenset({
+    "WHERE", "GROUP", "HAVING", "WINDOW", "ORDER", "LIMIT", "OFFSET", "FETCH",
+    "UNION", "INTERSECT", "EXCEPT", "FOR", "RETURNING",
+})
+# modifiers allowed between FROM/JOIN and the relation name
+_RELATION_MODIFIERS = frozenset({"LATERAL", "ONLY"})
+# keywords that end a top-level ORDER BY list
+_ORDER_BY_END = frozenset({"LIMIT", "OFFSET", "FETCH", "FOR"})
+
+
+@dataclass
+class LimitClause:
+    value: int
+    start: int  # span of "LIMIT <n>" within `SqlScan.stripped`
+    end: int
+
+
+@dataclass
+class OrderByClause:
+    # top-level ORDER BY items, each as its (kind, text) tokens
+    items: List[List[Tuple[str, str]]]
+    start: int  # span of "ORDER BY ..." within `SqlScan.stripped`
+    end: int
+
+
+@dataclass
+class SqlScan:
+    """
+    Everything the validator needs, gathered in one pass over the SQL.
+    """
+
+    stripped: str
+    statement_count: int = 0
+    first_word: Optional[str] = None
+    found_words: Set[str] = field(default_factory=set)
+    tables: List[str] = field(default_factory=list)
+    # indexes into `tables` of names called as functions (FROM generate_series(...))
+    table_functions: Set[int] = field(default_factory=set)
+    limit: Optional[LimitClause] = None
+    order_by: Optional[OrderByClause] = None
+
+
+def scan_sql(sql: str, watch_words: FrozenSet[str] = frozenset()) -> SqlScan:
+    """
+    Tokenize `sql` once and collect:
+    - the SQL with comments removed (`stripped`, outer whitespace trimmed)
+    - the number of non-empty `;`-separated statements
+    - the first keyword
+    - which of `watch_words` (uppercase) occur as bare words or quoted identifiers
+    - relation names after FROM / JOIN / FROM-list commas (schema dropped, lowercased),
+      including set-returning function calls there (marked in `table_functions`)
+    - the top-level numeric LIMIT, if any
+    - the top-level ORDER BY items, if any
+
+    String literals, dollar-quoted bodies and comments never produce findings.
+    """
+    pieces: List[str] = []
+    kept_from = 0
+    out_len = 0  # length of text emitted to `pieces` so far
+
+    statement_count = 0
+    statement_open = False
+    first_word: Optional[str] = None
+    found: Set[str] = set()
+    tables: List[str] = []
+    table_functions: Set[int] = set()
+    limit: Optional[LimitClause] = None
+
+    depth = 0
+    # per paren depth: has a SELECT been seen (so FROM starts a FROM clause)
+    select_frames: List[bool] = [False]
+    # per paren depth: currently inside a FROM list
+    from_frames: List[bool] = [False]
+
+    expect_relation = False  # next name is a relation (after FROM/JOIN/comma)
+    pending: Optional[List[str]] = None  # dotted name being collected
+    pending_dot = False  # last token of `pending` was "."
+    after_limit = False
+    limit_at = 0
+    order_by: Optional[OrderByClause] = None
+    order_by_open = False  # collecting ORDER BY items
+    after_order = False  # last token was a top-level ORDER
+    order_at = 0
+
+    for m in _TOKEN_RE.finditer(sql):
+        kind = m.lastgroup
+
+        if kind == "line_comment" or kind == "block_comment":
+            # a comment is whitespace to Postgres: "FR/**/OM" must not become FROM
+            chunk = sql[kept_from:m.start(kind)] + " "
+            pieces.append(chunk)
+            out_len += len(chunk)
+            kept_from = m.end()
+            continue
+
+        text = m.group(kind)
+
+        # ---- close a pending relation name ----
+        if pending is not None:
+            if kind == "punct" and text == "." and not pending_dot:
+                pending_dot = True
+                continue
+            if pending_dot and kind in ("word", "qident"):
+                pending.append(_ident(kind, text))
+                pending_dot = False
+                continue
+            if kind == "punct" and text == "(":
+                # a function call in relation position: checked like a relation
+                table_functions.add(len(tables))
+            tables.append(pending[-1].lower())
+            pending = None
+            pending_dot = False
+
+        if kind == "punct" and text == ";":
+            # any ";" ends a statement, even inside unbalanced parens
+            statement_open = False
+            depth = 0
+            select_frames = [False]
+            from_frames = [False]
+            expect_relation = False
+            after_limit = False
+            if order_by_open:
+                order_by.end = out_len + (m.start(kind) - kept_from)
+                order_by_open = False
+            continue
+
+        if order_by_open:
+            if depth == 0 and kind == "word" and text.upper() in _ORDER_BY_END:
+                order_by.end = out_len + (m.start(kind) - kept_from)
+                order_by_open = False
+            elif depth == 0 and kind == "punct" and text == ",":
+                order_by.items.append([])
+            elif not text.isspace():
+                order_by.items[-1].append((kind, text))
+        elif after_order:
+            after_order = False
+            if kind == "word" and text.upper() == "BY" and order_by is None:
+                order_by = OrderByClause(items=[[]], start=order_at, end=-1)
+                order_by_open = True
+        elif depth == 0 and kind == "word" and text.upper() == "ORDER":
+            after_order = True
+            order_at = out_len + (m.start(kind) - kept_from)
+
+        if not statement_open:
+            statement_open = True
+            statement_count += 1
+            if statement_count == 1 and kind == "word":
+                first_word = text.upper()
+
+        if kind == "word":
+            upper = text.upper()
+            if upper in watch_words:
+                found.add(upper)
+
+            if after_limit:
+                after_limit = False
+
+            if upper == "SELECT":
+                select_frames[-1] = True
+                from_frames[-1] = False
+            elif upper == "FROM":
+                if select_frames[-1]:
+                    from_frames[-1] = True
+                    expect_relation = True
+            elif upper == "JOIN":
+                expect_relation = True
+            elif upper == "LIMIT" and depth == 0:
+                after_limit = True
+                limit_at = out_len + (m.start(kind) - kept_from)
+            elif expect_relation and upper in _RELATION_MODIFIERS:
+                pass
+            elif expect_relation:
+                pending = [text]
+                expect_relation = False
+            elif upper in _FROM_LIST_END:
+                from_frames[-1] = False
+            continue
+
+        if kind == "qident":
+            name = _ident(kind, text)
+            if name.upper() in watch_words:
+                found.add(name.upper())
+            if expect_relation:
+                pending = [name]
+                expect_relation = False
+            after_limit = False
+            continue
+
+        if kind == "number":
+            if after_limit and depth == 0 and limit is None:
+                # offsets within the comment-free output
+                end = out_len + (m.end(kind) - kept_from)
+                limit = LimitClause(value=int(float(text)), start=limit_at, end=end)
+            after_limit = False
+            continue
+
+        after_limit = False
+
+        if kind == "punct":
+            if text == "(":
+                depth += 1
+                select_frames.append(False)
+                from_frames.append(False)
+                expect_relation = False
+            elif text == ")":
+                if depth > 0:
+                    depth -= 1
+                    select_frames.pop()
+                    from_frames.pop()
+                expect_relation = False
+            elif text == "," and from_frames[-1]:
+                expect_relation = True
+            continue
+
+        # strings, params, operators: nothing to collect
+        expect_relation = False
+
+    if pending is not None:
+        tables.append(pending[-1].lower())
+
+    pieces.append(sql[kept_from:])
+    joined = "".join(pieces)
+    lead = len(joined) - len(joined.lstrip())
+    stripped = joined.strip()
+    if limit is not None:
+        limit.start -= lead
+        limit.end -= lead
+    if order_by is not None:
+        if order_by.end < 0:
+            order_by.end = len(joined)
+        order_by.start -= lead
+        order_by.end = min(order_by.end - lead, len(stripped))
+
+    return SqlScan(
+        stripped=stripped,
+        statement_count=statement_count,
+        first_word=first_word,
+        found_words=found,
+        tables=tables,
+        table_functions=table_functions,
+        limit=limit,
+        order_by=order_by,
+    )
+
+
+def _ident(kind: str, text: str) -> str:
+    if kind == "qident":
+        if text[:2] in ('U&', 'u&'):
+            text = text[2:]
+        return text[1:-1].replace('""', '"') if text.endswith('"') and len(text) > 1 else text[1:]
+    return text
@@ -1,16 +1,34 @@
-from dataclasses import dataclass
-from typing import Set
+import os
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import FrozenSet, Optional
 
 
 @dataclass(frozen=True)
 class SqlPolicy:
-    allowed_tables: Set[str]
+    allowed_tables: FrozenSet[str]
     max_limit: int = 500
     enforce_limit: bool = True
+    # set-returning functions allowed where a relation goes (FROM / JOIN); none by default
+    allowed_table_functions: FrozenSet[str] = frozenset()
+    # pre-execution cost gate on EXPLAIN estimates (None = no budget); see governance/cost.py
+    max_total_cost: Optional[float] = None
+    max_estimated_rows: Optional[float] = None
+    statement_timeout_ms: int = 3000
+
+    @cached_property
+    def allowed_tables_lower(self) -> FrozenSet[str]:
+        return frozenset(t.lower() for t in self.allowed_tables)
+
+
+def _budget(env: str, default: str) -> Optional[float]:
+    # 0 (or empty) disables the budget
+    value = float(os.getenv(env, default) or 0)
+    return value if value > 0 else None
 
 
 DEFAULT_POLICY = SqlPolicy(
-    allowed_tables={
+    allowed_tables=frozenset({
         "fact_sales",
         "dim_date",
         "dim_region",
@@ -18,7 +36,14 @@ DEFAULT_POLICY = SqlPolicy(
         "semantic_metrics",
         "semantic_dimensions",
         "semantic_joins",
-    },
+    }),
     max_limit=500,
     enforce_limit=True,
+    max_total_cost=_budget("SQL_MAX_TOTAL_COST", "1000000"),
+    max_estimated_rows=_budget("SQL_MAX_ESTIMATED_ROWS", "50000000"),
+    statement_timeout_ms=int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "3000")),
 )
+
+# query.execute with pagination: the caller's own LIMIT (if any) caps the whole
+# result; each page query is limited to max_limit rows instead
+PAGED_POLICY = replace(DEFAULT_POLICY, enforce_limit=False)
@@ -1,7 +1,11 @@
-import re
+import hashlib
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+from mcp_server.app.governance.lexer import SqlScan, scan_sql
 from mcp_server.app.governance.policies import SqlPolicy, DEFAULT_POLICY
 
 
@@ -12,85 +16,54 @@ class ValidationResult:
     sanitized_sql: Optional[str] = None
 
 
+# reported in this order when several are present (first one wins)
 _DISALLOWED_KEYWORDS = [
-    r"\bINSERT\b",
-    r"\bUPDATE\b",
-    r"\bDELETE\b",
-    r"\bDROP\b",
-    r"\bTRUNCATE\b",
-    r"\bALTER\b",
-    r"\bCREATE\b",
-    r"\bGRANT\b",
-    r"\bREVOKE\b",
-    r"\bCOPY\b",
-    r"\bCALL\b",
-    r"\bDO\b",
+    "INSERT",
+    "UPDATE",
+    "DELETE",
+    "DROP",
+    "TRUNCATE",
+    "ALTER",
+    "CREATE",
+    "GRANT",
+    "REVOKE",
+    "COPY",
+    "CALL",
+    "DO",
 ]
 
+_DISALLOWED_FUNCTIONS: Dict[str, str] = {
+    "PG_SLEEP": "pg_sleep",
+}
 
-def _strip_sql_comments(sql: str) -> str:
-    # remove -- comments
-    sql = re.sub(r"--.*?$", "", sql, flags=re.MULTILINE)
-    # remove /* */ comments
-    sql = re.sub(r"/\*.*?\*/", "", sql, flags=re.DOTALL)
-    return sql.strip()
+_WATCH_WORDS = frozenset(_DISALLOWED_KEYWORDS) | frozenset(_DISALLOWED_FUNCTIONS)
 
 
-def _extract_table_names(sql: str) -> List[str]:
-    """
-    Very lightweight table extraction:
-    - captures identifiers after FROM/JOIN
-    - handles schema.table by taking the last segment
-    """
-    pattern = r"\b(?:FROM|JOIN)\s+([a-zA-Z_][\w\.]*)"
-    matches = re.findall(pattern, sql, flags=re.IGNORECASE)
-    tables = []
-    for m in matches:
-        base = m.split(".")[-1]  # drop schema if present
-        tables.append(base.lower())
-    return tables
-
-
-def _has_select_only(sql: str) -> bool:
-    sql_clean = sql.strip().rstrip(";").strip()
-    return sql_clean.upper().startswith("SELECT")
-
-
-def _has_multiple_statements(sql: str) -> bool:
-    # crude: more than one semicolon (after stripping comments)
-    parts = [p.strip() for p in sql.split(";") if p.strip()]
-    return len(parts) > 1
-
-
-def _contains_disallowed(sql: str) -> Optional[str]:
+def _contains_disallowed(scan: SqlScan) -> Optional[str]:
     for kw in _DISALLOWED_KEYWORDS:
-        if re.search(kw, sql, flags=re.IGNORECASE):
-            return kw.strip(r"\b")
+        if kw in scan.found_words:
+            return kw
     return None
 
 
-def _ensure_limit(sql: str, max_limit: int) -> Tuple[str, bool]:
+def _ensure_limit(scan: SqlScan, max_limit: int) -> Tuple[str, bool]:
     """
     Enforce LIMIT if missing. If present and higher than max_limit, clamp it.
+    Only the top-level LIMIT counts; a LIMIT inside a subquery does not cap the result.
     Returns (sql_out, changed)
     """
-    sql_no_semicolon = sql.strip().rstrip(";")
-    limit_match = re.search(r"\bLIMIT\s+(\d+)\b", sql_no_semicolon, flags=re.IGNORECASE)
+    sql = scan.stripped
+    limit = scan.limit
 
-    if not limit_match:
-        return f"{sql_no_semicolon} LIMIT {max_limit};", True
+    if limit is None:
+        return f"{sql.rstrip(';')} LIMIT {max_limit};", True
 
-    current = int(limit_match.group(1))
-    if current > max_limit:
-        sql_out = re.sub(
-            r"\bLIMIT\s+\d+\b",
-            f"LIMIT {max_limit}",
-            sql_no_semicolon,
-            flags=re.IGNORECASE,
-        )
-        return f"{sql_out};", True
+    if limit.value > max_limit:
+        sql = f"{sql[:limit.start]}LIMIT {max_limit}{sql[limit.end:]}"
+        return f"{sql.rstrip(';')};", True
 
-    return f"{sql_no_semicolon};", True if not sql_no_semicolon.endswith(";") else False
+    sql_no_semicolon = sql.rstrip(";")
+    return f"{sql_no_semicolon};", sql_no_semicolon != sql
 
 
 def validate_sql(sql: str, policy: SqlPolicy = DEFAULT_POLICY) -> ValidationResult:
@@ -99,36 +72,103 @@ def validate_sql(sql: str, policy: SqlPolicy = DEFAULT_POLICY) -> ValidationResu
     if not sql or not sql.strip():
         return ValidationResult(is_valid=False, violations=["empty_sql"])
 
-    stripped = _strip_sql_comments(sql)
+    scan = scan_sql(sql, _WATCH_WORDS)
 
-    if _has_multiple_statements(stripped):
+    if scan.statement_count > 1:
         return ValidationResult(is_valid=False, violations=["multiple_statements_not_allowed"])
 
-    if not _has_select_only(stripped):
+    is_select = scan.first_word == "SELECT"
+    if not is_select:
         violations.append("only_select_allowed")
 
-    disallowed = _contains_disallowed(stripped)
+    disallowed = _contains_disallowed(scan)
     if disallowed:
         violations.append(f"disallowed_keyword:{disallowed}")
 
     # very basic injection-ish guardrails
-    if re.search(r"\bpg_sleep\b", stripped, flags=re.IGNORECASE):
-        violations.append("disallowed_function:pg_sleep")
+    for word, fn in _DISALLOWED_FUNCTIONS.items():
+        if word in scan.found_words:
+            violations.append(f"disallowed_function:{fn}")
 
-    tables = _extract_table_names(stripped)
-    for t in tables:
-        if t not in {x.lower() for x in policy.allowed_tables}:
+    allowed = policy.allowed_tables_lower
+    for i, t in enumerate(scan.tables):
+        if t not in (policy.allowed_table_functions if i in scan.table_functions else allowed):
             violations.append(f"table_not_allowed:{t}")
 
-    sanitized = stripped
-    changed = False
+    sanitized = scan.stripped
 
-    if policy.enforce_limit and "only_select_allowed" not in violations:
-        sanitized, changed = _ensure_limit(sanitized, policy.max_limit)
+    if policy.enforce_limit and is_select:
+        sanitized, _ = _ensure_limit(scan, policy.max_limit)
 
     is_valid = len(violations) == 0
     return ValidationResult(
         is_valid=is_valid,
         violations=violations,
-        sanitized_sql=sanitized if (is_valid and (changed or sanitized != sql)) else (sanitized if is_valid else None),
+        sanitized_sql=sanitized if is_valid else None,
     )
+
+
+class _ValidationCache:
+    """
+    LRU of validation results keyed on (SQL text hash, policy).
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[bytes, SqlPolicy], ValidationResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_validate(self, sql: str, policy: SqlPolicy) -> ValidationResult:
+        key = self._key(sql, policy)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return result
+            self._misses += 1
+
+        result = validate_sql(sql, policy)
+
+        with self._lock:
+            self._put(key, result)
+            # sanitized SQL validates to itself, and is what sql.validate callers
+            # send on to query.execute: prime it so that re-validation is a hit
+            if result.is_valid and result.sanitized_sql and result.sanitized_sql != sql:
+                self._put(self._key(result.sanitized_sql, policy), result)
+        return result
+
+    @staticmethod
+    def _key(sql: str, policy: SqlPolicy) -> Tuple[bytes, SqlPolicy]:
+        return hashlib.blake2b((sql or "").encode("utf-8"), digest_size=16).digest(), policy
+
+    def _put(self, key: Tuple[bytes, SqlPolicy], result: ValidationResult) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+_validation_cache = _ValidationCache(max_entries=int(os.getenv("VALIDATION_CACHE_SIZE", "4096")))
+
+
+def validate_sql_cached(sql: str, policy: SqlPolicy = DEFAULT_POLICY) -> ValidationResult:
+    """
+    Memoized validate_sql. Results are shared between callers and must not be mutated.
+    """
+    return _validation_cache.get_or_validate(sql, policy)
+
+
+def validation_cache_stats() -> Dict[str, Any]:
+    return _validation_cache.stats()
@@ -0,0 +1,249 @@
+"""
+Vectorized GROUP BY over a FactSnapshot for compiled semantic-layer plans.
+
+answer() returns what Postgres returns for CompiledQuery.sql (plus the
+sanitizer's LIMIT): the same columns, values of the same types, and the same
+order by the first metric -- or None when the plan uses anything the kernels
+below don't cover, in which case the caller runs the SQL.
+
+Sums are exact integers (cents / units); AVG(f.total_amount) reproduces
+Postgres' numeric division scale and rounding, so results compare equal
+value for value, not just approximately.
+"""
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:  # optional: the hot tier is off without it
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from mcp_server.app.cache.semantic_cache import SemanticSnapshot
+from mcp_server.app.hot_tier.snapshot import BASE_TABLE, FactSnapshot
+from mcp_server.app.semantic.compiler import CompiledQuery
+
+
+NUMERIC_OID = 1700
+INT8_OID = 20
+
+# semantic-layer metric expression (upper-cased, single-spaced) -> kernel
+_KERNELS = {
+    "SUM(F.TOTAL_AMOUNT)": "sum_amount",
+    "SUM(F.QUANTITY)": "sum_quantity",
+    "AVG(F.TOTAL_AMOUNT)": "avg_amount",
+    "COUNT(DISTINCT F.ORDER_ID)": "count_orders",
+}
+_KERNEL_OIDS = {"sum_amount": NUMERIC_OID, "sum_quantity": INT8_OID, "avg_amount": NUMERIC_OID, "count_orders": INT8_OID}
+
+# group keys up to this many combinations are counted densely (np.bincount)
+DENSE_GROUPS = 1 << 22
+# (groups x orders) bitmaps up to this size count distinct orders directly
+DISTINCT_BITMAP = 1 << 26
+_FLOAT_EXACT = 1 << 53
+
+# Postgres numeric: base-10000 digits, at least 16 significant digits in a quotient
+_NBASE = 10000
+_DIV_MIN_SIG_DIGITS = 16
+_MAX_DISPLAY_SCALE = 1000
+_AMOUNT_SCALE = 2
+
+
+def _kernel(expression: str) -> Optional[str]:
+    return _KERNELS.get(" ".join(expression.upper().split()))
+
+
+def _nbase_lead(value: int, scale: int) -> Tuple[int, int]:
+    """
+    (weight, first digit) of |value| * 10**-scale in Postgres' base-10000
+    representation; (0, 0) for zero.
+    """
+    value = abs(value)
+    if value == 0:
+        return 0, 0
+    # align to a whole number of base-10000 digits after the point
+    frac_digits = -(-scale // 4)
+    aligned = value * 10 ** (4 * frac_digits - scale)
+    n_digits = (len(str(aligned)) + 3) // 4
+    return n_digits - 1 - frac_digits, aligned // _NBASE ** (n_digits - 1)
+
+
+def _div_scale(sum_cents: int, count: int) -> int:
+    # select_div_scale() in src/backend/utils/adt/numeric.c for sum(numeric(,2)) / count
+    weight1, first1 = _nbase_lead(sum_cents, _AMOUNT_SCALE)
+    weight2, first2 = _nbase_lead(count, 0)
+    qweight = weight1 - weight2
+    if first1 <= first2:
+        qweight -= 1
+    rscale = max(_DIV_MIN_SIG_DIGITS - qweight * 4, _AMOUNT_SCALE, 0)
+    return min(rscale, _MAX_DISPLAY_SCALE)
+
+
+def numeric_avg(sum_cents: int, count: int) -> Decimal:
+    """
+    AVG of numeric(_, 2) values as Postgres computes it: sum / count at
+    select_div_scale() digits, rounded half away from zero.
+    """
+    rscale = _div_scale(sum_cents, count)
+    quotient, remainder = divmod(abs(sum_cents) * 10 ** rscale, 100 * count)
+    if 2 * remainder >= 100 * count:
+        quotient += 1
+    return Decimal(-quotient if sum_cents < 0 else quotient).scaleb(-rscale)
+
+
+def _group_sum(values: Any, group: Optional[Any], groups: int, abs_total: int) -> Any:
+    if group is None:
+        return np.array([int(values.sum(dtype=np.int64))], dtype=np.int64)
+    if abs_total < _FLOAT_EXACT:
+        # every partial sum is an integer below 2**53, so float64 accumulation is exact
+        return np.rint(np.bincount(group, weights=values, minlength=groups)).astype(np.int64)
+    out = np.zeros(groups, dtype=np.int64)
+    np.add.at(out, group, values.astype(np.int64))
+    return out
+
+
+def _distinct_orders(orders: Any, n_orders: int, group: Optional[Any], groups: int) -> Any:
+    if group is None:
+        return np.array([np.count_nonzero(np.bincount(orders, minlength=n_orders))], dtype=np.int64)
+    if groups * n_orders <= DISTINCT_BITMAP:
+        seen = np.zeros(groups * n_orders, dtype=bool)
+        seen[group * n_orders + orders] = True
+        return seen.reshape(groups, n_orders).sum(axis=1, dtype=np.int64)
+    # sort + run boundaries: much faster than np.unique's hashing on large int64 keys
+    pairs = np.sort(group.astype(np.int64) * n_orders + orders)
+    first_of_run = np.empty(pairs.size, dtype=bool)
+    first_of_run[:1] = True
+    np.not_equal(pairs[1:], pairs[:-1], out=first_of_run[1:])
+    return np.bincount(pairs[first_of_run] // n_orders, minlength=groups).astype(np.int64)
+
+
+def _descending(values: Any, limit: Optional[int], exact: Optional[Callable[[int], Any]] = None) -> Any:
+    """
+    Stable descending order of `values` (positions). With `exact`, runs of
+    equal float keys up to the LIMIT cut are re-ordered by exact(position).
+    """
+    order = np.argsort(-values, kind="stable")
+    if exact is None or order.size < 2:
+        return order
+    ranked = values[order]
+    head = order.size if limit is None else min(limit, order.size)
+    # the run straddling the cut decides which groups make it in
+    head = int(np.searchsorted(-ranked, -ranked[head - 1], side="right"))
+    starts = np.flatnonzero(np.r_[True, ranked[1:head] != ranked[: head - 1]])
+    ends = np.r_[starts[1:], head]
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if end - start > 1:
+            order[start:end] = sorted(order[start:end].tolist(), key=exact, reverse=True)
+    return order
+
+
+def answer(
+    snapshot: FactSnapshot, semantic: SemanticSnapshot, compiled: CompiledQuery, limit: Optional[int]
+) -> Optional[Dict[str, Any]]:
+    """
+    {"row_count", "columns", "rows"} for `compiled` computed from the
+    snapshot, at most `limit` rows; None when the plan isn't supported.
+    """
+    metric_defs = {m["metric_name"]: m for m in semantic.metrics}
+    dim_defs = {d["dimension_name"]: d for d in semantic.dimensions}
+
+    kernels = []
+    for name in compiled.metrics:
+        metric = metric_defs.get(name)
+        kernel = _kernel(metric["sql_expression"]) if metric else None
+        if kernel is None or metric["default_table"] != BASE_TABLE:
+            return None
+        kernels.append(kernel)
+
+    dims = []
+    for name in compiled.dimensions:
+        d = dim_defs.get(name)
+        dimension = snapshot.dimensions.get(d["table_name"]) if d else None
+        column = dimension.columns.get(d["column_name"]) if dimension else None
+        if column is None:
+            return None
+        dims.append((d["column_name"], dimension.table, column))
+
+    rows = None
+    if compiled.date_range is not None:
+        date_dim = snapshot.date_dimension
+        if date_dim is None:
+            return None
+        first, last = compiled.date_range
+        # codes are positions in the sorted date_ids, so a date_id range is a code range
+        lo = 0 if first is None else int(np.searchsorted(date_dim.keys, first, side="left"))
+        hi = date_dim.keys.size if last is None else int(np.searchsorted(date_dim.keys, last, side="right"))
+        date_codes = snapshot.codes[date_dim.table]
+        rows = np.flatnonzero((date_codes >= lo) & (date_codes < hi))
+
+    def take(values: Any) -> Any:
+        return values if rows is None else values[rows]
+
+    # mixed-radix group key over the dimension value codes
+    group = None
+    groups = 1
+    radices = []
+    for _, table, column in dims:
+        codes = column.codes[take(snapshot.codes[table])].astype(np.int64)
+        radix = max(len(column.values), 1)
+        group = codes if group is None else group * radix + codes
+        groups *= radix
+        radices.append(radix)
+    group_keys = None
+    if group is not None and groups > DENSE_GROUPS:
+        group_keys, group = np.unique(group, return_inverse=True)
+        groups = group_keys.size
+
+    counts = np.bincount(group, minlength=groups) if group is not None else np.array([take(snapshot.amount_cents).size])
+
+    columns = [{"name": name, "type_oid": column.type_oid} for name, _, column in dims]
+    values: List[Any] = []
+    for name, kernel in zip(compiled.metrics, kernels):
+        columns.append({"name": name, "type_oid": _KERNEL_OIDS[kernel]})
+        if kernel == "count_orders":
+            result = _distinct_orders(take(snapshot.order_code), snapshot.n_orders, group, groups)
+        elif kernel == "sum_quantity":
+            result = _group_sum(take(snapshot.quantity), group, groups, snapshot.quantity_abs_total)
+        else:
+            result = _group_sum(take(snapshot.amount_cents), group, groups, snapshot.amount_abs_total)
+        values.append((kernel, result))
+
+    if group is None:
+        # no GROUP BY: always one row (NULL sums over no rows)
+        order = np.array([0])
+    else:
+        present = np.flatnonzero(counts)
+        kernel, first = values[0]
+        if kernel == "avg_amount":
+            sums, group_counts = first[present], counts[present]
+            order = present[
+                _descending(sums / group_counts, limit, lambda i: Fraction(int(sums[i]), int(group_counts[i])))
+            ]
+        else:
+            order = present[_descending(first[present], limit)]
+    if limit is not None:
+        order = order[:limit]
+
+    # decode group keys back to per-dimension value codes
+    keys = order if group_keys is None else group_keys[order]
+    dim_codes = []
+    for radix in reversed(radices):
+        keys, code = np.divmod(keys, radix)
+        dim_codes.append(code)
+    dim_codes.reverse()
+
+    out_columns = [[column.values[c] for c in codes.tolist()] for (_, _, column), codes in zip(dims, dim_codes)]
+    for kernel, result in values:
+        group_counts = counts[order].tolist()
+        sums = result[order].tolist()
+        if kernel == "sum_amount":
+            out_columns.append([Decimal(s).scaleb(-_AMOUNT_SCALE) if n else None for s, n in zip(sums, group_counts)])
+        elif kernel == "avg_amount":
+            out_columns.append([numeric_avg(s, n) if n else None for s, n in zip(sums, group_counts)])
+        elif kernel == "sum_quantity":
+            out_columns.append([s if n else None for s, n in zip(sums, group_counts)])
+        else:
+            out_columns.append(sums)
+
+    out_rows = list(zip(*out_columns))
+    return {"row_count": len(out_rows), "columns": columns, "rows": out_rows}
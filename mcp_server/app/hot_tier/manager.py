@@ -0,0 +1,197 @@
+"""
+Hot tier: answers query.ask plans from an in-memory columnar snapshot of
+the star schema instead of Postgres.
+
+Runs inside the MCP server when HOT_TIER_ENABLED=true: the app lifespan
+starts a thread that loads the snapshot, then every
+HOT_TIER_REFRESH_INTERVAL_SECONDS appends new fact rows (or reloads after
+updates, deletes and dimension changes). A plan is only answered in memory
+when the snapshot is at the data version the result cache sees; everything
+else -- stale snapshot, unsupported metric, no snapshot yet -- runs as SQL.
+
+    python -m mcp_server.app.hot_tier.manager     # load once, print stats
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from mcp_server.app.cache.result_cache import STAR_SCHEMA_TABLES
+from mcp_server.app.cache.semantic_cache import SemanticSnapshot, semantic_cache
+from mcp_server.app.db.connection import pooled_connection
+from mcp_server.app.hot_tier import engine
+from mcp_server.app.hot_tier.snapshot import FactSnapshot, refresh_snapshot
+from mcp_server.app.semantic.compiler import CompiledQuery
+from mcp_server.app.telemetry.logger import log_event
+
+
+def hot_tier_enabled() -> bool:
+    return engine.np is not None and os.getenv("HOT_TIER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _refresh_pooled(snapshot: Optional[FactSnapshot], max_rows: int) -> Tuple[FactSnapshot, str]:
+    with pooled_connection() as conn:
+        return refresh_snapshot(conn, snapshot, semantic_cache.get(), max_rows)
+
+
+class HotTier:
+    """
+    Holds the current FactSnapshot and refreshes it from a background thread
+    every `interval_seconds`. Snapshots are immutable: a refresh swaps in a
+    new one, so readers never need the lock for longer than the swap.
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[Optional[FactSnapshot], int], Tuple[FactSnapshot, str]],
+        interval_seconds: float = 1.0,
+        max_rows: int = 20000000,
+    ):
+        self._refresh = refresh
+        self.interval_seconds = interval_seconds
+        self.max_rows = max_rows
+
+        self._snapshot: Optional[FactSnapshot] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {
+            "refreshes": 0,
+            "reloads": 0,
+            "appends": 0,
+            "rows_appended": 0,
+            "errors": 0,
+            "last_refresh_ms": 0.0,
+            "last_error": None,
+            "answered": 0,
+            "fallback_stale": 0,
+            "fallback_unsupported": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running or self.interval_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hot-tier-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def run_once(self, full: bool = False) -> str:
+        """
+        Brings the snapshot up to date: "unchanged", "appended" or "reloaded".
+        full=True reloads from scratch.
+        """
+        started = time.monotonic()
+        with self._refresh_lock:
+            current = None if full else self._snapshot
+            try:
+                snapshot, outcome = self._refresh(current, self.max_rows)
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._stats["last_error"] = str(e)
+                log_event({"event": "hot_tier_refresh_failed", "error": str(e)})
+                raise
+            with self._lock:
+                self._stats["refreshes"] += 1
+                self._stats["last_refresh_ms"] = round((time.monotonic() - started) * 1000, 3)
+                if outcome == "reloaded":
+                    self._stats["reloads"] += 1
+                elif outcome == "appended":
+                    self._stats["appends"] += 1
+                    self._stats["rows_appended"] += snapshot.rows - current.rows
+                self._snapshot = snapshot
+        if outcome == "reloaded":
+            log_event({"event": "hot_tier_loaded", "rows": snapshot.rows, "bytes": snapshot.nbytes()})
+        return outcome
+
+    def answer(
+        self, semantic: SemanticSnapshot, compiled: CompiledQuery, limit: Optional[int], data_version: Optional[int]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The plan's result from the snapshot, or None when it has to run as SQL:
+        no snapshot, one behind `data_version` (star_schema_version) or the
+        semantic layer, or a plan the engine doesn't cover.
+        """
+        snapshot = self._snapshot
+        if (
+            snapshot is None
+            or data_version is None
+            or sum(snapshot.versions.get(t, 0) for t in STAR_SCHEMA_TABLES) != data_version
+            or snapshot.semantic_etag != semantic.etag
+        ):
+            with self._lock:
+                self._stats["fallback_stale"] += 1
+            return None
+        result = engine.answer(snapshot, semantic, compiled, limit)
+        with self._lock:
+            self._stats["answered" if result is not None else "fallback_unsupported"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        with self._lock:
+            return {
+                "enabled": hot_tier_enabled(),
+                "running": self.running,
+                "interval_seconds": self.interval_seconds,
+                "max_rows": self.max_rows,
+                "loaded": snapshot is not None,
+                **(
+                    {
+                        "rows": snapshot.rows,
+                        "orders": snapshot.n_orders,
+                        "bytes": snapshot.nbytes(),
+                        "high_water_sale_id": snapshot.high_water_sale_id,
+                        "versions": {t: snapshot.versions.get(t, 0) for t in STAR_SCHEMA_TABLES},
+                        "loaded_at": snapshot.loaded_at,
+                    }
+                    if snapshot is not None
+                    else {}
+                ),
+                **self._stats,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                pass  # counted and logged in run_once; retried next interval
+            self._stop.wait(self.interval_seconds)
+
+
+_hot_tier = HotTier(
+    refresh=_refresh_pooled,
+    interval_seconds=float(os.getenv("HOT_TIER_REFRESH_INTERVAL_SECONDS", "1.0")),
+    max_rows=int(os.getenv("HOT_TIER_MAX_ROWS", "20000000")),
+)
+
+
+def get_hot_tier() -> HotTier:
+    return _hot_tier
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    _hot_tier.run_once(full=True)
+    print(json.dumps(_hot_tier.stats(), indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,348 @@
+"""
+Columnar in-memory copy of the star schema for the hot tier.
+
+fact_sales is held as typed NumPy arrays, one per column the governed metrics
+read:
+
+    codes[table]   fact row -> row of that dimension table (its key's position
+                   in the sorted keys), in the smallest unsigned dtype that fits
+    order_code     order_id factorized to 0..n_orders-1 (int32)
+    quantity       int32
+    amount_cents   total_amount * 100 as int64, so sums are exact
+
+Every dimension column the semantic layer exposes on a joined table is
+factorized once per dimension row: DimensionColumn.codes maps a dimension row
+to a value code and .values holds the distinct values, so grouping by
+region_name groups by value (as GROUP BY does), not by region row.
+
+Refreshes read data_versions without locking and stop there when nothing
+changed. Otherwise the sale_id watermark is read under a brief SHARE lock on
+the star schema tables, like fold_rollups(): in-flight writes finish first, so
+every row up to MAX(sale_id) has committed and none can commit below it
+later. The lock is released before the rows are read; they are fetched up to
+that watermark in a REPEATABLE READ transaction, which re-checks that only
+inserts happened since the watermark read, so the versions recorded with the
+snapshot describe exactly the rows loaded.
+"""
+import re
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+try:  # optional: the hot tier is off without it
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from mcp_server.app.cache.semantic_cache import SemanticSnapshot
+from mcp_server.app.encoding import columns_meta
+
+
+BASE_TABLE = "fact_sales f"
+# fact_sales f.<fk> = <alias>.<key>
+_JOIN = re.compile(r"^\s*f\.(\w+)\s*=\s*(\w+)\.(\w+)\s*$")
+
+FETCH_BATCH_ROWS = 100000
+# full-load attempts before giving up when UPDATE / DELETE / dimension writes keep racing it
+LOAD_ATTEMPTS = 3
+
+
+class SnapshotTooLarge(Exception):
+    pass
+
+
+class SnapshotConflict(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class DimensionColumn:
+    codes: Any  # np.ndarray: dimension row -> value code
+    values: List[Any]  # value code -> value
+    type_oid: int
+
+
+@dataclass(frozen=True)
+class Dimension:
+    table: str  # as in the semantic layer, e.g. "dim_region r"
+    fact_column: str  # fact_sales foreign key
+    key_column: str
+    keys: Any  # np.ndarray of sorted keys
+    columns: Dict[str, DimensionColumn]
+
+
+@dataclass(frozen=True)
+class FactSnapshot:
+    dimensions: Dict[str, Dimension]
+    codes: Dict[str, Any]
+    order_code: Any
+    quantity: Any
+    amount_cents: Any
+    n_orders: int
+    # order_id -> code; grows on appends (only the refresher touches it)
+    order_ids: Dict[str, int]
+    high_water_sale_id: int
+    # data_versions.version per table and fact_sales' rewrite_version at load time
+    versions: Dict[str, int]
+    rewrite_version: int
+    semantic_etag: str
+    # sums of absolute values: float64 bincount sums are exact below 2**53
+    amount_abs_total: int
+    quantity_abs_total: int
+    loaded_at: float
+
+    @property
+    def rows(self) -> int:
+        return int(self.amount_cents.shape[0])
+
+    @property
+    def date_dimension(self) -> Optional[Dimension]:
+        return next((d for d in self.dimensions.values() if d.fact_column == "date_id"), None)
+
+    def nbytes(self) -> int:
+        arrays = [self.order_code, self.quantity, self.amount_cents, *self.codes.values()]
+        for dim in self.dimensions.values():
+            arrays += [dim.keys] + [c.codes for c in dim.columns.values()]
+        return int(sum(a.nbytes for a in arrays))
+
+
+def _table_name(table: str) -> str:
+    return table.split()[0]
+
+
+def _dimension_specs(semantic: SemanticSnapshot) -> List[Tuple[str, str, str, List[str]]]:
+    """
+    (table, fact column, key column, dimension columns) for every dimension
+    table joined to fact_sales by a plain key equality.
+    """
+    specs = []
+    for join in semantic.joins:
+        if join["left_table"] != BASE_TABLE:
+            continue
+        match = _JOIN.match(join["join_condition"])
+        table = join["right_table"]
+        if match is None or match.group(2) != table.split()[-1]:
+            continue
+        columns = list(dict.fromkeys(d["column_name"] for d in semantic.dimensions if d["table_name"] == table))
+        if columns:
+            specs.append((table, match.group(1), match.group(3), columns))
+    return specs
+
+
+def _factorize(values: List[Any]) -> Tuple[Any, List[Any]]:
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values))
+    return codes.astype(np.min_scalar_type(max(len(index) - 1, 0))), list(index)
+
+
+def _load_dimension(cur, table: str, fact_column: str, key_column: str, columns: List[str]) -> Dimension:
+    cur.execute(f"SELECT {key_column}, {', '.join(columns)} FROM {table} ORDER BY {key_column}")
+    rows = cur.fetchall()
+    meta = columns_meta(cur.description)[1:]
+    keys = np.array([r[0] for r in rows], dtype=np.int64)
+    dim_columns = {}
+    for i, column in enumerate(columns):
+        codes, values = _factorize([r[i + 1] for r in rows])
+        dim_columns[column] = DimensionColumn(codes=codes, values=values, type_oid=meta[i]["type_oid"])
+    return Dimension(table=table, fact_column=fact_column, key_column=key_column, keys=keys, columns=dim_columns)
+
+
+def _read_versions(cur) -> Tuple[Dict[str, int], int]:
+    cur.execute("SELECT table_name, version, rewrite_version FROM data_versions")
+    rows = cur.fetchall()
+    versions = {name: int(version) for name, version, _ in rows}
+    rewrite = next((int(r) for name, _, r in rows if name == _table_name(BASE_TABLE)), 0)
+    return versions, rewrite
+
+
+def _read_watermark(conn, tables: List[str]) -> Tuple[Dict[str, int], int, int]:
+    """
+    (versions, fact_sales rewrite_version, MAX(sale_id)) read under SHARE locks
+    on `tables`; committed (locks released) before returning.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"LOCK TABLE {', '.join(tables)} IN SHARE MODE")
+        versions, rewrite = _read_versions(cur)
+        cur.execute(f"SELECT COALESCE(MAX(sale_id), 0) FROM {_table_name(BASE_TABLE)}")
+        high_water = int(cur.fetchone()[0])
+    conn.commit()
+    return versions, rewrite, high_water
+
+
+def _only_inserts(
+    versions: Dict[str, int], rewrite: int, since: Dict[str, int], since_rewrite: int, dimension_tables: List[str]
+) -> bool:
+    """True when fact_sales saw only inserts and no dimension table changed since `since`."""
+    return rewrite == since_rewrite and all(versions.get(t) == since.get(t) for t in dimension_tables)
+
+
+def _begin_repeatable_read(conn, since: Dict[str, int], since_rewrite: int, dimension_tables: List[str]) -> bool:
+    """
+    Opens a REPEATABLE READ transaction on `conn`; False (rolled back) when its
+    snapshot already has more than inserts since `since`.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        versions, rewrite = _read_versions(cur)
+    if _only_inserts(versions, rewrite, since, since_rewrite, dimension_tables):
+        return True
+    conn.rollback()
+    return False
+
+
+def _fetch_facts(
+    conn,
+    dimensions: Dict[str, Dimension],
+    order_ids: Dict[str, int],
+    above_sale_id: int,
+    up_to_sale_id: int,
+    max_rows: int,
+) -> Tuple[Dict[str, Any], Any, Any, Any]:
+    """
+    Fact rows with above_sale_id < sale_id <= up_to_sale_id as (codes per
+    table, order codes, quantities, cent amounts). Raises SnapshotTooLarge past max_rows.
+    """
+    dims = list(dimensions.values())
+    fk_list = ", ".join(d.fact_column for d in dims)
+    chunks: List[Tuple] = []
+    fetched = 0
+    # a named (server-side) cursor streams the rows instead of buffering them all client-side
+    with conn.cursor(name="hot_tier_facts") as cur:
+        cur.itersize = FETCH_BATCH_ROWS
+        cur.execute(
+            f"SELECT sale_id, order_id, quantity, (total_amount * 100)::bigint, {fk_list} "
+            f"FROM {_table_name(BASE_TABLE)} WHERE sale_id > %s AND sale_id <= %s",
+            (above_sale_id, up_to_sale_id),
+        )
+        while True:
+            rows = cur.fetchmany(FETCH_BATCH_ROWS)
+            if not rows:
+                break
+            fetched += len(rows)
+            if fetched > max_rows:
+                raise SnapshotTooLarge(f"fact_sales has more than {max_rows} rows")
+            cols = list(zip(*rows))
+            n = len(rows)
+            order_code = np.fromiter(
+                (order_ids.setdefault(o, len(order_ids)) for o in cols[1]), dtype=np.int32, count=n
+            )
+            codes = []
+            for i, dim in enumerate(dims):
+                fk = np.array(cols[4 + i], dtype=np.int64)
+                pos = np.searchsorted(dim.keys, fk)
+                if pos.size and (pos.max() >= dim.keys.size or not np.array_equal(dim.keys[pos], fk)):
+                    raise ValueError(f"fact_sales.{dim.fact_column} has keys missing from {dim.table}")
+                codes.append(pos.astype(np.min_scalar_type(max(dim.keys.size - 1, 0))))
+            chunks.append((codes, order_code, np.array(cols[2], dtype=np.int32), np.array(cols[3], dtype=np.int64)))
+
+    def concat(parts: List[Any], dtype) -> Any:
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    codes_by_table = {
+        dim.table: concat([c[0][i] for c in chunks], np.min_scalar_type(max(dim.keys.size - 1, 0)))
+        for i, dim in enumerate(dims)
+    }
+    return (
+        codes_by_table,
+        concat([c[1] for c in chunks], np.int32),
+        concat([c[2] for c in chunks], np.int32),
+        concat([c[3] for c in chunks], np.int64),
+    )
+
+
+def load_snapshot(conn, semantic: SemanticSnapshot, max_rows: int) -> FactSnapshot:
+    """
+    Full load of fact_sales and the dimension tables the semantic layer joins
+    to it, up to a locked watermark read and then from one REPEATABLE READ
+    snapshot on `conn` (committed before returning). Retried when an UPDATE,
+    DELETE or dimension write lands in between; SnapshotConflict after
+    LOAD_ATTEMPTS.
+    """
+    specs = _dimension_specs(semantic)
+    dimension_tables = [_table_name(table) for table, _, _, _ in specs]
+    for _ in range(LOAD_ATTEMPTS):
+        try:
+            versions, rewrite, high_water = _read_watermark(conn, [_table_name(BASE_TABLE)] + dimension_tables)
+            if not _begin_repeatable_read(conn, versions, rewrite, dimension_tables):
+                continue
+            with conn.cursor() as cur:
+                dimensions = {spec[0]: _load_dimension(cur, *spec) for spec in specs}
+            order_ids: Dict[str, int] = {}
+            codes, order_code, quantity, amount_cents = _fetch_facts(
+                conn, dimensions, order_ids, 0, high_water, max_rows
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return FactSnapshot(
+            dimensions=dimensions,
+            codes=codes,
+            order_code=order_code,
+            quantity=quantity,
+            amount_cents=amount_cents,
+            n_orders=len(order_ids),
+            order_ids=order_ids,
+            high_water_sale_id=high_water,
+            versions=versions,
+            rewrite_version=rewrite,
+            semantic_etag=semantic.etag,
+            amount_abs_total=int(np.abs(amount_cents).sum()),
+            quantity_abs_total=int(np.abs(quantity.astype(np.int64)).sum()),
+            loaded_at=time.time(),
+        )
+    raise SnapshotConflict(f"star schema rewritten during {LOAD_ATTEMPTS} load attempts")
+
+
+def refresh_snapshot(
+    conn, snapshot: Optional[FactSnapshot], semantic: SemanticSnapshot, max_rows: int
+) -> Tuple[FactSnapshot, str]:
+    """
+    Brings `snapshot` up to date: ("unchanged" | "appended" | "reloaded").
+    Appends the rows above the watermark when fact_sales has only seen inserts
+    since the snapshot; anything else (UPDATE / DELETE / TRUNCATE, a
+    dimension write, a semantic layer change) reloads everything.
+    """
+    if snapshot is None or snapshot.semantic_etag != semantic.etag:
+        return load_snapshot(conn, semantic, max_rows), "reloaded"
+
+    dimension_tables = [_table_name(d.table) for d in snapshot.dimensions.values()]
+    try:
+        # the common case -- nothing written -- takes no locks
+        with conn.cursor() as cur:
+            versions, rewrite = _read_versions(cur)
+        conn.commit()
+        if versions == snapshot.versions:
+            return snapshot, "unchanged"
+        if not _only_inserts(versions, rewrite, snapshot.versions, snapshot.rewrite_version, dimension_tables):
+            return load_snapshot(conn, semantic, max_rows), "reloaded"
+
+        versions, rewrite, high_water = _read_watermark(conn, [_table_name(BASE_TABLE)] + dimension_tables)
+        if not (
+            _only_inserts(versions, rewrite, snapshot.versions, snapshot.rewrite_version, dimension_tables)
+            and _begin_repeatable_read(conn, versions, rewrite, dimension_tables)
+        ):
+            return load_snapshot(conn, semantic, max_rows), "reloaded"
+        above = snapshot.high_water_sale_id
+        high_water = max(high_water, above)
+        codes, order_code, quantity, amount_cents = _fetch_facts(
+            conn, snapshot.dimensions, snapshot.order_ids, above, high_water, max_rows - snapshot.rows
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return replace(
+        snapshot,
+        codes={t: np.concatenate([snapshot.codes[t], codes[t]]) for t in snapshot.codes},
+        order_code=np.concatenate([snapshot.order_code, order_code]),
+        quantity=np.concatenate([snapshot.quantity, quantity]),
+        amount_cents=np.concatenate([snapshot.amount_cents, amount_cents]),
+        n_orders=len(snapshot.order_ids),
+        high_water_sale_id=high_water,
+        versions=versions,
+        amount_abs_total=snapshot.amount_abs_total + int(np.abs(amount_cents).sum()),
+        quantity_abs_total=snapshot.quantity_abs_total + int(np.abs(quantity.astype(np.int64)).sum()),
+        loaded_at=time.time(),
+    ), "appended"
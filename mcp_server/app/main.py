@@ -1,26 +1,189 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+
+from typing import Callable
+
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from ai_service.app.planner import plan_cache_stats
+from mcp_server.app.cache.result_cache import result_cache
+from mcp_server.app.cache.semantic_cache import semantic_cache
+from mcp_server.app.cache.singleflight import coalescing_enabled, query_flights
+from mcp_server.app.db.admission import AdmissionRejected, admission_enabled, get_admission
+from mcp_server.app.db.connection import close_pool, get_pool, open_pool
+from mcp_server.app import encoding
+from mcp_server.app.db.pool import PoolExhaustedError
+from mcp_server.app.db.repository import refresh_rollups
+from mcp_server.app.db.prepared import prepared_statement_stats
+from mcp_server.app.governance.cost import explain_cache
+from mcp_server.app.governance.validator import validation_cache_stats
+from mcp_server.app.hot_tier.manager import get_hot_tier, hot_tier_enabled
+from mcp_server.app.rollups.maintainer import get_maintainer
+from mcp_server.app.rollups.registry import rollup_registry
+from mcp_server.app.semantic.compiler import template_cache
+from mcp_server.app.telemetry.logger import log_event
+from mcp_server.app.telemetry.writer import get_writer
 from mcp_server.app.tools import catalog, sql, query, semantic, telemetry
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        open_pool()
+    except Exception as e:
+        # DB may not be up yet; the pool fills lazily on first checkout
+        log_event({"event": "pool_warmup_failed", "error": str(e)})
+    try:
+        semantic_cache.refresh()
+    except Exception as e:
+        # loaded on first catalog request instead
+        log_event({"event": "semantic_cache_warmup_failed", "error": str(e)})
+    get_writer().start()
+    get_maintainer().start()
+    if hot_tier_enabled():
+        get_hot_tier().start()
+    yield
+    get_hot_tier().stop()
+    get_maintainer().stop()
+    get_writer().stop()  # drains queued telemetry while the pool is still open
+    close_pool()
+
+
 app = FastAPI(
     title="MCP Server (Governed Data Tools)",
     version="0.2.0",
     description="HTTP-based MCP-style tool server for governed access to analytics data.",
+    lifespan=lifespan,
 )
 
 
+@app.exception_handler(PoolExhaustedError)
+def pool_exhausted_handler(request: Request, exc: PoolExhaustedError):
+    return JSONResponse(status_code=503, content={"error": "pool_exhausted", "detail": str(exc)})
+
+
+@app.exception_handler(AdmissionRejected)
+def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    retry_after = max(1, math.ceil(exc.retry_after_seconds))
+    return JSONResponse(
+        status_code=429,
+        content={
+            "error": "admission_rejected",
+            "reason": exc.reason,
+            "priority": exc.priority,
+            "retry_after_seconds": round(exc.retry_after_seconds, 3),
+        },
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/health/pool")
+def health_pool():
+    return {"status": "ok", "pool": get_pool().stats(), "prepared_statements": prepared_statement_stats()}
+
+
+@app.get("/health/telemetry")
+def health_telemetry():
+    return {"status": "ok", "telemetry": get_writer().stats()}
+
+
+@app.get("/health/result-cache")
+def health_result_cache():
+    return {"status": "ok", "result_cache": result_cache.stats()}
+
+
+@app.get("/health/coalescing")
+def health_coalescing():
+    return {"status": "ok", "enabled": coalescing_enabled(), "coalescing": query_flights.stats()}
+
+
+@app.get("/health/admission")
+def health_admission():
+    return {"status": "ok", "enabled": admission_enabled(), "admission": get_admission().stats()}
+
+
+@app.get("/health/semantic-cache")
+def health_semantic_cache():
+    return {"status": "ok", "semantic_cache": semantic_cache.stats(), "sql_templates": template_cache.stats()}
+
+
+@app.get("/health/validation-cache")
+def health_validation_cache():
+    return {"status": "ok", "validation_cache": validation_cache_stats(), "explain_cache": explain_cache.stats()}
+
+
+@app.get("/health/plan-cache")
+def health_plan_cache():
+    return {"status": "ok", "plan_cache": plan_cache_stats()}
+
+
+@app.get("/health/rollups")
+def health_rollups():
+    return {"status": "ok", "rollups": rollup_registry.stats(), "maintainer": get_maintainer().stats()}
+
+
+@app.get("/health/hot-tier")
+def health_hot_tier():
+    return {"status": "ok", "hot_tier": get_hot_tier().stats()}
+
+
+@app.post("/admin/semantic/refresh")
+def admin_semantic_refresh():
+    snapshot = semantic_cache.refresh(force=True)
+    return {"status": "ok", "version": snapshot.version, "etag": snapshot.etag}
+
+
+@app.post("/admin/rollups/refresh")
+def admin_rollups_refresh(full: bool = False):
+    """
+    Folds new fact rows into the rollups; full=true rebuilds them from scratch.
+    """
+    if full:
+        version = refresh_rollups()
+        rollup_registry.invalidate()
+        return {"status": "ok", "source_version": version}
+    return {"status": "ok", "rows_folded": get_maintainer().run_once()}
+
+
+@app.post("/admin/hot-tier/refresh")
+def admin_hot_tier_refresh(full: bool = False):
+    """
+    Brings the hot tier snapshot up to date; full=true reloads it from scratch.
+    """
+    if not hot_tier_enabled():
+        return JSONResponse(status_code=409, content={"error": "hot_tier_disabled"})
+    return {"status": "ok", "refresh": get_hot_tier().run_once(full=full), "hot_tier": get_hot_tier().stats()}
+
+
+def _conditional_get(request: Request, etag: str, tool: str, build: Callable[[], object]) -> Response:
+    """
+    Answers If-None-Match with 304 so clients holding the current ETag skip the payload.
+    """
+    tag = f'"{etag}"'
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",") if t.strip()}
+    if tag in candidates or "*" in candidates:
+        return Response(status_code=304, headers={"ETag": tag})
+    return JSONResponse(content=jsonable_encoder({"tool": tool, "data": build()}), headers={"ETag": tag})
+
+
 @app.get("/tools/catalog/list-metrics")
-def catalog_list_metrics():
-    return {"tool": "catalog.list_metrics", "data": catalog.list_metrics()}
+def catalog_list_metrics(request: Request):
+    etag = semantic_cache.get().etag + "-metrics"
+    return _conditional_get(request, etag, "catalog.list_metrics", catalog.list_metrics)
 
 
 @app.get("/tools/catalog/get-semantic-model")
-def catalog_get_semantic_model():
-    return {"tool": "catalog.get_semantic_model", "data": semantic.get_semantic_model()}
+def catalog_get_semantic_model(request: Request):
+    etag = semantic_cache.get().etag + "-model"
+    return _conditional_get(request, etag, "catalog.get_semantic_model", semantic.get_semantic_model)
 
 
 @app.post("/tools/sql/validate")
@@ -28,9 +191,69 @@ def sql_validate(payload: dict):
     return {"tool": "sql.validate", "data": sql.validate(payload)}
 
 
+@app.post("/tools/sql/validate-batch")
+def sql_validate_batch(payload: dict):
+    return {"tool": "sql.validate_batch", "data": sql.validate_batch(payload)}
+
+
+def _with_priority(request: Request, payload: dict) -> dict:
+    """
+    The X-Priority header sets the admission class unless the payload names one.
+    """
+    priority = request.headers.get("x-priority")
+    if priority and not payload.get("priority"):
+        return {**payload, "priority": priority}
+    return payload
+
+
 @app.post("/tools/query/execute")
-def query_execute(payload: dict):
-    return {"tool": "query.execute", "data": query.execute(payload)}
+def query_execute(request: Request, payload: dict):
+    payload = _with_priority(request, payload)
+    result_format = payload.get("format") or "rows"
+    if result_format == "arrow" and not encoding.arrow_available():
+        return {"tool": "query.execute", "data": {"ok": False, "error": "arrow_not_available"}}
+
+    data = query.execute(payload)
+
+    if result_format == "columnar" and data.get("ok"):
+        return Response(content=encoding.dumps({"tool": "query.execute", "data": data}), media_type="application/json")
+    if result_format == "arrow" and data.get("ok"):
+        body = encoding.to_arrow_ipc(
+            data["columns"],
+            data["values"],
+            metadata={
+                "sql": data["sql"],
+                "row_count": data["row_count"],
+                "cache_hit": data["cache_hit"],
+                **({"next_cursor": data["page"]["next_cursor"] or ""} if "page" in data else {}),
+            },
+        )
+        return Response(content=body, media_type=encoding.ARROW_MEDIA_TYPE)
+    return {"tool": "query.execute", "data": data}
+
+
+@app.post("/tools/query/ask")
+def query_ask(request: Request, payload: dict):
+    payload = _with_priority(request, payload)
+    data = query.ask(payload)
+    if payload.get("format") == "columnar" and data.get("ok"):
+        return Response(content=encoding.dumps({"tool": "query.ask", "data": data}), media_type="application/json")
+    return {"tool": "query.ask", "data": data}
+
+
+@app.post("/tools/query/ask-batch")
+def query_ask_batch(request: Request, payload: dict):
+    payload = _with_priority(request, payload)
+    data = query.ask_batch(payload)
+    if payload.get("format") == "columnar" and data.get("ok"):
+        return Response(content=encoding.dumps({"tool": "query.ask_batch", "data": data}), media_type="application/json")
+    return {"tool": "query.ask_batch", "data": data}
+
+
+@app.post("/tools/query/execute-stream")
+def query_execute_stream(request: Request, payload: dict):
+    payload = _with_priority(request, payload)
+    return StreamingResponse(query.execute_stream(payload), media_type="application/x-ndjson")
 
 @app.post("/tools/telemetry/log")
 def telemetry_log(payload: dict):
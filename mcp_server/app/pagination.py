@@ -0,0 +1,256 @@
+"""
+Keyset pagination for query.execute.
+
+A paged query runs the validated SQL as a subquery and walks it in a total
+order: the query's own top-level ORDER BY keys (output column names or
+ordinals) followed by every other output column as a tie-breaker. Each page is
+
+    SELECT * FROM (<sql>) AS page_src
+    WHERE <row strictly after the previous page's last row>
+    ORDER BY <keys> LIMIT <page_size + 1>
+
+so page N costs the same as page 1 (no OFFSET). The extra row only tells
+whether another page exists.
+
+The continuation token carries the last row's key values, the key order and a
+hash of the SQL, HMAC-signed with PAGINATION_TOKEN_SECRET (random per process
+if unset, so tokens then don't survive restarts or cross replicas).
+
+Rows that are identical in every column collapse at a page boundary; grouped
+results (one row per group) never have any.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from mcp_server.app.governance.lexer import SqlScan
+
+
+PAGINATION_TOKEN_SECRET = os.getenv("PAGINATION_TOKEN_SECRET", "").encode("utf-8") or os.urandom(32)
+DEFAULT_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "100"))
+
+_TOKEN_VERSION = 1
+
+
+class PaginationError(Exception):
+    def __init__(self, code: str, detail: Optional[str] = None):
+        super().__init__(code)
+        self.code = code
+        self.detail = detail
+
+
+@dataclass(frozen=True)
+class OrderKey:
+    column: str
+    descending: bool = False
+
+
+def inner_sql(scan: SqlScan) -> str:
+    """
+    The statement to page over: without its trailing ";", and without its
+    ORDER BY when nothing (LIMIT / OFFSET / FETCH) depends on it -- the page
+    query re-sorts anyway.
+    """
+    sql = scan.stripped.rstrip().rstrip(";").rstrip()
+    order_by = scan.order_by
+    if order_by is not None and not sql[order_by.end:].strip():
+        sql = sql[:order_by.start].rstrip()
+    return sql
+
+
+def shape_of(sql: str) -> str:
+    return hashlib.blake2b(sql.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _identifier(kind: str, text: str) -> str:
+    if kind == "qident":
+        return text[1:-1].replace('""', '"')
+    return text.lower()  # unquoted identifiers fold to lower case
+
+
+def order_keys(scan: SqlScan, columns: Sequence[str]) -> List[OrderKey]:
+    """
+    Resolves the ORDER BY items against the output column names and appends
+    the remaining columns (ascending) so that the order is total.
+    """
+    if len(set(columns)) != len(columns):
+        raise PaginationError("pagination_duplicate_columns", "output column names must be unique")
+
+    keys: List[OrderKey] = []
+    for item in (scan.order_by.items if scan.order_by is not None else []):
+        direction = "ASC"
+        if len(item) == 2 and item[1][0] == "word" and item[1][1].upper() in ("ASC", "DESC"):
+            direction = item[1][1].upper()
+            item = item[:1]
+        if len(item) != 1:
+            raise PaginationError("order_by_not_pageable", "ORDER BY items must be output columns, ASC or DESC")
+        kind, text = item[0]
+        if kind == "number" and text.isdigit() and 1 <= int(text) <= len(columns):
+            column = columns[int(text) - 1]
+        elif kind in ("word", "qident") and _identifier(kind, text) in columns:
+            column = _identifier(kind, text)
+        else:
+            raise PaginationError("order_by_not_pageable", f"{text} is not an output column")
+        if all(k.column != column for k in keys):
+            keys.append(OrderKey(column, direction == "DESC"))
+
+    keys += [OrderKey(c) for c in columns if all(k.column != c for k in keys)]
+    return keys
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    # untyped literal: Postgres resolves it to the column's type.
+    # Values only ever come from signed tokens built from query results.
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _after(column: str, value: Optional[str], descending: bool) -> Optional[str]:
+    """
+    "column sorts strictly after value" under Postgres' default NULL placement
+    (NULLS LAST for ASC, NULLS FIRST for DESC). None when nothing can.
+    """
+    if descending:
+        return f"{column} IS NOT NULL" if value is None else f"{column} < {_literal(value)}"
+    if value is None:
+        return None
+    return f"({column} > {_literal(value)} OR {column} IS NULL)"
+
+
+def _equal(column: str, value: Optional[str]) -> str:
+    return f"{column} IS NULL" if value is None else f"{column} = {_literal(value)}"
+
+
+def page_sql(inner: str, keys: List[OrderKey], last: Optional[List[Optional[str]]], page_size: int) -> str:
+    sql = f"SELECT * FROM ({inner}) AS page_src"
+    if last is not None:
+        terms = []
+        for i, key in enumerate(keys):
+            after = _after(f"page_src.{_quote_ident(key.column)}", last[i], key.descending)
+            if after is None:
+                continue
+            equal = [_equal(f"page_src.{_quote_ident(k.column)}", last[j]) for j, k in enumerate(keys[:i])]
+            terms.append("(" + " AND ".join(equal + [after]) + ")")
+        sql += " WHERE " + (" OR ".join(terms) if terms else "FALSE")
+    order = ", ".join(f"page_src.{_quote_ident(k.column)}{' DESC' if k.descending else ''}" for k in keys)
+    return f"{sql} ORDER BY {order} LIMIT {page_size + 1}"
+
+
+def _key_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(body: bytes) -> bytes:
+    return hmac.new(PAGINATION_TOKEN_SECRET, body, hashlib.sha256).digest()[:16]
+
+
+def encode_token(shape: str, keys: List[OrderKey], last: List[Optional[str]], page: int) -> str:
+    body = json.dumps(
+        {"v": _TOKEN_VERSION, "s": shape, "k": [[k.column, k.descending] for k in keys], "l": last, "p": page},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return f"{_b64(body)}.{_b64(_signature(body))}"
+
+
+def decode_token(token: str, shape: str) -> Tuple[List[OrderKey], List[Optional[str]], int]:
+    """
+    (keys, last key values, page number of the page it points to).
+    Raises PaginationError("invalid_cursor") for anything unsigned, tampered
+    with or minted for different SQL.
+    """
+    try:
+        body_b64, signature_b64 = token.split(".")
+        body = _unb64(body_b64)
+        if not hmac.compare_digest(_signature(body), _unb64(signature_b64)):
+            raise ValueError("bad signature")
+        data = json.loads(body)
+        if data["v"] != _TOKEN_VERSION:
+            raise ValueError("unsupported token version")
+        keys = [OrderKey(str(c), bool(d)) for c, d in data["k"]]
+        last = data["l"]
+        if len(last) != len(keys):
+            raise ValueError("malformed token")
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise PaginationError("invalid_cursor", str(e))
+    if data["s"] != shape:
+        raise PaginationError("invalid_cursor", "cursor was issued for different SQL")
+    return keys, last, int(data["p"])
+
+
+class Pager:
+    """
+    One page of a paged query: trims the page_size + 1 fetched rows and
+    builds the page metadata, including the next token.
+    """
+
+    def __init__(self, shape: str, keys: List[OrderKey], page_size: int, page: int):
+        self.shape = shape
+        self.keys = keys
+        self.page_size = page_size
+        self.page = page
+
+    def apply(self, result: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        rows = result["rows"]
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        next_cursor = None
+        if has_more:
+            names = [c["name"] for c in result["columns"]]
+            last = rows[-1]
+            values = [_key_text(last[names.index(k.column)]) for k in self.keys]
+            next_cursor = encode_token(self.shape, self.keys, values, self.page + 1)
+        page = {"number": self.page, "size": self.page_size, "has_more": has_more, "next_cursor": next_cursor}
+        return {**result, "rows": rows, "row_count": len(rows)}, page
+
+
+class ColumnCache:
+    """
+    Output column names per SQL shape, so only a query's first page pays for
+    describing it (later pages get the keys from their token).
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, shape: str) -> Optional[List[str]]:
+        with self._lock:
+            columns = self._entries.get(shape)
+            if columns is not None:
+                self._entries.move_to_end(shape)
+            return columns
+
+    def put(self, shape: str, columns: List[str]) -> None:
+        with self._lock:
+            self._entries[shape] = columns
+            self._entries.move_to_end(shape)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+column_cache = ColumnCache()
@@ -0,0 +1,164 @@
+"""
+Incremental rollup maintenance.
+
+Runs inside the MCP server (started by the app lifespan when
+ROLLUP_REFRESH_INTERVAL_SECONDS > 0) or standalone:
+
+    python -m mcp_server.app.rollups.maintainer            # loop
+    python -m mcp_server.app.rollups.maintainer --once     # fold what's pending, then exit
+    python -m mcp_server.app.rollups.maintainer --full     # full rebuild, then exit
+"""
+import argparse
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from mcp_server.app.db.repository import fold_rollups, refresh_rollups
+from mcp_server.app.rollups.registry import rollup_registry
+from mcp_server.app.telemetry.logger import log_event
+
+
+class RollupMaintainer:
+    """
+    Background thread that folds new fact_sales rows (above the sale_id
+    watermark) into the rollups every `interval_seconds`, in batches of
+    `batch_rows` until caught up.
+    """
+
+    def __init__(
+        self,
+        fold: Callable[[int], int],
+        interval_seconds: float = 5.0,
+        batch_rows: int = 100000,
+    ):
+        self._fold = fold
+        self.interval_seconds = interval_seconds
+        self.batch_rows = batch_rows
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # one run at a time per process (background thread vs /admin/rollups/refresh);
+        # fold_rollups() also serializes across processes
+        self._run_lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "rows_folded": 0,
+            "rebuilds": 0,
+            "errors": 0,
+            "last_run_ms": 0.0,
+            "last_error": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running or self.interval_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rollup-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def run_once(self) -> int:
+        """
+        Folds until caught up. Returns the rows folded (-1 if a rebuild ran).
+        """
+        with self._run_lock:
+            return self._fold_until_caught_up()
+
+    def _fold_until_caught_up(self) -> int:
+        started = time.monotonic()
+        total = 0
+        try:
+            while True:
+                folded = self._fold(self.batch_rows)
+                if folded < 0:
+                    # rows inserted during the rebuild are above its watermark: next run
+                    with self._lock:
+                        self._stats["rebuilds"] += 1
+                    total = -1
+                    break
+                total += folded
+                with self._lock:
+                    self._stats["rows_folded"] += folded
+                if folded < self.batch_rows or self._stop.is_set():
+                    break
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["last_error"] = str(e)
+            log_event({"event": "rollup_fold_failed", "error": str(e)})
+            raise
+        finally:
+            with self._lock:
+                self._stats["runs"] += 1
+                self._stats["last_run_ms"] = round((time.monotonic() - started) * 1000, 3)
+            rollup_registry.invalidate()
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_seconds": self.interval_seconds,
+                "batch_rows": self.batch_rows,
+                **self._stats,
+            }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                pass  # counted and logged in run_once; retried next interval
+            self._stop.wait(self.interval_seconds)
+
+
+_maintainer = RollupMaintainer(
+    fold=fold_rollups,
+    interval_seconds=float(os.getenv("ROLLUP_REFRESH_INTERVAL_SECONDS", "5.0")),
+    batch_rows=int(os.getenv("ROLLUP_FOLD_BATCH_ROWS", "100000")),
+)
+
+
+def get_maintainer() -> RollupMaintainer:
+    return _maintainer
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="fold pending rows once and exit")
+    parser.add_argument("--full", action="store_true", help="rebuild every rollup and exit")
+    parser.add_argument("--interval", type=float, default=_maintainer.interval_seconds)
+    args = parser.parse_args()
+
+    if args.full:
+        log_event({"event": "rollups_rebuilt", "source_version": refresh_rollups()})
+        return 0
+    if args.once:
+        log_event({"event": "rollups_folded", "rows": _maintainer.run_once()})
+        return 0
+
+    _maintainer.interval_seconds = args.interval
+    while True:
+        try:
+            folded = _maintainer.run_once()
+        except Exception:
+            folded = 0  # logged in run_once; retried next interval
+        if folded:
+            log_event({"event": "rollups_folded", "rows": folded})
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from mcp_server.app.db.repository import fetch_rollup_state
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """
+    A rollup table of fact_sales (db/init/09_rollups.sql), aliased `x`.
+
+    joins: dimension table ("dim_region r") -> join condition from the rollup
+    columns: dimension table -> its columns copied into the rollup itself
+    date_column: the rollup's date_id, for plans with a date range (None: it
+        can't answer them)
+    """
+
+    name: str
+    joins: Dict[str, str]
+    columns: Dict[str, FrozenSet[str]]
+    date_column: Optional[str] = None
+
+
+ROLLUPS: List[Rollup] = [
+    Rollup(
+        name="rollup_sales_daily",
+        joins={
+            "dim_date d": "x.date_id = d.date_id",
+            "dim_region r": "x.region_id = r.region_id",
+            "dim_product p": "x.product_id = p.product_id",
+        },
+        columns={},
+        date_column="x.date_id",
+    ),
+    Rollup(
+        name="rollup_sales_monthly",
+        joins={
+            "dim_region r": "x.region_id = r.region_id",
+            "dim_product p": "x.product_id = p.product_id",
+        },
+        columns={"dim_date d": frozenset({"year", "month"})},
+    ),
+    Rollup(
+        name="rollup_sales_region_product",
+        joins={
+            "dim_region r": "x.region_id = r.region_id",
+            "dim_product p": "x.product_id = p.product_id",
+        },
+        columns={},
+    ),
+]
+
+ROLLUP_TABLES = frozenset(r.name for r in ROLLUPS)
+
+
+class RollupRegistry:
+    """
+    Tracks which rollups are fresh enough to serve: no rebuild pending and at
+    most `max_lag_rows` fact rows / `max_lag_seconds` behind fact_sales (both 0
+    by default, i.e. exact). rollup_lag is re-read at most every `check_interval_seconds`.
+    """
+
+    def __init__(
+        self,
+        rollups: List[Rollup],
+        check_interval_seconds: float = 1.0,
+        max_lag_rows: int = 0,
+        max_lag_seconds: float = 0.0,
+        fetch: Callable[[], List[Dict[str, Any]]] = fetch_rollup_state,
+    ):
+        self.rollups = rollups
+        self.check_interval_seconds = check_interval_seconds
+        self.max_lag_rows = max_lag_rows
+        self.max_lag_seconds = max_lag_seconds
+        self._fetch = fetch
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def state(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            if self._state and time.monotonic() - self._checked_at < self.check_interval_seconds:
+                return self._state
+        try:
+            state = {row["rollup_name"]: row for row in self._fetch()}
+        except Exception:
+            state = {}  # treat every rollup as unavailable
+        with self._lock:
+            self._state = state
+            self._checked_at = time.monotonic()
+        return state
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._checked_at = 0.0
+
+    def is_fresh(self, row: Dict[str, Any]) -> bool:
+        return (
+            not row["rebuild_required"]
+            and row["rows_behind"] <= self.max_lag_rows
+            and row["seconds_behind"] <= self.max_lag_seconds
+        )
+
+    def fresh(self) -> List[Rollup]:
+        """
+        Rollups usable right now, smallest first.
+        """
+        state = self.state()
+        usable = [r for r in self.rollups if r.name in state and self.is_fresh(state[r.name])]
+        return sorted(usable, key=lambda r: state[r.name]["row_count"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": rollups_enabled(),
+            "max_lag_rows": self.max_lag_rows,
+            "max_lag_seconds": self.max_lag_seconds,
+            "rollups": [{**row, "fresh": self.is_fresh(row)} for row in self.state().values()],
+        }
+
+
+rollup_registry = RollupRegistry(
+    ROLLUPS,
+    check_interval_seconds=float(os.getenv("ROLLUP_STATE_CHECK_INTERVAL_SECONDS", "1.0")),
+    max_lag_rows=int(os.getenv("ROLLUP_MAX_LAG_ROWS", "0")),
+    max_lag_seconds=float(os.getenv("ROLLUP_MAX_LAG_SECONDS", "0")),
+)
+
+
+def rollups_enabled() -> bool:
+    return os.getenv("ROLLUPS_ENABLED", "true").lower() in ("1", "true", "yes")
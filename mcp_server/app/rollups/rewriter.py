@@ -0,0 +1,112 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from ai_service.app.time_ranges import date_id_predicate
+from mcp_server.app.cache.semantic_cache import SemanticSnapshot
+from mcp_server.app.governance.policies import DEFAULT_POLICY, SqlPolicy
+from mcp_server.app.rollups.registry import ROLLUP_TABLES, Rollup, RollupRegistry
+from mcp_server.app.semantic.compiler import CompiledQuery
+
+
+# rewritten SQL is validated against the default allowlist plus the rollups;
+# user SQL (query.execute) still can't read rollup tables directly
+ROLLUP_POLICY: SqlPolicy = replace(DEFAULT_POLICY, allowed_tables=DEFAULT_POLICY.allowed_tables | ROLLUP_TABLES)
+
+BASE_TABLE = "fact_sales f"
+
+# semantic metric expression (uppercase, single-spaced) -> exact equivalent over a rollup.
+# Casts keep the result types identical to the base query.
+_ADDITIVE_METRICS: Dict[str, str] = {
+    "SUM(F.TOTAL_AMOUNT)": "SUM(x.sum_amount)",
+    "SUM(F.QUANTITY)": "SUM(x.sum_quantity)::bigint",
+    "AVG(F.TOTAL_AMOUNT)": "SUM(x.sum_amount) / SUM(x.row_count)",
+    "COUNT(*)": "SUM(x.row_count)::bigint",
+}
+# COUNT(DISTINCT f.order_id) isn't additive and always runs on fact_sales
+
+
+@dataclass(frozen=True)
+class RollupRewrite:
+    rollup: str
+    sql: str
+
+
+def _key(expression: str) -> str:
+    return " ".join(expression.split()).upper()
+
+
+def _metric_columns(snapshot: SemanticSnapshot, metrics: Tuple[str, ...]) -> Optional[List[str]]:
+    """
+    Rollup select expressions for the metrics, or None when any metric can't
+    be answered exactly.
+    """
+    defs = {m["metric_name"]: m for m in snapshot.metrics}
+    columns: List[str] = []
+    for name in metrics:
+        m = defs.get(name)
+        if m is None or m["default_table"] != BASE_TABLE:
+            return None
+        key = _key(m["sql_expression"])
+        if key not in _ADDITIVE_METRICS:
+            return None
+        columns.append(f"{_ADDITIVE_METRICS[key]} AS {name}")
+    return columns
+
+
+def _dimension_columns(
+    snapshot: SemanticSnapshot, rollup: Rollup, dimensions: Tuple[str, ...]
+) -> Optional[Tuple[List[str], Dict[str, str]]]:
+    """
+    Select columns and joins for the dimensions over `rollup`, or None if the
+    rollup's grain doesn't carry one of them.
+    """
+    defs = {d["dimension_name"]: d for d in snapshot.dimensions}
+    select_cols: List[str] = []
+    joins: Dict[str, str] = {}  # table -> condition
+    for name in dimensions:
+        d = defs.get(name)
+        if d is None:
+            return None
+        table, column = d["table_name"], d["column_name"]
+        if column in rollup.columns.get(table, ()):
+            select_cols.append(f"x.{column}")
+        elif table in rollup.joins:
+            select_cols.append(f"{table.split()[-1]}.{column}")
+            joins[table] = rollup.joins[table]
+        else:
+            return None
+    return select_cols, joins
+
+
+def rewrite_plan(
+    snapshot: SemanticSnapshot, compiled: CompiledQuery, registry: RollupRegistry
+) -> Optional[RollupRewrite]:
+    """
+    SQL answering the compiled plan from the smallest fresh rollup that can
+    answer it exactly, or None to run it on fact_sales.
+    Output columns, their order and types match the base query.
+    """
+    metric_cols = _metric_columns(snapshot, compiled.metrics)
+    if metric_cols is None:
+        return None
+
+    for rollup in registry.fresh():
+        if compiled.date_range is not None and rollup.date_column is None:
+            continue
+        dimension_columns = _dimension_columns(snapshot, rollup, compiled.dimensions)
+        if dimension_columns is None:
+            continue
+        select_cols, joins = dimension_columns
+
+        sql = f"SELECT {', '.join(select_cols + metric_cols)} FROM {rollup.name} x "
+        for table, condition in joins.items():
+            sql += f"JOIN {table} ON {condition} "
+        predicate = date_id_predicate(rollup.date_column, compiled.date_range)
+        if predicate:
+            sql += f"WHERE {predicate} "
+        if select_cols:
+            sql += "GROUP BY " + ", ".join(select_cols) + " "
+            sql += f"ORDER BY {compiled.metrics[0]} DESC "
+        return RollupRewrite(rollup=rollup.name, sql=sql.strip())
+
+    return None
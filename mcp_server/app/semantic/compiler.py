@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ai_service.app.time_ranges import DateIdRange, date_id_predicate
+from mcp_server.app.cache.semantic_cache import SemanticSnapshot, semantic_cache
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    metrics: Tuple[str, ...]
+    dimensions: Tuple[str, ...]
+    sql: str
+    # inclusive date_id bounds applied to the base table's date_id
+    date_range: Optional[DateIdRange] = None
+
+
+class SemanticCompileError(ValueError):
+    def __init__(self, code: str, name: str):
+        super().__init__(f"{code}:{name}")
+        self.code = code
+        self.name = name
+
+
+def _alias(table: str) -> str:
+    # semantic tables store relations as "<table> <alias>", e.g. "dim_region r"
+    return table.split()[-1]
+
+
+def _dedup(names: Sequence[str]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(names))
+
+
+def compile_plan(
+    snapshot: SemanticSnapshot,
+    metrics: Sequence[str],
+    dimensions: Sequence[str],
+    date_range: Optional[DateIdRange] = None,
+) -> CompiledQuery:
+    """
+    Builds SQL for a (metrics, dimensions) plan from the semantic layer.
+
+    Repeated metrics/dimensions are dropped, and only dimension tables that a
+    selected column lives in are joined (each once). date_range filters the
+    base table's date_id. For a single metric the output matches the planner's
+    _build_sql text, so the validation and result caches are shared between
+    ask and execute callers.
+    Raises SemanticCompileError for unknown metrics, dimensions or joins.
+    """
+    metric_defs = {m["metric_name"]: m for m in snapshot.metrics}
+    dim_defs = {d["dimension_name"]: d for d in snapshot.dimensions}
+
+    metrics = _dedup(metrics)
+    dimensions = _dedup(dimensions)
+    if not metrics:
+        raise SemanticCompileError("unknown_metric", "")
+
+    for name in metrics:
+        if name not in metric_defs:
+            raise SemanticCompileError("unknown_metric", name)
+
+    base_table = metric_defs[metrics[0]]["default_table"]
+    for name in metrics[1:]:
+        if metric_defs[name]["default_table"] != base_table:
+            raise SemanticCompileError("incompatible_metrics", name)
+
+    join_conditions: Dict[str, str] = {
+        j["right_table"]: j["join_condition"] for j in snapshot.joins if j["left_table"] == base_table
+    }
+
+    select_cols: List[str] = []
+    joins: Dict[str, Tuple[str, str]] = {}  # table_alias -> (table, condition)
+
+    for name in dimensions:
+        d = dim_defs.get(name)
+        if d is None:
+            raise SemanticCompileError("unknown_dimension", name)
+        table = d["table_name"]
+        select_cols.append(f"{_alias(table)}.{d['column_name']}")
+        if table == base_table:
+            continue  # column on the fact table itself: no join
+        condition = join_conditions.get(table)
+        if condition is None:
+            raise SemanticCompileError("no_join_path", name)
+        joins[_alias(table)] = (table, condition)
+
+    metric_cols = [f"{metric_defs[name]['sql_expression']} AS {name}" for name in metrics]
+    select_clause = ", ".join(select_cols + metric_cols)
+    sql = f"SELECT {select_clause} FROM {base_table} "
+
+    for table, condition in joins.values():
+        sql += f"JOIN {table} ON {condition} "
+
+    predicate = date_id_predicate(f"{_alias(base_table)}.date_id", date_range)
+    if predicate:
+        sql += f"WHERE {predicate} "
+
+    if select_cols:
+        sql += "GROUP BY " + ", ".join(select_cols) + " "
+        sql += f"ORDER BY {metrics[0]} DESC "
+
+    return CompiledQuery(metrics=metrics, dimensions=dimensions, sql=sql.strip(), date_range=date_range)
+
+
+class TemplateCache:
+    """
+    Compiled SQL per (metrics, dimensions, date range) plan shape, for the current semantic
+    layer version. A semantic-layer reload (new ETag) drops every template.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._etag = None
+        self._entries: "OrderedDict[Tuple[Tuple[str, ...], Tuple[str, ...], Optional[DateIdRange]], CompiledQuery]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(
+        self, metrics: Sequence[str], dimensions: Sequence[str], date_range: Optional[DateIdRange] = None
+    ) -> CompiledQuery:
+        snapshot = semantic_cache.get()
+        key = (tuple(metrics), tuple(dimensions), date_range)
+
+        with self._lock:
+            if snapshot.etag != self._etag:
+                if self._etag is not None:
+                    self._stats["invalidations"] += 1
+                self._entries.clear()
+                self._etag = snapshot.etag
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return compiled
+            self._stats["misses"] += 1
+
+        compiled = compile_plan(snapshot, metrics, dimensions, date_range)
+
+        with self._lock:
+            if snapshot.etag == self._etag:
+                self._entries[key] = compiled
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return compiled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, **self._stats}
+
+
+template_cache = TemplateCache(max_entries=int(os.getenv("SQL_TEMPLATE_CACHE_SIZE", "512")))
@@ -0,0 +1,251 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+
+from mcp_server.app.db.admission import AdmissionRejected
+from mcp_server.app.db.telemetry_repository import insert_query_log, insert_query_logs
+from mcp_server.app.telemetry.logger import log_event
+
+# errors caused by the rows themselves (bad values, constraint violations), as
+# opposed to the connection or the server: worth retrying the rest of the batch
+_ROW_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, psycopg2.ProgrammingError, ValueError, TypeError)
+
+# backoff between flushes the "telemetry" admission class turned away
+ADMISSION_BACKOFF_SECONDS = 0.1
+MAX_ADMISSION_BACKOFF_SECONDS = 5.0
+# once stopping, give up on a batch after this many rejections so shutdown can't hang
+ADMISSION_RETRIES_ON_STOP = 3
+
+
+class TelemetryWriter:
+    """
+    Background writer for query_logs.
+
+    Request threads `submit()` rows into a bounded queue and return immediately.
+    A single flusher thread bulk-inserts them when `batch_size` rows are
+    buffered or `flush_interval_seconds` has passed, whichever comes first.
+    When the queue is full, `submit()` waits up to `enqueue_timeout_seconds`
+    (backpressure) and then drops the row, counting it. A batch that fails on
+    its rows' values is split until the bad rows are isolated; only those are
+    dropped (counted in `rejected_rows`). A flush turned away by admission
+    control is retried with backoff, holding the batch (new rows wait in the
+    queue meanwhile).
+    `stop()` drains everything still queued before returning.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Tuple]], int],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 1.0,
+        enqueue_timeout_seconds: float = 0.0,
+    ):
+        self._flush = flush
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.enqueue_timeout_seconds = enqueue_timeout_seconds
+
+        self._queue: "queue.Queue[Tuple]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "written": 0,
+            "batches": 0,
+            "flush_errors": 0,
+            "rejected_rows": 0,
+            "admission_retries": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, row: Tuple) -> bool:
+        try:
+            if self.enqueue_timeout_seconds > 0:
+                self._queue.put(row, timeout=self.enqueue_timeout_seconds)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._bump("dropped")
+            return False
+        self._bump("enqueued")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                **self._stats,
+            }
+
+    # ---------- flusher ----------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+        # drain on shutdown
+        while True:
+            batch = self._drain_nowait()
+            if not batch:
+                break
+            self._write(batch)
+
+    def _collect(self) -> List[Tuple]:
+        batch: List[Tuple] = []
+        deadline = time.monotonic() + self.flush_interval_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _drain_nowait(self) -> List[Tuple]:
+        batch: List[Tuple] = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[Tuple]) -> None:
+        started = time.monotonic()
+        try:
+            written = self._flush_isolating(batch)
+        except Exception as e:
+            with self._lock:
+                self._stats["flush_errors"] += 1
+                self._stats["dropped"] += len(batch)
+            log_event({"event": "telemetry_flush_failed", "rows": len(batch), "error": str(e)})
+            return
+        with self._lock:
+            self._stats["written"] += written
+            self._stats["batches"] += 1
+            self._stats["last_flush_ms"] = round((time.monotonic() - started) * 1000, 3)
+
+    def _flush_isolating(self, batch: List[Tuple]) -> int:
+        """
+        Flushes `batch`; on a row-level error, bisects it and flushes the halves.
+        Returns the rows written.
+        """
+        try:
+            return self._flush_admitted(batch)
+        except _ROW_ERRORS as e:
+            if len(batch) == 1:
+                with self._lock:
+                    self._stats["rejected_rows"] += 1
+                    self._stats["dropped"] += 1
+                log_event({"event": "telemetry_row_rejected", "tool_name": batch[0][0], "error": str(e)})
+                return 0
+        mid = len(batch) // 2
+        return self._flush_isolating(batch[:mid]) + self._flush_isolating(batch[mid:])
+
+    def _flush_admitted(self, batch: List[Tuple]) -> int:
+        """
+        Flushes `batch`, retrying with exponential backoff (or the controller's
+        Retry-After, if longer) while admission control rejects it.
+        """
+        backoff = ADMISSION_BACKOFF_SECONDS
+        attempts = 0
+        while True:
+            try:
+                return self._flush(batch)
+            except AdmissionRejected as e:
+                attempts += 1
+                if self._stop.is_set() and attempts >= ADMISSION_RETRIES_ON_STOP:
+                    raise
+                self._bump("admission_retries")
+                time.sleep(min(max(backoff, e.retry_after_seconds), MAX_ADMISSION_BACKOFF_SECONDS))
+                backoff = min(backoff * 2, MAX_ADMISSION_BACKOFF_SECONDS)
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+
+_writer = TelemetryWriter(
+    flush=insert_query_logs,
+    max_queue=int(os.getenv("TELEMETRY_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("TELEMETRY_BATCH_SIZE", "500")),
+    flush_interval_seconds=float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SECONDS", "1.0")),
+    enqueue_timeout_seconds=float(os.getenv("TELEMETRY_ENQUEUE_TIMEOUT_SECONDS", "0")),
+)
+
+
+def get_writer() -> TelemetryWriter:
+    return _writer
+
+
+def enqueue_query_log(
+    tool_name: str,
+    status: str,
+    question: Optional[str],
+    raw_sql: Optional[str],
+    validated_sql: Optional[str],
+    violation_codes: Optional[List[str]],
+    row_count: Optional[int],
+    execution_ms: Optional[int],
+) -> None:
+    """
+    Queue a query_logs row for the background writer.
+    Falls back to a synchronous insert when the writer is not running
+    (scripts and CLIs that don't go through the app lifespan).
+    """
+    if not _writer.running:
+        insert_query_log(
+            tool_name=tool_name,
+            status=status,
+            question=question,
+            raw_sql=raw_sql,
+            validated_sql=validated_sql,
+            violation_codes=violation_codes,
+            row_count=row_count,
+            execution_ms=execution_ms,
+        )
+        return
+
+    _writer.submit((
+        tool_name,
+        status,
+        question,
+        raw_sql,
+        validated_sql,
+        violation_codes,
+        row_count,
+        execution_ms,
+        datetime.now(timezone.utc),
+    ))
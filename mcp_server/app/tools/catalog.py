@@ -1,10 +1,10 @@
 from typing import List, Dict, Any
-from mcp_server.app.db.repository import fetch_semantic_metrics
+from mcp_server.app.cache.semantic_cache import semantic_cache
 
 
 def list_metrics() -> List[Dict[str, Any]]:
     """
     MCP Tool: catalog.list_metrics
-    Returns governed / approved metrics.
+    Returns governed / approved metrics (served from the semantic cache).
     """
-    return fetch_semantic_metrics()
+    return semantic_cache.get().metrics
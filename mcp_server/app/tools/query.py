@@ -39,44 +39,173 @@
 #     finally:
 #         conn.close()
 
+import math
+import os
 import time
-from typing import Dict, Any
-from psycopg2.extras import RealDictCursor
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from mcp_server.app.governance.validator import validate_sql
-from mcp_server.app.db.connection import get_db_connection
-from mcp_server.app.db.telemetry_repository import insert_query_log
+from ai_service.app.planner import generate_sql_plan
+from ai_service.app.time_ranges import parse_date_bound
+from mcp_server.app.cache.result_cache import ResultCache, result_cache, result_cache_enabled, star_schema_version
+from mcp_server.app.cache.semantic_cache import semantic_cache
+from mcp_server.app.cache.singleflight import coalescing_enabled, query_flights
+from mcp_server.app.encoding import columns_meta, ndjson_line, to_columnar, to_records
+from mcp_server.app.governance.cost import budget_details, check_cost_budget
+from mcp_server.app.governance.lexer import scan_sql
+from mcp_server.app.governance.policies import DEFAULT_POLICY, PAGED_POLICY, SqlPolicy
+from mcp_server.app.governance.validator import validate_sql_cached
+from mcp_server.app.hot_tier.manager import get_hot_tier, hot_tier_enabled
+from mcp_server.app.db.admission import DEFAULT_PRIORITY, AdmissionRejected, execution_slot, get_admission
+from mcp_server.app.db.connection import pooled_connection
+from mcp_server.app.db.prepared import execute_prepared
+from mcp_server.app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    Pager,
+    PaginationError,
+    column_cache,
+    decode_token,
+    inner_sql,
+    order_keys,
+    page_sql,
+    shape_of,
+)
+from mcp_server.app.rollups.registry import rollup_registry, rollups_enabled
+from mcp_server.app.rollups.rewriter import ROLLUP_POLICY, rewrite_plan
+from mcp_server.app.semantic.compiler import CompiledQuery, SemanticCompileError, template_cache
 from mcp_server.app.telemetry.logger import log_event
+from mcp_server.app.telemetry.writer import enqueue_query_log
+
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+MAX_STREAM_BATCH_SIZE = 10000
+
+RESULT_FORMATS = ("rows", "columnar", "arrow")
+# query.ask nests the result in a JSON envelope, so no arrow
+ASK_FORMATS = ("rows", "columnar")
+MAX_ASK_BATCH_QUESTIONS = 100
+
+
+def _record(
+    tool_name: str,
+    status: str,
+    question: Optional[str],
+    raw_sql: Optional[str],
+    validated_sql: Optional[str],
+    violation_codes: Optional[List[str]],
+    row_count: Optional[int],
+    started: float,
+    **event: Any,
+) -> int:
+    """
+    Writes the query_logs row and the structured log line for one tool call.
+    Returns the elapsed milliseconds that were recorded.
+    """
+    duration_ms = int((time.time() - started) * 1000)
+
+    enqueue_query_log(
+        tool_name=tool_name,
+        status=status,
+        question=question,
+        raw_sql=raw_sql,
+        validated_sql=validated_sql,
+        violation_codes=violation_codes,
+        row_count=row_count,
+        execution_ms=duration_ms,
+    )
+
+    log_event({
+        "tool_name": tool_name,
+        "status": status,
+        **({"row_count": row_count} if row_count is not None else {}),
+        **event,
+        "execution_ms": duration_ms,
+    })
+    return duration_ms
+
+
+def _shape(result: Dict[str, Any], result_format: str) -> Dict[str, Any]:
+    """
+    Builds the response body from a raw result (column metadata + row tuples).
+    "rows" keeps the original list-of-dicts shape; "columnar" / "arrow" return
+    column metadata plus one value list per column ("arrow" is encoded by the route).
+    """
+    body = {"ok": True, "row_count": result["row_count"], "sql": result["sql"]}
+    if result_format == "rows":
+        body["rows"] = to_records(result["columns"], result["rows"])
+    else:
+        body["format"] = result_format
+        body["columns"] = result["columns"]
+        body["values"] = to_columnar(result["columns"], result["rows"])
+    return body
+
+
+def _admission(payload: Dict[str, Any]) -> Tuple[str, Optional[float]]:
+    """
+    (priority class, queueing deadline in seconds) requested by a payload.
+    Raises ValueError(error code) for an unknown class or a malformed deadline.
+    """
+    priority = payload.get("priority") or DEFAULT_PRIORITY
+    if not isinstance(priority, str) or priority not in get_admission().classes:
+        raise ValueError("unknown_priority")
+    deadline_ms = payload.get("deadline_ms")
+    if deadline_ms is None:
+        return priority, None
+    try:
+        deadline_ms = float(deadline_ms)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("invalid_deadline_ms")
+    # NaN would never compare past the deadline and queue forever
+    if not math.isfinite(deadline_ms):
+        raise ValueError("invalid_deadline_ms")
+    return priority, max(deadline_ms, 0.0) / 1000
+
+
+def _admission_error(e: ValueError) -> Dict[str, Any]:
+    return {
+        "ok": False,
+        "error": str(e),
+        "priorities": list(get_admission().classes),
+    }
 
 
 def execute(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    MCP Tool: query.execute
+    Input: {"sql": "...", "question": "...?", "format": "rows" | "columnar" | "arrow"?,
+            "page_size": n?, "cursor": "..."?, "priority": "..."?, "deadline_ms": n?}
+
+    With page_size or cursor the result is paged (see mcp_server/app/pagination.py):
+    the response gains "page": {"number", "size", "has_more", "next_cursor"}, and
+    the next page is requested with the same sql plus "cursor": next_cursor.
+
+    priority ("interactive" by default, "batch" or "telemetry") and deadline_ms
+    select the admission class and cap how long the call may queue for a DB
+    slot (see mcp_server/app/db/admission.py); when it can't get one in time
+    AdmissionRejected is raised, which the route turns into a 429.
+    """
     sql = payload.get("sql", "")
     question = payload.get("question")
+    result_format = payload.get("format") or "rows"
 
     start = time.time()
-    validation = validate_sql(sql)
+    if result_format not in RESULT_FORMATS:
+        return {"ok": False, "error": "unsupported_format", "supported_formats": list(RESULT_FORMATS)}
+    try:
+        admission = _admission(payload)
+    except ValueError as e:
+        return _admission_error(e)
 
-    if not validation.is_valid:
-        duration_ms = int((time.time() - start) * 1000)
-
-        insert_query_log(
-            tool_name="query.execute",
-            status="blocked",
-            question=question,
-            raw_sql=sql,
-            validated_sql=None,
-            violation_codes=validation.violations,
-            row_count=None,
-            execution_ms=duration_ms,
+    if payload.get("page_size") is not None or payload.get("cursor"):
+        return _execute_page(
+            sql, question, result_format, payload.get("page_size"), payload.get("cursor"), start, admission
         )
 
-        log_event({
-            "tool_name": "query.execute",
-            "status": "blocked",
-            "violations": validation.violations,
-            "execution_ms": duration_ms,
-        })
+    validation = validate_sql_cached(sql)
 
+    if not validation.is_valid:
+        _record("query.execute", "blocked", question, sql, None, validation.violations, None, start,
+                violations=validation.violations)
         return {
             "ok": False,
             "error": "sql_validation_failed",
@@ -84,61 +213,539 @@ def execute(payload: Dict[str, Any]) -> Dict[str, Any]:
         }
 
     safe_sql = validation.sanitized_sql or sql
+    return _run("query.execute", question, sql, safe_sql, result_format, start, admission=admission)
+
+
+def _execute_page(
+    sql: str,
+    question: Optional[str],
+    result_format: str,
+    page_size: Any,
+    cursor: Optional[str],
+    start: float,
+    admission: Tuple[str, Optional[float]],
+) -> Dict[str, Any]:
+    validation = validate_sql_cached(sql, PAGED_POLICY)
+    if not validation.is_valid:
+        _record("query.execute", "blocked", question, sql, None, validation.violations, None, start,
+                violations=validation.violations)
+        return {
+            "ok": False,
+            "error": "sql_validation_failed",
+            "violations": validation.violations,
+        }
+
+    try:
+        page_size = int(page_size or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return {"ok": False, "error": "invalid_page_size"}
+    # governance still caps every page
+    page_size = min(max(page_size, 1), DEFAULT_POLICY.max_limit)
 
-    conn = get_db_connection()
+    scan = scan_sql(validation.sanitized_sql)
+    inner = inner_sql(scan)
+    shape = shape_of(inner)
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SET LOCAL statement_timeout = 3000;")
-            cur.execute(safe_sql)
-            rows = cur.fetchall()
-
-            duration_ms = int((time.time() - start) * 1000)
-
-            insert_query_log(
-                tool_name="query.execute",
-                status="success",
-                question=question,
-                raw_sql=sql,
-                validated_sql=safe_sql,
-                violation_codes=None,
-                row_count=len(rows),
-                execution_ms=duration_ms,
+        if cursor:
+            keys, last, page = decode_token(cursor, shape)
+        else:
+            keys, last, page = order_keys(scan, _output_columns(inner, shape, admission)), None, 1
+    except PaginationError as e:
+        return {"ok": False, "error": e.code, "detail": e.detail}
+    except AdmissionRejected as e:
+        _record("query.execute", "rejected", question, sql, None, [e.reason], None, start,
+                priority=e.priority, error=str(e))
+        raise
+
+    return _run(
+        "query.execute", question, sql, page_sql(inner, keys, last, page_size), result_format, start,
+        pager=Pager(shape, keys, page_size, page), admission=admission,
+    )
+
+
+def _output_columns(inner: str, shape: str, admission: Tuple[str, Optional[float]]) -> List[str]:
+    columns = column_cache.get(shape)
+    if columns is None:
+        with execution_slot(*admission), pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SET LOCAL statement_timeout = {int(DEFAULT_POLICY.statement_timeout_ms)};")
+                cur.execute(f"SELECT * FROM ({inner}) AS page_src LIMIT 0")
+                columns = [d.name for d in cur.description]
+        column_cache.put(shape, columns)
+    return columns
+
+
+def _run(
+    tool_name: str,
+    question: Optional[str],
+    sql: str,
+    safe_sql: str,
+    result_format: str,
+    start: float,
+    prepared: bool = False,
+    policy: SqlPolicy = DEFAULT_POLICY,
+    pager: Optional[Pager] = None,
+    admission: Tuple[str, Optional[float]] = (DEFAULT_PRIORITY, None),
+    cacheable: bool = True,
+) -> Dict[str, Any]:
+    """
+    Executes already-validated SQL through the result cache and shapes the result.
+    prepared=True runs it as a server-side prepared statement (compiled templates only).
+    cacheable=False bypasses the result cache, for SQL whose answer can change
+    without the star schema data version moving (rollups).
+
+    Before executing, the policy's cost budget is checked against EXPLAIN
+    estimates (cached per SQL text); over-budget SQL never runs and comes back
+    as {"ok": False, "error": "cost_budget_exceeded", ...}.
+    pager cuts the fetched rows down to one page and adds "page" to the response.
+
+    Concurrent calls with the same SQL, policy, data version and priority
+    class share one DB execution (single flight); each still gets its own
+    query_logs row, with status "coalesced" for the ones that joined. A joined
+    call waits no longer than its own deadline, and queues for itself if the
+    leader is rejected by admission control.
+
+    admission is the (priority class, deadline) the DB execution queues under;
+    cache hits and coalesced calls never take a slot. A rejection is logged
+    with status "rejected" and AdmissionRejected propagates.
+    """
+    # version is read before executing so a concurrent write can only make the entry stale
+    data_version = star_schema_version.current()
+    cache_key = (
+        ResultCache.key_for(safe_sql) if cacheable and data_version is not None and result_cache_enabled() else None
+    )
+
+    if cache_key is not None:
+        cached = result_cache.get(cache_key, data_version)
+        if cached is not None:
+            _record(tool_name, "cache_hit", question, sql, safe_sql, None, cached["row_count"], start)
+            return _respond(cached, result_format, True, pager)
+
+    def execute_once() -> Tuple[List[str], Any, Optional[Dict[str, Any]]]:
+        # release the connection before logging so telemetry never holds two
+        with execution_slot(*admission), pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SET LOCAL statement_timeout = {int(policy.statement_timeout_ms)};")
+                violations, estimate = check_cost_budget(cur, safe_sql.rstrip(";"), policy, data_version)
+                if violations:
+                    return violations, estimate, None
+                if prepared:
+                    execute_prepared(cur, safe_sql.rstrip(";"))
+                else:
+                    cur.execute(safe_sql)
+                rows = cur.fetchall()
+                columns = columns_meta(cur.description)
+        # cached raw (tuples + column metadata) so every format can be served from it
+        result = {"row_count": len(rows), "columns": columns, "rows": rows, "sql": safe_sql}
+        if cache_key is not None:
+            result_cache.put(cache_key, data_version, result)
+        return [], None, result
+
+    try:
+        if coalescing_enabled():
+            # joined callers only wait on leaders of their own class, no longer
+            # than their own deadline, and queue for themselves if it is rejected
+            (violations, estimate, result), coalesced = query_flights.do(
+                (safe_sql, policy, data_version, admission[0]), execute_once,
+                timeout=admission[1], rerun_on=(AdmissionRejected,),
             )
+        else:
+            (violations, estimate, result), coalesced = execute_once(), False
+    except AdmissionRejected as e:
+        _record(tool_name, "rejected", question, sql, safe_sql, [e.reason], None, start,
+                priority=e.priority, error=str(e))
+        raise
+    except Exception as e:
+        _record(tool_name, "error", question, sql, None, [str(e)], None, start, error=str(e))
+        raise
+
+    if violations:
+        cost = budget_details(estimate, policy)
+        _record(tool_name, "blocked", question, sql, safe_sql, violations, None, start, violations=violations, cost=cost)
+        return {"ok": False, "error": "cost_budget_exceeded", "violations": violations, "cost": cost, "sql": safe_sql}
+
+    _record(tool_name, "coalesced" if coalesced else "success", question, sql, safe_sql, None, result["row_count"], start)
+    return {**_respond(result, result_format, False, pager), **({"coalesced": True} if coalesced else {})}
+
+
+def _respond(result: Dict[str, Any], result_format: str, cache_hit: bool, pager: Optional[Pager]) -> Dict[str, Any]:
+    if pager is None:
+        return {**_shape(result, result_format), "cache_hit": cache_hit}
+    result, page = pager.apply(result)
+    return {**_shape(result, result_format), "cache_hit": cache_hit, "page": page}
+
+
+def ask(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    MCP Tool: query.ask
+    Input: {"question": "..."} or {"metric": "..." | "metrics": [...], "dimensions": [...],
+           "date_from": "YYYY-MM-DD"?, "date_to": "YYYY-MM-DD"?},
+           plus "format": "rows" | "columnar"?, "priority": "..."?, "deadline_ms": n?
+    Plans (if given a question), compiles SQL from the semantic layer, validates
+    once and executes -- the same output as the orchestrator's answer_question
+    (plus "metrics" when several were requested).
+
+    Compiled SQL is cached per plan shape and runs as a prepared statement, so
+    repeated shapes skip both compilation and Postgres parse/plan. Plans a fresh
+    rollup can answer exactly run on it instead; result["served_by"] names the
+    table that served the query ("hot_tier" when answered in memory).
 
-            log_event({
-                "tool_name": "query.execute",
-                "status": "success",
-                "row_count": len(rows),
-                "execution_ms": duration_ms,
-            })
+    A time range -- from the question ("last 7 days") or date_from / date_to
+    (inclusive) -- becomes a date_id predicate and "date_range" in the output.
+    """
+    question = payload.get("question")
+    result_format = payload.get("format") or "rows"
+
+    start = time.time()
+    if result_format not in ASK_FORMATS:
+        return {"ok": False, "error": "unsupported_format", "supported_formats": list(ASK_FORMATS)}
+    try:
+        admission = _admission(payload)
+    except ValueError as e:
+        return _admission_error(e)
+
+    if payload.get("metric") or payload.get("metrics"):
+        metrics = payload.get("metrics") or [payload["metric"]]
+        dimensions = payload.get("dimensions") or []
+        if not isinstance(metrics, list) or not isinstance(dimensions, list):
+            return {"ok": False, "error": "metrics_and_dimensions_must_be_lists"}
+        try:
+            date_range = (parse_date_bound(payload.get("date_from")), parse_date_bound(payload.get("date_to")))
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "invalid_date_range"}
+        date_range = date_range if date_range != (None, None) else None
+    elif question:
+        try:
+            plan = generate_sql_plan(question)
+        except ValueError:
+            return {"ok": False, "error": "invalid_time_range"}
+        metrics, dimensions, date_range = [plan.metric], plan.dimensions, plan.date_range
+    else:
+        return {"ok": False, "error": "question_or_metric_required"}
+
+    try:
+        compiled = template_cache.get(metrics, dimensions, date_range)
+    except SemanticCompileError as e:
+        return {"ok": False, "stage": "compile", "error": e.code, "name": e.name}
+    plan_fields = {"metric": compiled.metrics[0], "dimensions": list(compiled.dimensions)}
+    if len(compiled.metrics) > 1:
+        plan_fields["metrics"] = list(compiled.metrics)
+    if date_range is not None:
+        plan_fields["date_range"] = list(date_range)
 
-            return {
+    out = _run_compiled("query.ask", compiled, question, result_format, start, admission)
+    return {"ok": out["ok"], **plan_fields, **{k: v for k, v in out.items() if k != "ok"}}
+
+
+def _run_compiled(
+    tool_name: str,
+    compiled: CompiledQuery,
+    question: Optional[str],
+    result_format: str,
+    start: float,
+    admission: Tuple[str, Optional[float]],
+) -> Dict[str, Any]:
+    """
+    Validates semantic-layer SQL and answers it from the hot tier when that is
+    enabled and current; otherwise moves it onto a rollup when one answers it
+    exactly, and executes it as a prepared statement.
+    Returns {"ok": True, "generated_sql", "executed_sql", "result"} or
+    {"ok": False, "stage": "validate" | "cost", "sql", "violations", ...}.
+    """
+    validation = validate_sql_cached(compiled.sql)
+    if not validation.is_valid:
+        _record(tool_name, "blocked", question, compiled.sql, None, validation.violations, None, start,
+                violations=validation.violations)
+        return {
+            "ok": False,
+            "stage": "validate",
+            "sql": compiled.sql,
+            "violations": validation.violations,
+        }
+
+    safe_sql = validation.sanitized_sql or compiled.sql
+    served_by = "fact_sales"
+    policy = DEFAULT_POLICY
+
+    if hot_tier_enabled():
+        hot = get_hot_tier().answer(
+            semantic_cache.get(), compiled, DEFAULT_POLICY.max_limit, star_schema_version.current()
+        )
+        if hot is not None:
+            # in process: no DB execution, so no admission slot and nothing worth caching
+            _record(tool_name, "success", question, compiled.sql, safe_sql, None, hot["row_count"], start,
+                    served_by="hot_tier")
+            result = {**_respond({**hot, "sql": safe_sql}, result_format, False, None), "served_by": "hot_tier"}
+            return {"ok": True, "generated_sql": compiled.sql, "executed_sql": safe_sql, "result": result}
+
+    # route to the smallest fresh rollup that answers the plan exactly
+    rewrite = rewrite_plan(semantic_cache.get(), compiled, rollup_registry) if rollups_enabled() else None
+    if rewrite is not None:
+        rollup_validation = validate_sql_cached(rewrite.sql, ROLLUP_POLICY)
+        if rollup_validation.is_valid:
+            safe_sql = rollup_validation.sanitized_sql
+            served_by = rewrite.rollup
+            policy = ROLLUP_POLICY
+
+    result = {
+        **_run(
+            tool_name, question, compiled.sql, safe_sql, result_format, start,
+            prepared=True, policy=policy, admission=admission,
+            # a rollup can lag fact_sales (freshness is checked once a second, or
+            # ROLLUP_MAX_LAG_* allows it), so its answer isn't keyed by the data version
+            cacheable=served_by == "fact_sales",
+        ),
+        "served_by": served_by,
+    }
+    if not result["ok"]:
+        return {
+            "ok": False,
+            "stage": "cost",
+            "sql": compiled.sql,
+            "violations": result["violations"],
+            "cost": result["cost"],
+        }
+    return {
+        "ok": True,
+        "generated_sql": compiled.sql,
+        "executed_sql": result["sql"],
+        "result": result,
+    }
+
+
+def ask_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    MCP Tool: query.ask_batch
+    Input: {"questions": ["...", ...], "format": "rows" | "columnar"?, "priority": "..."?, "deadline_ms": n?}
+
+    Answers many questions with as few fact-table scans as possible: plans with
+    the same dimension set and time range are fused into one statement computing all of their
+    metrics (the semantic compiler's multi-metric SQL), and its result is split
+    back into one query.ask-shaped answer per question, in input order.
+
+    Metrics that can't share a statement (different base tables) run on their
+    own. So does every question of a group whose fused result reaches
+    max_limit rows: the fused statement is ordered by one metric, so a clamped
+    result could be missing another metric's top rows.
+
+    Output: {"ok": True, "answers": [...], "groups": [{"metrics", "dimensions",
+    "questions": [indexes], "sql", "served_by"}], "statements": n, "scans_saved": n}
+    where scans_saved is the questions answered minus the statements executed.
+    """
+    questions = payload.get("questions")
+    result_format = payload.get("format") or "rows"
+
+    start = time.time()
+    if not isinstance(questions, list) or not questions or not all(isinstance(q, str) for q in questions):
+        return {"ok": False, "error": "questions_must_be_a_list_of_strings"}
+    if len(questions) > MAX_ASK_BATCH_QUESTIONS:
+        return {"ok": False, "error": "too_many_questions", "max_questions": MAX_ASK_BATCH_QUESTIONS}
+    if result_format not in ASK_FORMATS:
+        return {"ok": False, "error": "unsupported_format", "supported_formats": list(ASK_FORMATS)}
+    try:
+        admission = _admission(payload)
+    except ValueError as e:
+        return _admission_error(e)
+
+    try:
+        plans = [generate_sql_plan(q) for q in questions]
+    except ValueError:
+        return {"ok": False, "error": "invalid_time_range"}
+
+    # (dimension set, date range) -> question indexes, in order of first appearance
+    by_dimensions: Dict[Tuple[frozenset, Any], List[int]] = {}
+    for i, plan in enumerate(plans):
+        by_dimensions.setdefault((frozenset(plan.dimensions), plan.date_range), []).append(i)
+
+    answers: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+    groups: List[Dict[str, Any]] = []
+    answered = 0  # questions answered from a statement's result
+    pending = list(by_dimensions.values())
+    while pending:
+        members = pending.pop(0)
+        dimensions = list(dict.fromkeys(plans[members[0]].dimensions))
+        metrics = list(dict.fromkeys(plans[i].metric for i in members))
+        date_range = plans[members[0]].date_range
+        try:
+            compiled = template_cache.get(metrics, dimensions, date_range)
+        except SemanticCompileError as e:
+            if len(metrics) > 1:
+                pending[:0] = _split_by_metric(members, plans)
+                continue
+            for i in members:
+                answers[i] = {"ok": False, "stage": "compile", "error": e.code, "name": e.name}
+            continue
+
+        out = _run_compiled(
+            "query.ask_batch", compiled, "\n".join(questions[i] for i in members), "columnar", start, admission
+        )
+        groups.append({
+            "metrics": metrics,
+            "dimensions": dimensions,
+            "questions": members,
+            "sql": compiled.sql,
+            "served_by": out["result"]["served_by"] if out["ok"] else None,
+        })
+        if len(metrics) > 1 and out["ok"] and out["result"]["row_count"] >= DEFAULT_POLICY.max_limit:
+            groups[-1]["clamped"] = True
+            pending[:0] = _split_by_metric(members, plans)
+            continue
+
+        answered += len(members)
+        for i in members:
+            fields = {"metric": plans[i].metric, "dimensions": list(plans[i].dimensions)}
+            if date_range is not None:
+                fields["date_range"] = list(date_range)
+            if not out["ok"]:
+                answers[i] = {"ok": False, **fields, **{k: v for k, v in out.items() if k != "ok"}}
+                continue
+            answers[i] = {
                 "ok": True,
-                "row_count": len(rows),
-                "rows": [dict(r) for r in rows],
-                "sql": safe_sql,
+                **fields,
+                "generated_sql": out["generated_sql"],
+                "executed_sql": out["executed_sql"],
+                "result": _project(out["result"], compiled, plans[i].metric, fields["dimensions"], result_format),
             }
-    except Exception as e:
-        duration_ms = int((time.time() - start) * 1000)
-
-        insert_query_log(
-            tool_name="query.execute",
-            status="error",
-            question=question,
-            raw_sql=sql,
-            validated_sql=None,
-            violation_codes=[str(e)],
-            row_count=None,
-            execution_ms=duration_ms,
+
+    return {
+        "ok": True,
+        "answers": answers,
+        "groups": groups,
+        "statements": len(groups),
+        "scans_saved": answered - len(groups),
+    }
+
+
+def _split_by_metric(members: List[int], plans: List[Any]) -> List[List[int]]:
+    by_metric: Dict[str, List[int]] = {}
+    for i in members:
+        by_metric.setdefault(plans[i].metric, []).append(i)
+    return list(by_metric.values())
+
+
+def _project(
+    result: Dict[str, Any], compiled: CompiledQuery, metric: str, dimensions: List[str], result_format: str
+) -> Dict[str, Any]:
+    """
+    One question's share of a fused (columnar) result: its dimension columns
+    and its metric, ordered by that metric descending as its own query would be.
+    """
+    # fused SQL selects the dimensions, then the metrics, in compiled order
+    positions = [compiled.dimensions.index(d) for d in dimensions]
+    positions.append(len(compiled.dimensions) + compiled.metrics.index(metric))
+    columns = [result["columns"][p] for p in positions]
+    values = [result["values"][p] for p in positions]
+
+    if dimensions:
+        # ORDER BY ... DESC puts NULLs first
+        order = sorted(
+            range(result["row_count"]),
+            key=lambda r: (values[-1][r] is None, values[-1][r] if values[-1][r] is not None else 0),
+            reverse=True,
         )
+        values = [[column[r] for r in order] for column in values]
+
+    out = {k: v for k, v in result.items() if k not in ("format", "columns", "values")}
+    if result_format == "rows":
+        out["rows"] = to_records(columns, list(zip(*values)))
+    else:
+        out.update({"format": result_format, "columns": columns, "values": values})
+    return out
+
+
+def execute_stream(payload: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    MCP Tool: query.execute_stream
+    Input: {"sql": "...", "question": "...?", "batch_size": n?, "priority": "..."?, "deadline_ms": n?}
+    Output: NDJSON lines
+        {"type": "header", "columns": [{"name": ..., "type_oid": ...}], "sql": ...}
+        {"type": "rows", "rows": [[...], ...]}          (one per fetched batch)
+        {"type": "end", "row_count": n, "execution_ms": ms}
+    or a single {"type": "error", ...} line; an error after the header ends the stream.
+
+    Rows are fetched through a server-side (named) cursor, so only one batch is
+    held in memory at a time regardless of the result size. The admission slot
+    is held until the last batch is sent; a rejection is an error line with
+    "error": "admission_rejected" and "retry_after_seconds".
+    """
+    sql = payload.get("sql", "")
+    question = payload.get("question")
+    try:
+        batch_size = min(max(int(payload.get("batch_size") or STREAM_BATCH_SIZE), 1), MAX_STREAM_BATCH_SIZE)
+    except (TypeError, ValueError, OverflowError):
+        yield ndjson_line({"type": "error", "error": "invalid_batch_size"})
+        return
 
-        log_event({
-            "tool_name": "query.execute",
-            "status": "error",
-            "error": str(e),
-            "execution_ms": duration_ms,
+    start = time.time()
+    try:
+        admission = _admission(payload)
+    except ValueError as e:
+        yield ndjson_line({"type": "error", **_admission_error(e)})
+        return
+    validation = validate_sql_cached(sql)
+
+    if not validation.is_valid:
+        _record("query.execute_stream", "blocked", question, sql, None, validation.violations, None, start,
+                violations=validation.violations)
+        yield ndjson_line({
+            "type": "error",
+            "error": "sql_validation_failed",
+            "violations": validation.violations,
         })
+        return
+
+    safe_sql = validation.sanitized_sql or sql
+    row_count = 0
 
+    try:
+        with execution_slot(*admission), pooled_connection() as conn:
+            with conn.cursor() as setup:
+                setup.execute(f"SET LOCAL statement_timeout = {int(DEFAULT_POLICY.statement_timeout_ms)};")
+                violations, estimate = check_cost_budget(
+                    setup, safe_sql.rstrip(";"), DEFAULT_POLICY, star_schema_version.current()
+                )
+            if violations:
+                cost = budget_details(estimate, DEFAULT_POLICY)
+                _record("query.execute_stream", "blocked", question, sql, safe_sql, violations, None, start,
+                        violations=violations, cost=cost)
+                yield ndjson_line({"type": "error", "error": "cost_budget_exceeded", "violations": violations, "cost": cost})
+                return
+
+            with conn.cursor(name=f"qstream_{uuid.uuid4().hex}") as cur:
+                cur.itersize = batch_size
+                cur.execute(safe_sql)
+
+                batch = cur.fetchmany(batch_size)
+                yield ndjson_line({
+                    "type": "header",
+                    "columns": columns_meta(cur.description),
+                    "sql": safe_sql,
+                })
+
+                while batch:
+                    row_count += len(batch)
+                    yield ndjson_line({"type": "rows", "rows": batch})
+                    batch = cur.fetchmany(batch_size)
+    except GeneratorExit:
+        # client went away; the pool rolls back and reclaims the connection
+        _record("query.execute_stream", "error", question, sql, safe_sql, ["client_disconnected"], row_count, start,
+                error="client_disconnected")
         raise
-    finally:
-        conn.close()
\ No newline at end of file
+    except AdmissionRejected as e:
+        _record("query.execute_stream", "rejected", question, sql, safe_sql, [e.reason], None, start,
+                priority=e.priority, error=str(e))
+        yield ndjson_line({
+            "type": "error",
+            "error": "admission_rejected",
+            "reason": e.reason,
+            "priority": e.priority,
+            "retry_after_seconds": round(e.retry_after_seconds, 3),
+        })
+        return
+    except Exception as e:
+        _record("query.execute_stream", "error", question, sql, None, [str(e)], None, start, error=str(e))
+        yield ndjson_line({"type": "error", "error": str(e)})
+        return
+
+    duration_ms = _record("query.execute_stream", "success", question, sql, safe_sql, None, row_count, start)
+    yield ndjson_line({"type": "end", "row_count": row_count, "execution_ms": duration_ms})
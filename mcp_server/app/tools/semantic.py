@@ -1,16 +1,17 @@
 from typing import Dict, Any
 from mcp_server.app.governance.policies import DEFAULT_POLICY
-from mcp_server.app.db.repository import fetch_semantic_metrics
+from mcp_server.app.cache.semantic_cache import semantic_cache
 
 
 def get_semantic_model() -> Dict[str, Any]:
     """
     MCP Tool: catalog.get_semantic_model
-    Returns allowed tables + available metrics (MVP).
-    In the future it will include joins + dimensions, too.
+    Returns allowed tables + metrics, dimensions and joins of the semantic layer.
     """
-    metrics = fetch_semantic_metrics()
+    snapshot = semantic_cache.get()
     return {
         "allowed_tables": sorted(list(DEFAULT_POLICY.allowed_tables)),
-        "metrics": metrics,
+        "metrics": snapshot.metrics,
+        "dimensions": snapshot.dimensions,
+        "joins": snapshot.joins,
     }
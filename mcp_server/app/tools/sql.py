@@ -1,5 +1,7 @@
 from typing import Dict, Any
-from mcp_server.app.governance.validator import validate_sql
+from mcp_server.app.governance.validator import validate_sql_cached
+
+MAX_BATCH_STATEMENTS = 1000
 
 
 def validate(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -9,9 +11,30 @@ def validate(payload: Dict[str, Any]) -> Dict[str, Any]:
     Output: {"is_valid": bool, "violations": [...], "sanitized_sql": "...?"}
     """
     sql = payload.get("sql", "")
-    result = validate_sql(sql)
+    result = validate_sql_cached(sql)
     return {
         "is_valid": result.is_valid,
         "violations": result.violations,
         "sanitized_sql": result.sanitized_sql,
     }
+
+
+def validate_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    MCP Tool: sql.validate_batch
+    Input: {"statements": ["...", ...]}
+    Output: {"count": n, "invalid": k, "results": [<sql.validate output>, ...]} in input order
+    """
+    statements = payload.get("statements")
+    if not isinstance(statements, list):
+        return {"ok": False, "error": "statements_must_be_a_list"}
+    if len(statements) > MAX_BATCH_STATEMENTS:
+        return {"ok": False, "error": "too_many_statements", "max_statements": MAX_BATCH_STATEMENTS}
+
+    results = [validate({"sql": sql if isinstance(sql, str) else ""}) for sql in statements]
+    return {
+        "ok": True,
+        "count": len(results),
+        "invalid": sum(1 for r in results if not r["is_valid"]),
+        "results": results,
+    }
@@ -1,22 +1,68 @@
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 
-from mcp_server.app.db.telemetry_repository import insert_query_log
 from mcp_server.app.telemetry.logger import log_event
+from mcp_server.app.telemetry.writer import enqueue_query_log
+
+_INT4_MAX = 2**31 - 1
+
+
+def _text(value: Any) -> Optional[str]:
+    # Postgres TEXT can't hold NUL characters
+    return None if value is None else str(value).replace("\x00", "")
+
+
+def _int4(value: Any, error: str) -> Optional[int]:
+    if value is None:
+        return None
+    # int() would truncate 1.5 and overflows on inf (JSON 1e400 / Infinity)
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(error)
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(error)
+    if isinstance(value, bool) or not -_INT4_MAX - 1 <= number <= _INT4_MAX:
+        raise ValueError(error)
+    return number
+
+
+def _violation_codes(value: Any) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [_text(value)]
+    if not isinstance(value, list) or any(isinstance(v, (list, dict)) for v in value):
+        raise ValueError("invalid_violation_codes")
+    return [_text(v) for v in value]
 
 
 def log(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     MCP Tool: telemetry.log_event
+    Input: {"tool_name": "...", "status": "...", plus optional "question",
+           "raw_sql", "validated_sql", "violation_codes": [...], "row_count", "execution_ms"}
+    The row is checked against the query_logs column types before it is
+    queued, so one malformed call can't fail the writer's whole batch.
     """
-    insert_query_log(
-        tool_name=payload.get("tool_name"),
-        status=payload.get("status"),
-        question=payload.get("question"),
-        raw_sql=payload.get("raw_sql"),
-        validated_sql=payload.get("validated_sql"),
-        violation_codes=payload.get("violation_codes"),
-        row_count=payload.get("row_count"),
-        execution_ms=payload.get("execution_ms"),
+    tool_name, status = payload.get("tool_name"), payload.get("status")
+    if not isinstance(tool_name, str) or not tool_name or not isinstance(status, str) or not status:
+        return {"ok": False, "error": "tool_name_and_status_required"}
+    try:
+        violation_codes = _violation_codes(payload.get("violation_codes"))
+        row_count = _int4(payload.get("row_count"), "invalid_row_count")
+        execution_ms = _int4(payload.get("execution_ms"), "invalid_execution_ms")
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+
+    enqueue_query_log(
+        tool_name=_text(tool_name),
+        status=_text(status),
+        question=_text(payload.get("question")),
+        raw_sql=_text(payload.get("raw_sql")),
+        validated_sql=_text(payload.get("validated_sql")),
+        violation_codes=violation_codes,
+        row_count=row_count,
+        execution_ms=execution_ms,
     )
 
     log_event(payload)
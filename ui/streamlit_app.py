@@ -2,7 +2,7 @@ import os
 import pandas as pd
 import streamlit as st
 
-from ai_service.app.orchestrator import answer_question
+from ai_service.app.orchestrator import answer_question, answer_questions_batch, get_client
 
 
 st.set_page_config(page_title="Internal AI Data Assistant", layout="wide")
@@ -13,6 +13,7 @@ st.caption("Ask a business question → governed SQL → safe execution → obse
 # Config
 default_mcp_url = os.getenv("MCP_BASE_URL", "http://localhost:8000")
 mcp_base_url = st.sidebar.text_input("MCP Server URL", value=default_mcp_url)
+page_size = int(os.getenv("UI_PAGE_SIZE", "100"))
 
 st.sidebar.markdown("### Example questions")
 examples = [
@@ -24,6 +25,8 @@ examples = [
 for ex in examples:
     if st.sidebar.button(ex):
         st.session_state["question"] = ex
+# one round-trip; questions sharing dimensions share a fact-table scan
+run_examples = st.sidebar.button("Answer all examples")
 
 question = st.text_input("Your question", value=st.session_state.get("question", ""))
 
@@ -33,35 +36,88 @@ clear = col2.button("Clear")
 
 if clear:
     st.session_state["question"] = ""
+    st.session_state.pop("answer", None)
+    st.session_state.pop("batch", None)
     st.rerun()
 
+
+def _frame(result):
+    # columnar payload -> DataFrame without building per-row dicts
+    return pd.DataFrame({c["name"]: v for c, v in zip(result["columns"], result["values"])})
+
+
 if run:
     if not question.strip():
         st.warning("Please enter a question.")
     else:
         with st.spinner("Generating governed SQL and executing..."):
-            out = answer_question(mcp_base_url=mcp_base_url, question=question)
+            out = answer_question(
+                mcp_base_url=mcp_base_url, question=question, result_format="columnar", page_size=page_size
+            )
+        st.session_state["answer"] = {"question": question, "out": out, "pages": []}
+        if out.get("ok"):
+            st.session_state["answer"]["pages"].append(_frame(out["result"]))
+
+if run_examples:
+    with st.spinner("Answering example questions..."):
+        st.session_state["batch"] = answer_questions_batch(mcp_base_url, examples, result_format="columnar")
+
+batch = st.session_state.get("batch")
+if batch:
+    st.subheader("Example questions")
+    st.caption(
+        f"{len(batch['answers'])} questions, {batch['statements']} SQL statements "
+        f"({batch['scans_saved']} scans saved)"
+    )
+    for ex, ex_out in zip(examples, batch["answers"]):
+        with st.expander(ex):
+            if ex_out.get("ok"):
+                st.dataframe(_frame(ex_out["result"]), use_container_width=True)
+            else:
+                st.write(ex_out)
+
+answer = st.session_state.get("answer")
+if answer:
+    out = answer["out"]
 
-        st.subheader("Plan")
-        st.write({
-            "ok": out.get("ok"),
-            "metric": out.get("metric"),
-            "dimensions": out.get("dimensions"),
-        })
+    st.subheader("Plan")
+    st.write({
+        "ok": out.get("ok"),
+        "metric": out.get("metric"),
+        "dimensions": out.get("dimensions"),
+    })
 
-        st.subheader("SQL")
-        st.code(out.get("executed_sql") or out.get("sql") or "", language="sql")
+    st.subheader("SQL")
+    st.code(out.get("executed_sql") or out.get("sql") or "", language="sql")
 
-        if not out.get("ok"):
-            st.error("Request blocked or failed.")
-            st.write(out)
+    if not out.get("ok"):
+        st.error("Request blocked or failed.")
+        st.write(out)
+    else:
+        st.subheader("Results")
+        df = pd.concat(answer["pages"], ignore_index=True) if answer["pages"] else pd.DataFrame()
+
+        if len(df):
+            st.dataframe(df, use_container_width=True)
         else:
-            result = out["result"]
-            rows = result.get("rows", [])
-            st.subheader("Results")
+            st.info("Query returned no rows.")
 
-            if rows:
-                df = pd.DataFrame(rows)
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("Query returned no rows.")
+        # further pages are fetched on demand with the continuation token
+        page = out["result"].get("page") or {}
+        if page.get("next_cursor"):
+            st.caption(f"{len(df)} rows loaded")
+            if st.button("Load more"):
+                with st.spinner("Fetching next page..."):
+                    result = get_client(mcp_base_url).execute_query(
+                        out["generated_sql"],
+                        question=answer["question"],
+                        result_format="columnar",
+                        page_size=page_size,
+                        cursor=page["next_cursor"],
+                    )
+                if result.get("ok"):
+                    answer["pages"].append(_frame(result))
+                    out["result"]["page"] = result["page"]
+                else:
+                    st.error(f"Loading more failed: {result.get('error')}")
+                st.rerun()